@@ -3,6 +3,7 @@ from django.db import models
 from django.conf import settings
 from apps.products.models import Product, ProductVariant
 import uuid
+from utils.ids import uuid7
 
 
 class Cart(models.Model):
@@ -48,7 +49,7 @@ class Cart(models.Model):
 class CartItem(models.Model):
     """Cart item model"""
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, null=True, blank=True)
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.products.models import Product, Category
+from utils.testing import PerformanceAssertionsMixin, create_budget_products
 
 User = get_user_model()
 
@@ -57,6 +58,18 @@ class CartAPITests(TestCase):
             status.HTTP_404_NOT_FOUND,
         ])
 
+    def test_add_to_cart_creates_then_increments_item(self):
+        """Adding a product twice keeps one line with the summed quantity."""
+        self.client.force_authenticate(user=self.user)
+        data = {"product_id": str(self.product.id), "quantity": 2}
+        response = self.client.post("/api/v1/cart/items/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(response.data["quantity"], 2)
+        response = self.client.post("/api/v1/cart/items/", data, format="json")
+        self.assertEqual(response.data["quantity"], 4)
+        self.assertEqual(response.data["product"]["slug"], "test-product")
+        self.assertEqual(self.user.cart.items.count(), 1)
+
     def test_get_cart_authenticated(self):
         """Test getting cart with authentication."""
         self.client.force_authenticate(user=self.user)
@@ -66,3 +79,66 @@ class CartAPITests(TestCase):
             status.HTTP_200_OK,
             status.HTTP_404_NOT_FOUND,
         ])
+
+
+@pytest.mark.django_db(transaction=True)
+class CartQueryBudgetTests(PerformanceAssertionsMixin, TestCase):
+    """Query and serializer budgets for the cart endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Budget")
+        self.created = 0
+
+    def fill_cart(self, size):
+        """A new user whose cart holds size distinct products."""
+        from apps.cart.models import Cart, CartItem
+
+        self.created += 1
+        user = User.objects.create_user(email=f"cart{self.created}@example.com", password="testpass123")
+        products = create_budget_products(self.category, self.created, size)
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=1, price=product.price) for product in products
+        ])
+        return user
+
+    def get_cart(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/api/v1/cart/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_cart_queries_do_not_scale_with_items(self):
+        """Cart detail costs the same queries for 1 or 50 items."""
+        queries = self.assertQueriesDoNotScale((1, 50), self.fill_cart, self.get_cart)
+        self.assertLessEqual(queries, 4)
+        user = self.fill_cart(50)
+        with self.assertMaxSerializerTime(150):
+            self.get_cart(user)
+
+    def test_add_to_cart_queries_do_not_scale_with_items(self):
+        """Adding to a cart of 1 or 50 items costs the same queries."""
+        product = Product.objects.create(
+            name="Added", slug="added", description="Added", price=5, quantity=100, sku="ADDED", category=self.category,
+        )
+
+        def add(user):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(
+                "/api/v1/cart/items/", {"product_id": str(product.id), "quantity": 1}, format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        queries = self.assertQueriesDoNotScale((1, 50), self.fill_cart, add)
+        self.assertLessEqual(queries, 10)
+
+    def test_clear_cart_queries_do_not_scale_with_items(self):
+        """Clearing a cart of 1 or 50 items costs the same queries."""
+        def clear(user):
+            self.client.force_authenticate(user=user)
+            self.client.post("/api/v1/cart/clear/")
+            self.assertFalse(user.cart.items.exists())
+
+        self.assertQueriesDoNotScale((1, 50), self.fill_cart, clear)
@@ -1,10 +1,13 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 
 from .models import Cart, CartItem
 from .serializers import CartSerializer, CartItemSerializer
-from apps.products.models import Product, ProductVariant
+from apps.products.models import ProductVariant
+from apps.products.views import product_list_queryset
+from utils.transactions import AtomicWritesMixin
 
 
 class CartDetailView(generics.RetrieveAPIView):
@@ -12,6 +15,7 @@ class CartDetailView(generics.RetrieveAPIView):
     
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    use_primary_db = True  # get_or_create must not race a lagging replica
     
     def get_object(self):
         # Optimize cart retrieval: get_or_create is atomic and efficient
@@ -22,18 +26,25 @@ class CartDetailView(generics.RetrieveAPIView):
         """Override to prefetch cart items with products and variants"""
         instance = self.get_object()
         
-        # Prefetch related products and variants to avoid N+1 queries
-        instance.items.all().select_related('product', 'variant').prefetch_related('product__images')
+        # Prefetch items with their variants and listed products (images, review
+        # annotations) so the query count doesn't grow with the number of items
+        prefetch_related_objects([instance], Prefetch(
+            'items',
+            queryset=CartItem.objects.select_related('variant').prefetch_related(
+                Prefetch('product', queryset=product_list_queryset(active_only=False))
+            ),
+        ))
         
         serializer = self.get_serializer(instance, context={'request': request})
         return Response(serializer.data)
 
 
-class AddToCartView(generics.CreateAPIView):
+class AddToCartView(AtomicWritesMixin, generics.CreateAPIView):
     """Add item to cart with efficient upsert logic"""
     
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'cart_add'
     
     def perform_create(self, serializer):
         cart, _ = Cart.objects.get_or_create(user=self.request.user)
@@ -42,7 +53,8 @@ class AddToCartView(generics.CreateAPIView):
         variant_id = self.request.data.get('variant_id')
         quantity = int(self.request.data.get('quantity', 1))
         
-        product = get_object_or_404(Product, id=product_id)
+        # Annotated like the product list, so the response needs no further product queries
+        product = get_object_or_404(product_list_queryset(), id=product_id)
         variant = None
         
         if variant_id:
@@ -60,6 +72,8 @@ class AddToCartView(generics.CreateAPIView):
             # Item exists, increment quantity
             cart_item.quantity += quantity
             cart_item.save()
+        
+        serializer.instance = cart_item
 
 
 class CartItemUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
@@ -75,7 +89,7 @@ class CartItemUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         ).select_related('product', 'variant')
 
 
-class ClearCartView(generics.GenericAPIView):
+class ClearCartView(AtomicWritesMixin, generics.GenericAPIView):
     """Clear all items from cart"""
     
     serializer_class = CartSerializer
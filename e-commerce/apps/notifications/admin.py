@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Notification
+from .models import Notification, OutboxMessage
 
 
 @admin.register(Notification)
@@ -9,11 +9,12 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'notification_type', 'subject', 'status_badge', 'created_at']
     list_filter = ['notification_type', 'status', 'created_at']
     search_fields = ['user__email', 'subject']
-    readonly_fields = ['id', 'created_at', 'sent_at']
+    readonly_fields = ['id', 'created_at', 'sent_at', 'attempts', 'next_attempt_at', 'last_error']
     
     fieldsets = (
         ('Notification', {'fields': ('id', 'user', 'notification_type', 'subject', 'message')}),
         ('Status', {'fields': ('status', 'sent_at')}),
+        ('Delivery', {'fields': ('attempts', 'next_attempt_at', 'last_error')}),
         ('Data', {'fields': ('data',)}),
         ('Timestamps', {'fields': ('created_at',)}),
     )
@@ -30,3 +31,14 @@ class NotificationAdmin(admin.ModelAdmin):
             color, obj.get_status_display()
         )
     status_badge.short_description = 'Status'
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Admin for OutboxMessage model"""
+    list_display = ['task_name', 'status', 'attempts', 'next_attempt_at', 'created_at', 'published_at']
+    list_filter = ['status', 'task_name', 'created_at']
+    search_fields = ['task_name']
+    readonly_fields = [
+        'id', 'task_name', 'args', 'kwargs', 'attempts', 'last_error', 'next_attempt_at', 'created_at', 'published_at',
+    ]
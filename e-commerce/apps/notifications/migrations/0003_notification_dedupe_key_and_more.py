@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="dedupe_key",
+            field=models.CharField(
+                blank=True,
+                help_text="At most one pending notification per user and key, e.g. 'low_stock:<product_id>'",
+                max_length=100,
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "pending")),
+                fields=("user", "dedupe_key"),
+                name="unique_pending_notification_per_key",
+            ),
+        ),
+    ]
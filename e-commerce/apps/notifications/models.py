@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
-import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from utils.ids import uuid7
 
 
 class Notification(models.Model):
@@ -19,7 +21,7 @@ class Notification(models.Model):
         ('failed', 'Failed'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     notification_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     subject = models.CharField(max_length=200)
@@ -28,6 +30,17 @@ class Notification(models.Model):
     
     # Additional data
     data = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="At most one pending notification per user and key, e.g. 'low_stock:<product_id>'"
+    )
+    
+    # Delivery retries
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -38,7 +51,50 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['status', 'notification_type', 'next_attempt_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'dedupe_key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_notification_per_key',
+            ),
         ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.subject}"
+
+
+class OutboxMessage(models.Model):
+    """Celery task dispatch recorded in the same transaction as the request's writes"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('published', 'Published'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    task_name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Claim lease while publishing, then the retry time after a failed publish
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'outbox_messages'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task_name} ({self.status})"
@@ -0,0 +1,198 @@
+"""
+Transactional outbox for Celery task dispatch.
+
+Request handlers record the task to run as an OutboxMessage row inside their
+own transaction instead of calling .delay() directly. Once the transaction
+commits, the message ids are handed to a per-process background publisher
+that relays them to the broker in batches, so a slow or unavailable broker
+never adds latency to the request and a task never runs before the data it
+depends on is committed. A periodic sweep publishes anything the background
+publisher missed (e.g. the process exited before relaying) and retries
+failed publishes once their backoff has passed; messages that keep failing
+end up in the failed status for inspection.
+"""
+
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from celery import current_app
+from celery.exceptions import NotRegistered
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+CLAIM_LEASE = timedelta(minutes=1)
+
+
+def claim_pending(message_ids: list = None, batch_size: int = None) -> list:
+    """
+    Claim due pending messages for publishing.
+
+    Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED only for the
+    short transaction that pushes next_attempt_at out by CLAIM_LEASE, so the
+    background publisher and the periodic sweep never relay the same message
+    twice, and a publisher that dies mid-batch leaves its messages eligible
+    again once the lease expires.
+
+    Args:
+        message_ids: Restrict to these messages (None claims the oldest due)
+        batch_size: Maximum number of messages to claim
+
+    Returns:
+        List of claimed messages
+    """
+    batch_size = batch_size or settings.OUTBOX_PUBLISH_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        messages = OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            status='pending', next_attempt_at__lte=now,
+        )
+        if message_ids is not None:
+            messages = messages.filter(id__in=message_ids)
+        messages = list(messages.order_by('next_attempt_at')[:batch_size])
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = now + CLAIM_LEASE
+        OutboxMessage.objects.bulk_update(messages, ['attempts', 'next_attempt_at'])
+    return messages
+
+
+def publish_pending(message_ids: list = None, batch_size: int = None) -> dict:
+    """
+    Publish due pending outbox messages to the broker.
+
+    Algorithm: A batch is claimed under a lease (claim_pending) and published
+    after the claiming transaction has committed, so no row lock is held
+    while waiting on the broker. Every publish reuses one producer
+    connection and the outcome is saved with a single bulk_update. A failed
+    publish is retried with exponential backoff (OUTBOX_RETRY_BACKOFF,
+    doubled per attempt) and marked failed after OUTBOX_MAX_ATTEMPTS; a task
+    name no worker knows fails at once.
+
+    Args:
+        message_ids: Restrict to these messages (None publishes the oldest due)
+        batch_size: Maximum number of messages to publish
+
+    Returns:
+        Dictionary with published and failed counts
+    """
+    messages = claim_pending(message_ids, batch_size)
+    if not messages:
+        return {'published': 0, 'failed': 0}
+
+    published = failed = 0
+    with current_app.producer_or_acquire() as producer:
+        for message in messages:
+            try:
+                task = current_app.tasks[message.task_name]
+            except NotRegistered as e:
+                _mark_failed(message, e, permanent=True)
+                failed += 1
+                continue
+            try:
+                task.apply_async(
+                    args=message.args,
+                    kwargs=message.kwargs,
+                    task_id=str(message.id),  # lets consumers dedupe redeliveries
+                    producer=producer,
+                )
+            except Exception as e:
+                _mark_failed(message, e)
+                failed += 1
+            else:
+                message.status = 'published'
+                message.published_at = timezone.now()
+                message.next_attempt_at = message.published_at
+                message.last_error = ''
+                published += 1
+
+    OutboxMessage.objects.bulk_update(messages, ['status', 'published_at', 'next_attempt_at', 'last_error'])
+    return {'published': published, 'failed': failed}
+
+
+def _mark_failed(message: OutboxMessage, error: Exception, permanent: bool = False):
+    """Schedule a retry with exponential backoff, or give up"""
+    message.last_error = str(error)[:1000]
+    if permanent or message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = 'failed'
+        logger.error(f"Giving up on outbox message {message.id} after {message.attempts} attempts: {error}")
+    else:
+        delay = settings.OUTBOX_RETRY_BACKOFF * 2 ** (message.attempts - 1)
+        message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"Failed to publish outbox message {message.id}, retrying in {delay}s: {error}")
+
+
+class OutboxPublisher:
+    """
+    Per-process background thread relaying committed outbox messages.
+
+    Message ids are queued from transaction.on_commit callbacks, which never
+    block; the thread drains the queue into batches and publishes them.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, message_ids: list):
+        """Queue committed messages for publishing"""
+        if current_app.conf.task_always_eager:
+            # No broker to wait on: run the tasks right away
+            publish_pending(message_ids)
+            return
+        self._ensure_started()
+        for message_id in message_ids:
+            self._queue.put(message_id)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='outbox-publisher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch_size = settings.OUTBOX_PUBLISH_BATCH_SIZE
+        while True:
+            message_ids = [self._queue.get()]
+            while len(message_ids) < batch_size:
+                try:
+                    message_ids.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                publish_pending(message_ids)
+            except Exception as e:
+                # Left pending; the periodic sweep will pick them up
+                logger.error(f"Outbox publisher failed: {e}")
+            finally:
+                close_old_connections()
+
+
+publisher = OutboxPublisher()
+
+
+def enqueue_task(task, *args, **kwargs) -> OutboxMessage:
+    """
+    Record a Celery task in the current transaction and relay it after commit.
+
+    Args:
+        task: Celery task to run
+        *args: Positional task arguments (JSON serializable)
+        **kwargs: Keyword task arguments (JSON serializable)
+
+    Returns:
+        The outbox message
+    """
+    message = OutboxMessage.objects.create(task_name=task.name, args=list(args), kwargs=kwargs)
+    transaction.on_commit(lambda: publisher.submit([message.id]))
+    return message
@@ -0,0 +1,308 @@
+"""
+Notification delivery services.
+
+- Transactional emails (orders, account) rendered from warm compiled
+  templates and sent in batches over one mail connection
+- Pending email notifications claimed in batches, delivered over a single
+  reused mail connection and written back with bulk updates
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from utils.metrics import notifications_dispatched
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+class EmailBatchError(Exception):
+    """
+    Sending a batch stopped at a failed message.
+
+    Attributes:
+        completed: Number of leading messages handed to the mail backend before the failure
+        error: The underlying exception
+        sent_ids: Ids of the records whose email went out, when the caller knows them
+    """
+
+    def __init__(self, completed: int, error: Exception):
+        super().__init__(str(error))
+        self.completed = completed
+        self.error = error
+        self.sent_ids = []
+
+
+class TransactionalEmailService:
+    """
+    Single entry point for templated transactional emails.
+
+    Algorithm: Templates are compiled once per process and kept in a
+    class-level cache (warmed when a Celery worker starts). Batch helpers load
+    every order or user for a list of ids with one prefetching query, render
+    each message with its plain-text part, and send the whole batch over one
+    mail connection, one message at a time so a failure part-way tells the
+    caller which messages already went out.
+    """
+
+    # kind -> (template, subject format)
+    EMAILS = {
+        'order_confirmation': ('emails/order_confirmation.html', 'Order Confirmation - {order.order_number}'),
+        'order_shipped': ('emails/order_shipped.html', 'Your Order Has Been Shipped - {order.order_number}'),
+        'order_delivered': ('emails/order_delivered.html', 'Your Order Has Been Delivered - {order.order_number}'),
+        'verify_email': ('emails/verify_email.html', 'Verify Your Email Address'),
+        'reset_password': ('emails/reset_password.html', 'Reset Your Password'),
+        'welcome': ('emails/welcome.html', 'Welcome to Our E-commerce Store!'),
+    }
+
+    _templates = {}
+
+    @classmethod
+    def get_template(cls, kind: str):
+        """Get the compiled template for an email kind"""
+        template = cls._templates.get(kind)
+        if template is None:
+            template = cls._templates[kind] = get_template(cls.EMAILS[kind][0])
+        return template
+
+    @classmethod
+    def warm(cls):
+        """Compile every transactional email template up front"""
+        for kind in cls.EMAILS:
+            cls.get_template(kind)
+
+    @classmethod
+    def render(cls, kind: str, to: str, context: dict) -> EmailMultiAlternatives:
+        """
+        Render one email with its HTML and plain-text parts.
+
+        Args:
+            kind: Key in EMAILS
+            to: Recipient address
+            context: Template context
+
+        Returns:
+            Message ready to be sent
+        """
+        html_message = cls.get_template(kind).render(context)
+        message = EmailMultiAlternatives(
+            subject=cls.EMAILS[kind][1].format(**context),
+            body=strip_tags(html_message),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[to],
+        )
+        message.attach_alternative(html_message, 'text/html')
+        return message
+
+    @classmethod
+    def order_emails(cls, kind: str, order_ids: list) -> list:
+        """Render an order email for each order id using one prefetching query, as (order id, message) pairs"""
+        from apps.orders.models import Order
+
+        orders = Order.objects.filter(id__in=order_ids).select_related(
+            'user', 'shipping_address', 'billing_address'
+        ).prefetch_related('items')
+
+        return [
+            (order.id, cls.render(kind, order.user.email, {'order': order, 'user': order.user}))
+            for order in orders
+        ]
+
+    @classmethod
+    def render_order_emails(cls, kind: str, order_ids: list) -> list:
+        """Render an order email for each order id using one prefetching query"""
+        return [message for _, message in cls.order_emails(kind, order_ids)]
+
+    @classmethod
+    def render_user_emails(cls, kind: str, user_ids: list, contexts: dict = None) -> list:
+        """
+        Render an account email for each user id using one query.
+
+        Args:
+            kind: Key in EMAILS
+            user_ids: Recipient user ids
+            contexts: Optional per-user extra context keyed by str(user_id)
+        """
+        from apps.users.models import User
+
+        contexts = contexts or {}
+        return [
+            cls.render(kind, user.email, {'user': user, **contexts.get(str(user.id), {})})
+            for user in User.objects.filter(id__in=user_ids)
+        ]
+
+    @staticmethod
+    def send(messages: list) -> int:
+        """
+        Send rendered messages over a single mail connection.
+
+        Returns:
+            Number of messages sent
+
+        Raises:
+            EmailBatchError: If a message fails; the ones before it were sent
+        """
+        if not messages:
+            return 0
+        sent = completed = 0
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for message in messages:
+                    sent += connection.send_messages([message]) or 0
+                    completed += 1
+        except Exception as e:
+            notifications_dispatched.labels('transactional_email', 'sent').inc(sent)
+            notifications_dispatched.labels('transactional_email', 'failed').inc(len(messages) - completed)
+            raise EmailBatchError(completed, e) from e
+        notifications_dispatched.labels('transactional_email', 'sent').inc(sent)
+        return sent
+
+    @classmethod
+    def send_order_emails(cls, kind: str, order_ids: list) -> int:
+        """
+        Render and send an order email for every order id.
+
+        Raises:
+            EmailBatchError: If sending stopped part-way; sent_ids lists the
+                orders whose email already went out
+        """
+        emails = cls.order_emails(kind, order_ids)
+        try:
+            return cls.send([message for _, message in emails])
+        except EmailBatchError as e:
+            e.sent_ids = [order_id for order_id, _ in emails[:e.completed]]
+            raise
+
+    @classmethod
+    def send_user_emails(cls, kind: str, user_ids: list, contexts: dict = None) -> int:
+        """Render and send an account email for every user id"""
+        return cls.send(cls.render_user_emails(kind, user_ids, contexts))
+
+
+class NotificationDispatcher:
+    """
+    Batched email notification dispatcher.
+
+    Algorithm: Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED in
+    a short transaction that pushes next_attempt_at out by a lease, so parallel
+    workers never pick the same rows and a crashed worker's batch becomes
+    eligible again once the lease expires. Delivery happens outside the
+    transaction; results are persisted with one bulk_update per batch.
+    """
+
+    CLAIM_LEASE = timedelta(minutes=5)
+    RESULT_FIELDS = ['status', 'sent_at', 'attempts', 'next_attempt_at', 'last_error']
+
+    def __init__(self, batch_size: int = None, time_budget: float = None, connection=None):
+        self.batch_size = batch_size or settings.NOTIFICATION_DISPATCH_BATCH_SIZE
+        self.time_budget = time_budget if time_budget is not None else settings.NOTIFICATION_DISPATCH_TIME_BUDGET
+        self.max_attempts = settings.NOTIFICATION_MAX_ATTEMPTS
+        self.backoff = settings.NOTIFICATION_RETRY_BACKOFF
+        self.connection = connection
+
+    def claim_batch(self) -> list:
+        """
+        Claim the next batch of deliverable email notifications.
+
+        Returns:
+            List of notifications with their users loaded
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('user')
+                .filter(status='pending', notification_type='email')
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .order_by('created_at')[:self.batch_size]
+            )
+            for notification in batch:
+                notification.attempts += 1
+                notification.next_attempt_at = now + self.CLAIM_LEASE
+            Notification.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+        return batch
+
+    def build_message(self, notification, connection) -> EmailMessage:
+        """Build the email message for a notification"""
+        return EmailMessage(
+            subject=notification.subject,
+            body=notification.message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.user.email],
+            connection=connection,
+        )
+
+    def deliver(self, batch: list, connection) -> dict:
+        """
+        Send a claimed batch over an open connection and persist the results.
+
+        Returns:
+            Dictionary with sent and failed counts for the batch
+        """
+        sent = failed = 0
+        for notification in batch:
+            try:
+                connection.send_messages([self.build_message(notification, connection)])
+            except Exception as e:
+                self._mark_failed(notification, e)
+                failed += 1
+            else:
+                notification.status = 'sent'
+                notification.sent_at = timezone.now()
+                notification.next_attempt_at = None
+                notification.last_error = ''
+                sent += 1
+
+        Notification.objects.bulk_update(batch, self.RESULT_FIELDS)
+        notifications_dispatched.labels('email', 'sent').inc(sent)
+        notifications_dispatched.labels('email', 'failed').inc(failed)
+        return {'sent': sent, 'failed': failed}
+
+    def run(self) -> dict:
+        """
+        Deliver pending notifications until the queue is drained or the time
+        budget for this run is spent.
+
+        Returns:
+            Dictionary with sent, failed and batch counts
+        """
+        deadline = time.monotonic() + self.time_budget
+        totals = {'sent': 0, 'failed': 0, 'batches': 0}
+        connection = self.connection or get_connection(fail_silently=False)
+
+        try:
+            connection.open()
+            while time.monotonic() < deadline:
+                batch = self.claim_batch()
+                if not batch:
+                    break
+                result = self.deliver(batch, connection)
+                totals['sent'] += result['sent']
+                totals['failed'] += result['failed']
+                totals['batches'] += 1
+        finally:
+            connection.close()
+
+        return totals
+
+    def _mark_failed(self, notification, error: Exception):
+        """Schedule a retry with exponential backoff, or give up"""
+        notification.last_error = str(error)[:1000]
+        if notification.attempts >= self.max_attempts:
+            notification.status = 'failed'
+            notification.next_attempt_at = None
+            logger.error(f"Giving up on notification {notification.id} after {notification.attempts} attempts: {error}")
+        else:
+            delay = self.backoff * 2 ** (notification.attempts - 1)
+            notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Notification {notification.id} failed, retrying in {delay}s: {error}")
@@ -1,6 +1,4 @@
 from celery import shared_task
-from django.core.mail import send_mail
-from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,37 +6,17 @@ logger = logging.getLogger(__name__)
 
 @shared_task
 def send_pending_notifications():
-    """Send all pending notifications"""
+    """Send pending email notifications in batches over one mail connection"""
     try:
-        from apps.notifications.models import Notification
-        from django.utils import timezone
+        from apps.notifications.services import NotificationDispatcher
         
-        pending_notifications = Notification.objects.filter(status='pending', notification_type='email')
-        
-        for notification in pending_notifications:
-            try:
-                send_mail(
-                    subject=notification.subject,
-                    message=notification.message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[notification.user.email],
-                    fail_silently=False,
-                )
-                
-                # Mark as sent
-                notification.status = 'sent'
-                notification.sent_at = timezone.now()
-                notification.save()
-                
-                logger.info(f"Notification sent to {notification.user.email}")
-                
-            except Exception as e:
-                # Mark as failed
-                notification.status = 'failed'
-                notification.save()
-                logger.error(f"Failed to send notification: {str(e)}")
+        result = NotificationDispatcher().run()
         
-        return f"Processed {pending_notifications.count()} pending notifications"
+        logger.info(
+            f"Notification dispatch completed: {result['sent']} sent, "
+            f"{result['failed']} failed in {result['batches']} batches"
+        )
+        return f"Processed {result['sent'] + result['failed']} pending notifications"
         
     except Exception as e:
         logger.error(f"Error sending pending notifications: {str(e)}")
@@ -69,3 +47,63 @@ def create_notification(user_id, notification_type, subject, message, data=None)
     except Exception as e:
         logger.error(f"Error creating notification: {str(e)}")
         raise
+
+
+@shared_task
+def relay_outbox_messages():
+    """Publish outbox messages the in-process publisher did not relay"""
+    try:
+        from apps.notifications.outbox import publish_pending
+        
+        totals = {'published': 0, 'failed': 0}
+        while True:
+            result = publish_pending()
+            totals['published'] += result['published']
+            totals['failed'] += result['failed']
+            # Failed messages are pushed out by their backoff, so this drains
+            if not (result['published'] or result['failed']):
+                break
+        
+        logger.info(f"Outbox relay completed: {totals['published']} published, {totals['failed']} failed")
+        return f"Relayed {totals['published']} outbox messages"
+        
+    except Exception as e:
+        logger.error(f"Error relaying outbox messages: {str(e)}")
+        raise
+
+
+@shared_task
+def purge_old_notifications():
+    """Purge delivered notifications and published outbox messages past retention"""
+    try:
+        from datetime import timedelta
+        from django.conf import settings
+        from django.utils import timezone
+        from apps.notifications.models import Notification, OutboxMessage
+        from utils.purge import purge_queryset
+        
+        now = timezone.now()
+        results = {
+            'notifications': purge_queryset(
+                Notification.objects.filter(
+                    status__in=['sent', 'failed'],
+                    created_at__lt=now - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS),
+                )
+            ),
+            'outbox_messages': purge_queryset(
+                OutboxMessage.objects.filter(
+                    status='published',
+                    created_at__lt=now - timedelta(days=settings.OUTBOX_RETENTION_DAYS),
+                )
+            ),
+        }
+        
+        logger.info(
+            f"Notification purge completed: {results['notifications']['deleted']} notifications, "
+            f"{results['outbox_messages']['deleted']} outbox messages"
+        )
+        return results
+        
+    except Exception as e:
+        logger.error(f"Error purging notifications: {str(e)}")
+        raise
@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import Order, OrderItem, OrderStatusHistory
+from .tasks import send_order_emails
 
 
 class OrderItemInline(admin.TabularInline):
@@ -27,6 +29,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['order_number', 'user__email']
     readonly_fields = ['id', 'order_number', 'created_at', 'updated_at']
     inlines = [OrderItemInline, OrderStatusHistoryInline]
+    actions = ['mark_as_shipped']
     
     fieldsets = (
         ('Order Info', {'fields': ('id', 'order_number', 'user', 'status')}),
@@ -51,6 +54,21 @@ class OrderAdmin(admin.ModelAdmin):
             color, obj.get_status_display()
         )
     status_badge.short_description = 'Status'
+    
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_as_shipped(self, request, queryset):
+        """Ship orders in bulk and notify customers with one batched email task"""
+        order_ids = [str(pk) for pk in queryset.filter(status='processing').values_list('id', flat=True)]
+        Order.objects.filter(id__in=order_ids).update(
+            status='shipped', shipped_at=timezone.now(), updated_at=timezone.now()
+        )
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(order_id=order_id, status='shipped', note='Order shipped', created_by=request.user)
+            for order_id in order_ids
+        ])
+        if order_ids:
+            send_order_emails.delay('order_shipped', order_ids)
+        self.message_user(request, f"{len(order_ids)} order(s) marked as shipped.")
 
 
 @admin.register(OrderItem)
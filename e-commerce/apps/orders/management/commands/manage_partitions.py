@@ -0,0 +1,73 @@
+"""
+Maintain monthly partitions of orders, order items and status history.
+
+    python manage.py manage_partitions --convert
+    python manage.py manage_partitions --months-ahead 3
+    python manage.py manage_partitions --archive-after-months 24 --archive-dir /backups/partitions
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from utils.partitioning import PARTITIONED_TABLES, PartitionManager, add_months, month_start
+
+
+class Command(BaseCommand):
+    help = 'Create future monthly partitions and archive old ones (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(PARTITIONED_TABLES), default=list(PARTITIONED_TABLES),
+            help='Tables to manage (default: all partitioned tables)',
+        )
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Convert tables that are not partitioned yet (one-time, takes an exclusive lock)',
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+            help='Number of future monthly partitions to keep ready',
+        )
+        parser.add_argument(
+            '--archive-after-months', type=int,
+            help='Archive and drop partitions that ended more than this many months ago',
+        )
+        parser.add_argument(
+            '--archive-dir', default=settings.PARTITION_ARCHIVE_DIR,
+            help='Directory for compressed partition dumps',
+        )
+        parser.add_argument('--database', default='default', help='Database alias')
+
+    def handle(self, *args, **options):
+        manager = PartitionManager(using=options['database'])
+        if not manager.supported:
+            self.stdout.write(
+                f"Partitioning requires PostgreSQL; nothing to do on {manager.connection.vendor}."
+            )
+            return
+
+        archive_after = options['archive_after_months']
+        if archive_after is not None and archive_after < 1:
+            raise CommandError('--archive-after-months must be at least 1')
+
+        for table in options['tables']:
+            try:
+                if options['convert'] and manager.convert(table):
+                    self.stdout.write(self.style.SUCCESS(f"{table}: converted to a partitioned table"))
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            if not manager.is_partitioned(table):
+                self.stdout.write(self.style.WARNING(f"{table}: not partitioned (run with --convert)"))
+                continue
+
+            for name in manager.ensure_partitions(table, options['months_ahead']):
+                self.stdout.write(f"{table}: created {name}")
+
+            if archive_after is not None:
+                before = add_months(month_start(timezone.now()), -archive_after)
+                for path in manager.archive_partitions(table, before, options['archive_dir']):
+                    self.stdout.write(f"{table}: archived to {path}")
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance completed'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+def create_order_number_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS order_number_seq")
+
+
+def drop_order_number_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP SEQUENCE IF EXISTS order_number_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "order_number_counters",
+            },
+        ),
+        migrations.RunPython(create_order_number_sequence, drop_order_number_sequence),
+    ]
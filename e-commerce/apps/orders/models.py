@@ -2,7 +2,7 @@ from django.db import models
 from django.conf import settings
 from apps.products.models import Product, ProductVariant
 from apps.users.models import Address
-import uuid
+from utils.ids import uuid7
 from decimal import Decimal
 
 
@@ -17,7 +17,7 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     order_number = models.CharField(max_length=50, unique=True, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='orders')
     
@@ -69,14 +69,10 @@ class Order(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Generate unique order number
-            import random
-            import string
-            from django.utils import timezone
+            # Sequential, collision-free order number (see OrderNumberAllocator)
+            from .services import order_numbers
             
-            date_str = timezone.now().strftime('%Y%m%d')
-            random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            self.order_number = f"ORD-{date_str}-{random_str}"
+            self.order_number = order_numbers.next_order_number(using=kwargs.get('using'))
         
         super().save(*args, **kwargs)
     
@@ -94,8 +90,9 @@ class Order(models.Model):
 class OrderItem(models.Model):
     """Order item model"""
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # No database constraint: orders can be a partitioned table (utils.partitioning)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', db_constraint=False)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     variant = models.ForeignKey(ProductVariant, on_delete=models.PROTECT, null=True, blank=True)
     
@@ -130,8 +127,9 @@ class OrderItem(models.Model):
 class OrderStatusHistory(models.Model):
     """Track order status changes"""
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # No database constraint: orders can be a partitioned table (utils.partitioning)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history', db_constraint=False)
     status = models.CharField(max_length=20)
     note = models.TextField(blank=True)
     created_by = models.ForeignKey(
@@ -148,3 +146,16 @@ class OrderStatusHistory(models.Model):
     
     def __str__(self):
         return f"{self.order.order_number} - {self.status}"
+
+
+class OrderNumberCounter(models.Model):
+    """Counter row backing order numbers on databases without sequences"""
+    
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'order_number_counters'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
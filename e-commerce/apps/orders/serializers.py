@@ -62,8 +62,9 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'notes', 'items', 'status_history', 'can_be_cancelled', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'order_number', 'status_display', 'items', 'status_history',
-            'created_at', 'updated_at'
+            'id', 'order_number', 'status', 'status_display', 'subtotal', 'tax', 'shipping_cost',
+            'discount', 'total_amount', 'items', 'status_history', 'tracking_number', 'shipped_at',
+            'delivered_at', 'created_at', 'updated_at'
         ]
     
     def get_can_be_cancelled(self, obj) -> bool:
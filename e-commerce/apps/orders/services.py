@@ -0,0 +1,101 @@
+"""
+Order services.
+
+- Order number allocation: short, human-readable and collision-free numbers
+  that increase monotonically so inserts land at the right edge of the
+  order_number index
+"""
+
+import os
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+ORDER_NUMBER_SEQUENCE = 'order_number_seq'
+
+
+class OrderNumberAllocator:
+    """
+    Allocates order numbers of the form ORD-YYYYMMDD-NNNNNN.
+
+    Algorithm: On PostgreSQL each process reserves a block of values from the
+    order_number_seq sequence in a single round trip and hands them out from
+    memory under a lock, so most orders need no query at all. Sequence values
+    are never rolled back, so a block stays unique even if the checkout that
+    reserved it fails. Other databases (SQLite in development and tests)
+    increment a counter row with UPDATE ... RETURNING inside the caller's
+    transaction, one value at a time, which rolls back together with the order.
+
+    Numbers are strictly increasing within a process and only roughly ordered
+    across processes; they are unique everywhere.
+    """
+
+    COUNTER_NAME = 'order_number'
+
+    def __init__(self, block_size: int = 50):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # database alias -> list of unused values
+
+    def next_value(self, using: str = None) -> int:
+        """
+        Get the next unique counter value.
+
+        Args:
+            using: Database alias (defaults to the default database)
+
+        Returns:
+            A value never handed out before
+        """
+        using = using or DEFAULT_DB_ALIAS
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            return self._increment_counter(connection)
+
+        with self._lock:
+            block = self._blocks.get(using)
+            if not block:
+                block = self._blocks[using] = self._reserve_block(connection)
+            return block.pop(0)
+
+    def next_order_number(self, using: str = None) -> str:
+        """Format the next value as an order number"""
+        return f"ORD-{timezone.now():%Y%m%d}-{self.next_value(using):06d}"
+
+    def reset(self):
+        """Forget reserved blocks (e.g. after forking a worker)"""
+        with self._lock:
+            self._blocks.clear()
+
+    def _reserve_block(self, connection) -> list:
+        """Reserve block_size sequence values in one round trip"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT nextval('{ORDER_NUMBER_SEQUENCE}') FROM generate_series(1, %s)",
+                [self.block_size],
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def _increment_counter(self, connection) -> int:
+        """Increment the counter row and return its new value"""
+        from .models import OrderNumberCounter
+
+        table = connection.ops.quote_name(OrderNumberCounter._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET value = value + 1 WHERE name = %s RETURNING value",
+                [self.COUNTER_NAME],
+            )
+            row = cursor.fetchone()
+            if row is None:
+                # First order on this database
+                OrderNumberCounter.objects.using(connection.alias).get_or_create(name=self.COUNTER_NAME)
+                return self._increment_counter(connection)
+            return row[0]
+
+
+order_numbers = OrderNumberAllocator()
+
+# A forked worker must not hand out its parent's reserved values
+os.register_at_fork(after_in_child=order_numbers.reset)
@@ -1,101 +1,73 @@
 from celery import shared_task
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
-def send_order_confirmation(self, order_id):
-    """Send order confirmation email"""
+def _send_order_emails(task, kind, order_ids, retry_args=None):
+    """
+    Send one kind of order email for a batch of orders, retrying the task on
+    failure. When the batch failed part-way, the retry gets retry_args(ids
+    not emailed yet) so customers who already got the email don't get it again.
+    """
+    from apps.notifications.services import EmailBatchError, TransactionalEmailService
+
     try:
-        from apps.orders.models import Order
-        
-        order = Order.objects.get(id=order_id)
-        
-        subject = f'Order Confirmation - {order.order_number}'
-        html_message = render_to_string('emails/order_confirmation.html', {
-            'order': order,
-        })
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[order.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        sent = TransactionalEmailService.send_order_emails(kind, order_ids)
         
-        logger.info(f"Order confirmation email sent for {order.order_number}")
-        return f"Confirmation email sent for {order.order_number}"
+        logger.info(f"Sent {sent} {kind} emails for {len(order_ids)} orders")
+        return f"Sent {sent} {kind} emails"
         
+    except EmailBatchError as e:
+        sent_ids = {str(order_id) for order_id in e.sent_ids}
+        remaining = [order_id for order_id in order_ids if str(order_id) not in sent_ids]
+        logger.error(f"Failed to send {kind} emails ({len(sent_ids)} sent, {len(remaining)} left): {e.error}")
+        args = retry_args(remaining) if retry_args and sent_ids else None
+        raise task.retry(exc=e.error, countdown=60, args=args)
     except Exception as e:
-        logger.error(f"Failed to send order confirmation email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        logger.error(f"Failed to send {kind} emails: {str(e)}")
+        raise task.retry(exc=e, countdown=60)
+
+
+@shared_task(bind=True, max_retries=3)
+def send_order_emails(self, kind, order_ids):
+    """Send order emails for many orders at once (e.g. after a bulk status update)"""
+    return _send_order_emails(self, kind, order_ids, retry_args=lambda remaining: (kind, remaining))
+
+
+@shared_task(bind=True, max_retries=3)
+def send_order_confirmation(self, order_id):
+    """Send order confirmation email"""
+    return _send_order_emails(self, 'order_confirmation', [order_id])
 
 
 @shared_task(bind=True, max_retries=3)
 def send_order_shipped(self, order_id):
     """Send order shipped notification"""
-    try:
-        from apps.orders.models import Order
-        
-        order = Order.objects.get(id=order_id)
-        
-        subject = f'Your Order Has Been Shipped - {order.order_number}'
-        html_message = render_to_string('emails/order_shipped.html', {
-            'order': order,
-        })
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[order.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Order shipped email sent for {order.order_number}")
-        return f"Shipped email sent for {order.order_number}"
-        
-    except Exception as e:
-        logger.error(f"Failed to send order shipped email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+    return _send_order_emails(self, 'order_shipped', [order_id])
 
 
 @shared_task(bind=True, max_retries=3)
 def send_order_delivered(self, order_id):
     """Send order delivered notification"""
+    return _send_order_emails(self, 'order_delivered', [order_id])
+
+
+@shared_task
+def maintain_partitions():
+    """Keep future monthly partitions ready for the partitioned tables"""
     try:
-        from apps.orders.models import Order
-        
-        order = Order.objects.get(id=order_id)
-        
-        subject = f'Your Order Has Been Delivered - {order.order_number}'
-        html_message = render_to_string('emails/order_delivered.html', {
-            'order': order,
-        })
-        plain_message = strip_tags(html_message)
+        from django.conf import settings
+        from utils.partitioning import PARTITIONED_TABLES, PartitionManager
         
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[order.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        manager = PartitionManager()
+        created = []
+        for table in PARTITIONED_TABLES:
+            created += manager.ensure_partitions(table, settings.PARTITION_MONTHS_AHEAD)
         
-        logger.info(f"Order delivered email sent for {order.order_number}")
-        return f"Delivered email sent for {order.order_number}"
+        logger.info(f"Partition maintenance completed: {len(created)} partitions created")
+        return f"Created {len(created)} partitions"
         
     except Exception as e:
-        logger.error(f"Failed to send order delivered email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        logger.error(f"Error maintaining partitions: {str(e)}")
+        raise
@@ -2,11 +2,14 @@
 Tests for the Orders app.
 """
 import pytest
-from django.test import TestCase
+from unittest import skipUnless
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.products.models import Product, Category
+from utils.testing import PerformanceAssertionsMixin, create_budget_products
 
 User = get_user_model()
 
@@ -61,6 +64,45 @@ class OrderAPITests(TestCase):
             status.HTTP_404_NOT_FOUND,
         ])
 
+    def checkout(self, quantity):
+        """Put quantity of the product in the user's cart and check out."""
+        from apps.cart.models import Cart, CartItem
+        from apps.users.models import Address
+
+        address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Test", phone_number="1",
+            street_address="1 Street", city="City", state="State", country="Country", zip_code="1",
+        )
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/v1/orders/",
+                {"shipping_address_id": str(address.id), "billing_address_id": str(address.id), "notes": "Ring twice"},
+                format="json",
+            )
+
+    def test_checkout_creates_order_from_cart(self):
+        """Checkout prices the cart server-side, empties it and takes the stock."""
+        response = self.checkout(quantity=2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(response.data["subtotal"], "199.98")
+        self.assertEqual(response.data["notes"], "Ring twice")
+        self.assertEqual(response.data["items"][0]["quantity"], 2)
+        self.assertEqual(response.data["items"][0]["subtotal"], "199.98")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 8)
+        self.assertFalse(self.user.cart.items.exists())
+
+    def test_checkout_emptying_stock_counts_a_stock_out(self):
+        """A checkout taking the last units is counted once in stock_outs."""
+        from prometheus_client import REGISTRY
+
+        before = REGISTRY.get_sample_value("stock_outs_total") or 0
+        self.assertEqual(self.checkout(quantity=10).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(REGISTRY.get_sample_value("stock_outs_total"), before + 1)
+
     def test_list_orders_authenticated(self):
         """Test listing orders with authentication."""
         self.client.force_authenticate(user=self.user)
@@ -70,3 +112,341 @@ class OrderAPITests(TestCase):
             status.HTTP_200_OK,
             status.HTTP_404_NOT_FOUND,
         ])
+
+
+@pytest.mark.django_db(transaction=True)
+class OrderNumberTests(TestCase):
+    """Test sequential order number allocation."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.users.models import Address
+
+        self.user = User.objects.create_user(email="buyer@example.com", password="testpass123")
+        self.address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Buyer", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+
+    def create_order(self):
+        from apps.orders.models import Order
+
+        return Order.objects.create(
+            user=self.user, subtotal=10, total_amount=10,
+            shipping_address=self.address, billing_address=self.address,
+        )
+
+    def test_order_numbers_are_sequential(self):
+        """Numbers are short, readable and increase with every order."""
+        from django.utils import timezone
+
+        numbers = [self.create_order().order_number for _ in range(3)]
+        prefix = f"ORD-{timezone.now():%Y%m%d}-"
+        self.assertEqual(numbers, [f"{prefix}000001", f"{prefix}000002", f"{prefix}000003"])
+
+    def test_allocation_costs_one_query(self):
+        """Without a sequence, a number costs a single UPDATE ... RETURNING."""
+        from apps.orders.services import order_numbers
+
+        order_numbers.next_value()  # creates the counter row
+        with self.assertNumQueries(1):
+            order_numbers.next_value()
+
+    def test_parallel_allocation_has_no_collisions(self):
+        """Concurrent checkouts share reserved blocks without duplicates or extra round trips."""
+        import itertools
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from apps.orders.services import OrderNumberAllocator
+
+        sequence = itertools.count(1)
+        sequence_lock = threading.Lock()
+        reservations = []
+
+        def reserve_block(connection):
+            # Stand-in for nextval() over generate_series on PostgreSQL
+            with sequence_lock:
+                reservations.append(1)
+                return [next(sequence) for _ in range(allocator.block_size)]
+
+        allocator = OrderNumberAllocator(block_size=20)
+        fake_connection = mock.Mock(vendor="postgresql")
+        with mock.patch("apps.orders.services.connections", {"default": fake_connection}), \
+                mock.patch.object(allocator, "_reserve_block", side_effect=reserve_block):
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                values = list(pool.map(lambda _: allocator.next_value(), range(1600)))
+
+        self.assertEqual(len(set(values)), 1600)
+        self.assertEqual(len(reservations), 1600 // 20)
+
+
+class UUID7KeyTests(TestCase):
+    """Test time-ordered primary keys."""
+
+    def test_keys_are_version_7_and_increasing(self):
+        """Keys carry version 7 and sort in generation order."""
+        from utils.ids import uuid7
+
+        keys = [uuid7() for _ in range(5000)]
+        self.assertTrue(all(key.version == 7 for key in keys))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 5000)
+
+    def test_timestamp_round_trip(self):
+        """The embedded time bounds keys, so archival can range over the pk."""
+        from datetime import timedelta
+        from django.utils import timezone
+        from utils.ids import uuid7, uuid7_datetime, uuid7_floor
+
+        before = timezone.now() - timedelta(milliseconds=1)
+        key = uuid7()
+        self.assertLess(abs(uuid7_datetime(key) - timezone.now()), timedelta(seconds=1))
+        self.assertLess(uuid7_floor(before), key)
+        self.assertGreater(uuid7_floor(timezone.now() + timedelta(seconds=1)), key)
+
+
+class PartitionManagementTests(TestCase):
+    """Test monthly partition maintenance."""
+
+    def test_month_ranges(self):
+        """Partitions cover whole months and roll over the year boundary."""
+        from datetime import date
+        from utils.partitioning import month_ranges
+
+        self.assertEqual(month_ranges(date(2026, 11, 19), 3), [
+            ("p202611", date(2026, 11, 1), date(2026, 12, 1)),
+            ("p202612", date(2026, 12, 1), date(2027, 1, 1)),
+            ("p202701", date(2027, 1, 1), date(2027, 2, 1)),
+        ])
+
+    def test_command_is_a_no_op_on_sqlite(self):
+        """Without PostgreSQL the command reports and changes nothing."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("manage_partitions", "--convert", "--archive-after-months", "12", stdout=out)
+        self.assertIn("nothing to do on sqlite", out.getvalue())
+
+
+@skipUnless("postgres" in settings.DATABASES, "set TEST_POSTGRES_URL to run against PostgreSQL")
+class PostgresPartitioningTests(TransactionTestCase):
+    """Convert live order tables on PostgreSQL."""
+
+    databases = {"default", "postgres"}
+
+    def create_order(self, **kwargs):
+        from apps.orders.models import Order
+
+        # Ids: instances from another alias cannot be assigned before saving
+        return Order.objects.using("postgres").create(
+            user_id=self.user.pk, subtotal=20, total_amount=20,
+            shipping_address_id=self.address.pk, billing_address_id=self.address.pk, **kwargs,
+        )
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.users.models import Address
+
+        self.user = User.objects.db_manager("postgres").create_user(email="part@example.com", password="testpass123")
+        self.address = Address.objects.using("postgres").create(
+            user_id=self.user.pk, address_type="shipping", full_name="Part", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+
+    def test_convert_keeps_this_months_rows_and_unique_order_numbers(self):
+        """Rows from the current month attach with the legacy table; order numbers stay globally unique."""
+        from datetime import datetime, timedelta, timezone as dt_timezone
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db import IntegrityError, transaction
+        from apps.orders.models import Order
+        from utils.partitioning import PartitionManager, add_months, month_start
+
+        old = self.create_order()
+        Order.objects.using("postgres").filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=90))
+        current = self.create_order()
+
+        call_command("manage_partitions", "--convert", "--months-ahead", "2", "--database", "postgres", stdout=StringIO())
+
+        manager = PartitionManager(using="postgres")
+        next_month = add_months(month_start(datetime.now(dt_timezone.utc)), 1)
+        partitions = dict(manager.partitions("orders"))
+        self.assertEqual(partitions.pop("orders_legacy").date(), next_month)
+        self.assertIsNone(partitions.pop("orders_default"))
+        # Monthly partitions start where the legacy one ends
+        self.assertEqual(sorted(upper.date() for upper in partitions.values()), [
+            add_months(next_month, 1), add_months(next_month, 2),
+        ])
+        self.assertEqual(Order.objects.using("postgres").count(), 2)
+
+        later = self.create_order()
+        for order_number in (old.order_number, current.order_number):
+            with self.assertRaises(IntegrityError), transaction.atomic(using="postgres"):
+                Order.objects.using("postgres").filter(pk=later.pk).update(order_number=order_number)
+
+        # A renumbered order releases its old number
+        Order.objects.using("postgres").filter(pk=later.pk).update(order_number="ORD-RENUMBERED")
+        self.create_order(order_number=later.order_number)
+
+    def test_partial_unique_index_blocks_conversion(self):
+        """A table whose dedupe key is a partial unique index is left untouched."""
+        from unittest import mock
+        from utils.partitioning import PARTITIONED_TABLES, PartitionManager
+
+        manager = PartitionManager(using="postgres")
+        with mock.patch.dict(PARTITIONED_TABLES, {"notifications": "created_at"}):
+            with self.assertRaisesRegex(ValueError, "unique_pending_notification_per_key"):
+                manager.convert("notifications")
+        self.assertFalse(manager.is_partitioned("notifications"))
+
+
+@pytest.mark.django_db(transaction=True)
+class MetricsTests(TestCase):
+    """Prometheus metrics endpoint and counters."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="metrics@example.com", password="testpass123")
+
+    @staticmethod
+    def sample(name, labels=None):
+        from prometheus_client import REGISTRY
+        return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get("/api/v1/orders/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/v1/orders/"}', body)
+        self.assertIn('http_requests_total{method="GET",route="/api/v1/orders/",status="401"}', body)
+
+    def test_cache_reads_are_labelled_by_prefix(self):
+        from django.core.cache import cache
+
+        before = self.sample("cache_reads_total", {"prefix": "product", "result": "miss"})
+        self.client.get("/metrics")  # installs the hooks
+        cache.get("product:detail:missing")
+        self.assertEqual(self.sample("cache_reads_total", {"prefix": "product", "result": "miss"}), before + 1)
+
+    def test_token_is_required_when_configured(self):
+        with self.settings(METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_served_without_token_when_required(self):
+        with self.settings(METRICS_TOKEN="", METRICS_REQUIRE_TOKEN=True):
+            with self.assertLogs("config.health", "ERROR"):
+                self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rejected_checkout_is_counted(self):
+        before = self.sample("checkouts_total", {"result": "failure"})
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/api/v1/orders/", {}, format="json")  # no cart yet
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.sample("checkouts_total", {"result": "failure"}), before + 1)
+
+
+@pytest.mark.django_db(transaction=True)
+class OrderQueryBudgetTests(PerformanceAssertionsMixin, TestCase):
+    """Query and serializer budgets for the order endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Budget")
+        self.created = 0
+
+    def create_buyer(self, products):
+        """A new user with an address and a cart holding one of each product."""
+        from apps.cart.models import Cart
+        from apps.users.models import Address
+
+        self.created += 1
+        user = User.objects.create_user(email=f"buyer{self.created}@example.com", password="testpass123")
+        user.address = Address.objects.create(
+            user=user, address_type="shipping", full_name="Buyer", phone_number="1",
+            street_address="1 Street", city="City", state="State", country="Country", zip_code="1",
+        )
+        Cart.objects.create(user=user)
+        self.refill_cart(user, products)
+        return user
+
+    def refill_cart(self, user, products):
+        from apps.cart.models import CartItem
+
+        CartItem.objects.bulk_create([
+            CartItem(cart=user.cart, product=product, quantity=1, price=product.price) for product in products
+        ])
+
+    def create_products(self, size):
+        self.created += 1
+        return create_budget_products(self.category, self.created, size)
+
+    def checkout(self, user):
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/orders/",
+                {"shipping_address_id": str(user.address.id), "billing_address_id": str(user.address.id)},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        return response
+
+    def place_order(self, size):
+        """A new user with one order of size lines, placed through checkout."""
+        user = self.create_buyer(self.create_products(size))
+        user.order_id = self.checkout(user).data["id"]
+        return user
+
+    def test_checkout_queries_do_not_scale_with_cart_items(self):
+        """Checking out 1 or 50 cart lines costs the same queries."""
+        def setup(size):
+            return self.create_buyer(self.create_products(size))
+
+        self.checkout(setup(1))  # the first order creates the order number counter
+        queries = self.assertQueriesDoNotScale((1, 50), setup, self.checkout)
+        self.assertLessEqual(queries, 18)
+
+    def test_order_detail_queries_do_not_scale_with_items(self):
+        """Order detail costs the same queries for 1 or 50 lines."""
+        def detail(user):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.get(f"/api/v1/orders/{user.order_id}/").status_code, status.HTTP_200_OK)
+
+        queries = self.assertQueriesDoNotScale((1, 50), self.place_order, detail)
+        self.assertLessEqual(queries, 5)
+        user = self.place_order(50)
+        with self.assertMaxSerializerTime(150):
+            detail(user)
+
+    def test_order_list_queries_do_not_scale_with_orders(self):
+        """A page of orders costs the same queries for 1 or 20 orders."""
+        def setup(size):
+            products = self.create_products(1)
+            user = self.create_buyer(products)
+            for _ in range(size):
+                self.checkout(user)
+                self.refill_cart(user, products)
+            return user
+
+        def order_list(user):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.get("/api/v1/orders/").status_code, status.HTTP_200_OK)
+
+        queries = self.assertQueriesDoNotScale((1, 20), setup, order_list)
+        self.assertLessEqual(queries, 4)
+
+    def test_cancel_queries_do_not_scale_with_items(self):
+        """Cancelling an order of 1 or 50 lines costs the same queries."""
+        def cancel(user):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(f"/api/v1/orders/{user.order_id}/cancel/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        queries = self.assertQueriesDoNotScale((1, 50), self.place_order, cancel)
+        self.assertLessEqual(queries, 7)
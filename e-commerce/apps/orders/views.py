@@ -3,15 +3,32 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django.db.models import Prefetch
+from django.utils import timezone
 
 from .models import Order, OrderItem, OrderStatusHistory
 from .serializers import OrderListSerializer, OrderDetailSerializer
 from apps.cart.models import Cart
 from apps.users.models import Address
 from apps.products.models import Product
+from apps.products.views import product_list_queryset
+from utils.metrics import checkouts, stock_outs
 from utils.pagination import StandardPagination
 
 
+def order_detail_queryset():
+    """
+    Orders with everything OrderDetailSerializer reads: items with their
+    variants and listed products, status history with its authors, and
+    addresses, in a constant number of queries whatever the item count.
+    """
+    return Order.objects.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('variant').prefetch_related(
+            Prefetch('product', queryset=product_list_queryset(active_only=False))
+        )),
+        Prefetch('status_history', queryset=OrderStatusHistory.objects.select_related('created_by').order_by('-created_at')),
+    ).select_related('shipping_address', 'billing_address')
+
+
 class OrderListCreateView(generics.ListCreateAPIView):
     """List user orders and create new order (checkout) with optimized queries"""
     
@@ -38,6 +55,15 @@ class OrderListCreateView(generics.ListCreateAPIView):
             return OrderDetailSerializer
         return OrderListSerializer
     
+    def create(self, request, *args, **kwargs):
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            checkouts.labels('failure').inc()
+            raise
+        checkouts.labels('success').inc()
+        return response
+    
     @transaction.atomic
     def perform_create(self, serializer):
         """Create order from cart with transaction safety"""
@@ -71,12 +97,14 @@ class OrderListCreateView(generics.ListCreateAPIView):
             discount=discount,
             total_amount=total_amount,
             shipping_address=shipping_address,
-            billing_address=billing_address
+            billing_address=billing_address,
+            notes=serializer.validated_data.get('notes', '')
         )
         
         # Batch create order items (more efficient than individual creates)
         cart_items = cart.items.select_related('product', 'variant')
         order_items = []
+        sold_out = 0
         
         for cart_item in cart_items:
             order_items.append(OrderItem(
@@ -86,12 +114,17 @@ class OrderListCreateView(generics.ListCreateAPIView):
                 product_name=cart_item.product.name,
                 product_sku=cart_item.variant.sku if cart_item.variant else cart_item.product.sku,
                 price=cart_item.price,
-                quantity=cart_item.quantity
+                quantity=cart_item.quantity,
+                subtotal=cart_item.total_price  # bulk_create skips OrderItem.save()
             ))
             
             # Update product quantity (track inventory changes)
             if cart_item.product.track_inventory:
+                in_stock = cart_item.product.quantity > 0
                 cart_item.product.quantity -= cart_item.quantity
+                cart_item.product.stock_updated_at = timezone.now()
+                if in_stock and cart_item.product.quantity <= 0:
+                    sold_out += 1
         
         # Bulk create order items
         OrderItem.objects.bulk_create(order_items)
@@ -99,18 +132,23 @@ class OrderListCreateView(generics.ListCreateAPIView):
         # Bulk update products (more efficient)
         Product.objects.bulk_update(
             [item.product for item in cart_items if item.product.track_inventory],
-            ['quantity']
+            ['quantity', 'stock_updated_at']
         )
         
         # Clear cart
         cart.clear()
         
+        if sold_out:
+            transaction.on_commit(lambda: stock_outs.inc(sold_out))
+        
         # Create order status history
         OrderStatusHistory.objects.create(
             order=order,
             status='pending',
             note='Order created'
         )
+        
+        serializer.instance = order_detail_queryset().get(pk=order.pk)
 
 
 class OrderDetailView(generics.RetrieveAPIView):
@@ -121,12 +159,7 @@ class OrderDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         # Optimize: prefetch all related data
-        return Order.objects.filter(
-            user=self.request.user
-        ).prefetch_related(
-            Prefetch('items', queryset=OrderItem.objects.select_related('product', 'variant')),
-            Prefetch('status_history', queryset=OrderStatusHistory.objects.order_by('-created_at'))
-        ).select_related('shipping_address', 'billing_address')
+        return order_detail_queryset().filter(user=self.request.user)
 
 
 class CancelOrderView(generics.GenericAPIView):
@@ -151,11 +184,12 @@ class CancelOrderView(generics.GenericAPIView):
         for order_item in order_items:
             if order_item.product.track_inventory:
                 order_item.product.quantity += order_item.quantity
+                order_item.product.stock_updated_at = timezone.now()
         
         # Bulk update all products at once (more efficient)
         Product.objects.bulk_update(
             [item.product for item in order_items if item.product.track_inventory],
-            ['quantity']
+            ['quantity', 'stock_updated_at']
         )
         
         # Update order status
@@ -1,6 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Payment
+from .models import Payment, WebhookEvent
+from .services import refund_payment
+from utils.exceptions import PaymentError
 
 
 @admin.register(Payment)
@@ -10,6 +12,7 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ['payment_method', 'status', 'created_at']
     search_fields = ['order__order_number', 'transaction_id']
     readonly_fields = ['id', 'transaction_id', 'created_at', 'updated_at']
+    actions = ['refund']
     
     fieldsets = (
         ('Payment Info', {'fields': ('id', 'order', 'payment_method', 'transaction_id')}),
@@ -31,3 +34,27 @@ class PaymentAdmin(admin.ModelAdmin):
             color, obj.get_status_display()
         )
     status_badge.short_description = 'Status'
+    
+    @admin.action(description='Refund selected payments')
+    def refund(self, request, queryset):
+        """Refund completed payments in full through their providers"""
+        refunded = 0
+        for payment in queryset.filter(status='completed'):
+            try:
+                refund_payment(payment)
+                refunded += 1
+            except PaymentError as e:
+                self.message_user(request, f"{payment}: {e.detail}", messages.ERROR)
+        self.message_user(request, f"{refunded} payment(s) refunded.")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """Admin for WebhookEvent model (read-only audit trail)"""
+    list_display = ['event_id', 'event_type', 'payment_intent_id', 'status', 'attempts', 'gateway_created', 'received_at']
+    list_filter = ['event_type', 'status', 'received_at']
+    search_fields = ['event_id', 'payment_intent_id', 'order_id']
+    readonly_fields = [field.name for field in WebhookEvent._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,106 @@
+"""
+Async payment views for ASGI deployments.
+
+Same URLs, request data and JSON as the DRF views in views.py. Providers
+are called through their async variants, so a slow gateway suspends the
+request instead of blocking a worker; the order/payment writes still run in one
+transaction on a worker thread (Django 5.0 has no async transactions).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import exceptions, permissions
+
+from .models import Payment
+from .providers import get_provider
+from .services import CONFIRMED_STATUSES, apply_confirmation
+from apps.orders.models import Order
+from utils.async_api import AsyncAPIView
+from utils.exceptions import PaymentError
+
+
+async def get_user_order(user, order_id) -> Order:
+    """Async counterpart of get_object_or_404(Order, id=order_id, user=user)"""
+    try:
+        return await Order.objects.aget(id=order_id, user=user)
+    except (Order.DoesNotExist, DjangoValidationError):
+        raise exceptions.NotFound('No Order matches the given query.')
+
+
+class AsyncCreatePaymentIntentView(AsyncAPIView):
+    """Create a payment intent with the order's provider (async)"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def post(self, request):
+        order = await get_user_order(request.user, request.data.get('order_id'))
+        payment_method = request.data.get('payment_method', settings.PAYMENT_DEFAULT_METHOD)
+
+        try:
+            provider = get_provider(payment_method)
+            intent = await provider.acreate_intent(order, idempotency_key=f'payment-intent-{order.id}')
+
+            await Payment.objects.aget_or_create(
+                order=order,
+                defaults={
+                    'payment_method': payment_method,
+                    'amount': order.total_amount,
+                    'status': 'pending'
+                }
+            )
+        except PaymentError as e:
+            raise exceptions.ValidationError({'error': str(e.detail)})
+
+        return {
+            'client_secret': intent['client_secret'],
+            'payment_intent_id': intent['id']
+        }
+
+
+class AsyncConfirmPaymentView(AsyncAPIView):
+    """Confirm payment (async; the provider is only queried if the webhook has not completed it)"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def post(self, request):
+        order = await get_user_order(request.user, request.data.get('order_id'))
+
+        if await Payment.objects.filter(order=order, status='completed').aexists():
+            return {
+                'message': 'Payment confirmed successfully',
+                'order_id': str(order.id)
+            }
+
+        try:
+            payment_method = (
+                await Payment.objects.filter(order=order).values_list('payment_method', flat=True).afirst()
+                or settings.PAYMENT_DEFAULT_METHOD
+            )
+            provider = get_provider(payment_method)
+            intent = await provider.aconfirm(request.data.get('payment_intent_id'))
+        except PaymentError as e:
+            raise exceptions.ValidationError({'error': str(e.detail)})
+
+        if intent['status'] not in CONFIRMED_STATUSES:
+            raise exceptions.ValidationError({
+                'error': 'Payment not completed',
+                'status': intent['status']
+            })
+
+        try:
+            await sync_to_async(self.confirm_payment)(order, intent)
+        except Payment.DoesNotExist as e:
+            raise exceptions.ValidationError({'error': str(e)})
+
+        return {
+            'message': 'Payment confirmed successfully',
+            'order_id': str(order.id)
+        }
+
+    @staticmethod
+    def confirm_payment(order, intent):
+        """Apply the confirmation and start processing the order"""
+        with transaction.atomic():
+            payment = Payment.objects.select_for_update().select_related('order').get(order=order)
+            apply_confirmation(payment, intent)
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:35
+
+import utils.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_order_fk_without_db_constraint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookEvent",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.ids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("event_id", models.CharField(max_length=255, unique=True)),
+                ("event_type", models.CharField(max_length=100)),
+                ("payment_intent_id", models.CharField(blank=True, max_length=255)),
+                ("order_id", models.UUIDField(blank=True, null=True)),
+                (
+                    "gateway_created",
+                    models.DateTimeField(
+                        help_text="When the gateway created the event"
+                    ),
+                ),
+                ("payload", models.JSONField(default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processed", "Processed"),
+                            ("ignored", "Ignored"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "webhook_events",
+                "ordering": ["gateway_created"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "gateway_created"],
+                        name="webhook_eve_status_5f68cd_idx",
+                    ),
+                    models.Index(
+                        fields=["payment_intent_id"],
+                        name="webhook_eve_payment_b40b7f_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_webhook_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="webhookevent",
+            index=models.Index(
+                fields=["status", "next_attempt_at"],
+                name="webhook_eve_status_8017be_idx",
+            ),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from apps.orders.models import Order
 import uuid
+from utils.ids import uuid7
 
 
 class Payment(models.Model):
@@ -20,7 +22,8 @@ class Payment(models.Model):
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
+    # No database constraint: orders can be a partitioned table (utils.partitioning)
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment', db_constraint=False)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     transaction_id = models.CharField(max_length=200, unique=True, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -42,3 +45,48 @@ class Payment(models.Model):
     
     def __str__(self):
         return f"Payment for {self.order.order_number}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Verified gateway webhook stored for background processing.
+
+    The unique event_id makes redeliveries no-ops; gateway_created orders
+    events for the same payment intent when they arrive out of order.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=255, blank=True)
+    order_id = models.UUIDField(null=True, blank=True)
+    gateway_created = models.DateTimeField(help_text="When the gateway created the event")
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Earliest time a deferred event may be claimed again
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
+    # Timestamps
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'webhook_events'
+        ordering = ['gateway_created']
+        indexes = [
+            models.Index(fields=['status', 'gateway_created']),
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['payment_intent_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
@@ -0,0 +1,304 @@
+"""
+Payment providers.
+
+Views and services talk to a PaymentProvider instead of a gateway SDK:
+- create_intent / confirm return Stripe-shaped intent dicts
+  (id, client_secret, status, latest_charge)
+- refund returns a refund dict (id, status)
+- parse_webhook verifies a delivery and returns the event dict that
+  webhooks.record_event stores
+
+PAYMENT_PROVIDERS maps Payment.payment_method values to provider classes.
+With PAYMENT_SIMULATOR=True card payments go to SimulatorProvider, which
+answers in-process with configurable latency, error and decline rates, so
+checkout -> pay -> confirm can be load tested offline and under a
+degraded gateway.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .services import CircuitBreaker, async_stripe, stripe_gateway
+from utils.exceptions import PaymentError
+
+
+def amount_in_cents(amount) -> int:
+    return int(amount * 100)
+
+
+class PaymentProvider:
+    """
+    Base provider. Subclasses implement the blocking calls; the async
+    variants default to running them on a worker thread.
+    """
+
+    name = None
+
+    def create_intent(self, order, idempotency_key: str = None) -> dict:
+        raise NotImplementedError
+
+    def confirm(self, intent_id: str) -> dict:
+        raise NotImplementedError
+
+    def refund(self, payment, amount=None, idempotency_key: str = None) -> dict:
+        raise NotImplementedError
+
+    def parse_webhook(self, payload: bytes, headers) -> dict:
+        """
+        Raises:
+            PaymentError: If the delivery cannot be verified
+        """
+        raise PaymentError(f"The {self.name} provider does not send webhooks.")
+
+    async def acreate_intent(self, order, idempotency_key: str = None) -> dict:
+        return await sync_to_async(self.create_intent, thread_sensitive=False)(order, idempotency_key)
+
+    async def aconfirm(self, intent_id: str) -> dict:
+        return await sync_to_async(self.confirm, thread_sensitive=False)(intent_id)
+
+
+class StripeWebhookMixin:
+    """Stripe's signed webhook format (Stripe-Signature header, STRIPE_WEBHOOK_SECRET)"""
+
+    def parse_webhook(self, payload: bytes, headers) -> dict:
+        try:
+            stripe.Webhook.construct_event(payload, headers.get('Stripe-Signature'), settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.error.SignatureVerificationError):
+            raise PaymentError('Invalid signature')
+        return json.loads(payload)
+
+
+class StripeProvider(StripeWebhookMixin, PaymentProvider):
+    """Card payments through the pooled Stripe clients in services.py"""
+
+    name = 'stripe'
+
+    @staticmethod
+    def intent_params(order, idempotency_key: str = None) -> dict:
+        return {
+            'amount': amount_in_cents(order.total_amount),
+            'currency': 'usd',
+            'metadata': {'order_id': str(order.id)},
+            'description': f'Payment for order {order.order_number}',
+            'idempotency_key': idempotency_key,
+        }
+
+    def create_intent(self, order, idempotency_key: str = None) -> dict:
+        return stripe_gateway.create_payment_intent(**self.intent_params(order, idempotency_key))
+
+    def confirm(self, intent_id: str) -> dict:
+        return stripe_gateway.retrieve_payment_intent(intent_id)
+
+    def refund(self, payment, amount=None, idempotency_key: str = None) -> dict:
+        return stripe_gateway.create_refund(
+            payment.transaction_id,
+            amount=amount_in_cents(amount) if amount is not None else None,
+            idempotency_key=idempotency_key,
+        )
+
+    async def acreate_intent(self, order, idempotency_key: str = None) -> dict:
+        return await async_stripe.create_payment_intent(**self.intent_params(order, idempotency_key))
+
+    async def aconfirm(self, intent_id: str) -> dict:
+        return await async_stripe.retrieve_payment_intent(intent_id)
+
+
+class CashOnDeliveryProvider(PaymentProvider):
+    """
+    Cash on delivery: confirming accepts the order for processing and the
+    payment stays pending until the cash is collected.
+    """
+
+    name = 'cod'
+
+    def create_intent(self, order, idempotency_key: str = None) -> dict:
+        return {
+            'id': f'cod_{order.id.hex}',
+            'client_secret': None,
+            'status': 'requires_confirmation',
+        }
+
+    def confirm(self, intent_id: str) -> dict:
+        if not intent_id or not intent_id.startswith('cod_'):
+            raise PaymentError('Invalid cash on delivery reference.')
+        return {'id': intent_id, 'status': 'pending_collection'}
+
+    def refund(self, payment, amount=None, idempotency_key: str = None) -> dict:
+        # Cash is returned by the courier; nothing to call
+        return {'id': f'cod_refund_{uuid.uuid4().hex}', 'status': 'succeeded'}
+
+    async def acreate_intent(self, order, idempotency_key: str = None) -> dict:
+        return self.create_intent(order, idempotency_key)
+
+    async def aconfirm(self, intent_id: str) -> dict:
+        return self.confirm(intent_id)
+
+
+class SimulatorProvider(StripeWebhookMixin, PaymentProvider):
+    """
+    In-process gateway simulator for load tests.
+
+    Algorithm: Every call waits PAYMENT_SIMULATOR_LATENCY seconds (+/- 50%
+    jitter; asyncio.sleep in the async variants). A call then fails with a
+    gateway error at PAYMENT_SIMULATOR_FAILURE_RATE, or hangs for
+    STRIPE_API_TIMEOUT and times out at PAYMENT_SIMULATOR_TIMEOUT_RATE;
+    both count against the simulator's own circuit breaker exactly like
+    real gateway failures. Confirmations are declined at
+    PAYMENT_SIMULATOR_DECLINE_RATE. Intents live in a bounded in-memory
+    table, and creating an intent or refund twice with one idempotency key
+    returns the same one.
+    """
+
+    name = 'simulator'
+    max_intents = 100000
+
+    def __init__(self, latency: float = None, failure_rate: float = None, timeout_rate: float = None,
+                 decline_rate: float = None, seed: int = None):
+        self.latency = settings.PAYMENT_SIMULATOR_LATENCY if latency is None else latency
+        self.failure_rate = settings.PAYMENT_SIMULATOR_FAILURE_RATE if failure_rate is None else failure_rate
+        self.timeout_rate = settings.PAYMENT_SIMULATOR_TIMEOUT_RATE if timeout_rate is None else timeout_rate
+        self.decline_rate = settings.PAYMENT_SIMULATOR_DECLINE_RATE if decline_rate is None else decline_rate
+        self.random = random.Random(seed)
+        self.breaker = CircuitBreaker('simulator')
+        self._intents = OrderedDict()
+        self._idempotency = {}
+        self._intent_keys = {}
+        self._lock = threading.Lock()
+
+    def _outcome(self):
+        """
+        Decide the fate of one call.
+
+        Returns:
+            Tuple of (seconds to wait, error message or None)
+        """
+        self.breaker.before_call()
+        delay = self.latency * self.random.uniform(0.5, 1.5)
+        roll = self.random.random()
+        if roll < self.timeout_rate:
+            return settings.STRIPE_API_TIMEOUT, 'Payment gateway unavailable: simulated timeout'
+        if roll < self.timeout_rate + self.failure_rate:
+            return delay, 'Payment gateway error (503)'
+        return delay, None
+
+    def _settle(self, error):
+        if error:
+            self.breaker.record_failure()
+            raise PaymentError(error)
+        self.breaker.record_success()
+
+    def _store_intent(self, order, idempotency_key: str = None) -> dict:
+        with self._lock:
+            if idempotency_key in self._idempotency:
+                return dict(self._intents[self._idempotency[idempotency_key]])
+
+            intent_id = f'pi_sim_{uuid.uuid4().hex}'
+            self._intents[intent_id] = {
+                'id': intent_id,
+                'client_secret': f'{intent_id}_secret_{uuid.uuid4().hex[:12]}',
+                'status': 'requires_confirmation',
+                'amount': amount_in_cents(order.total_amount),
+                'metadata': {'order_id': str(order.id)},
+            }
+            if idempotency_key:
+                self._idempotency[idempotency_key] = intent_id
+                self._intent_keys[intent_id] = idempotency_key
+
+            while len(self._intents) > self.max_intents:
+                evicted, _ = self._intents.popitem(last=False)
+                self._idempotency.pop(self._intent_keys.pop(evicted, None), None)
+            return dict(self._intents[intent_id])
+
+    def _confirm_intent(self, intent_id: str) -> dict:
+        with self._lock:
+            intent = self._intents.get(intent_id)
+            if intent is None:
+                raise PaymentError(f"No such payment_intent: '{intent_id}'")
+            if intent['status'] == 'requires_confirmation':
+                if self.random.random() < self.decline_rate:
+                    intent['status'] = 'requires_payment_method'
+                    intent['last_payment_error'] = {'message': 'Your card was declined.'}
+                else:
+                    intent['status'] = 'succeeded'
+                    intent['latest_charge'] = f'ch_sim_{uuid.uuid4().hex}'
+            return dict(intent)
+
+    def create_intent(self, order, idempotency_key: str = None) -> dict:
+        delay, error = self._outcome()
+        time.sleep(delay)
+        self._settle(error)
+        return self._store_intent(order, idempotency_key)
+
+    def confirm(self, intent_id: str) -> dict:
+        delay, error = self._outcome()
+        time.sleep(delay)
+        self._settle(error)
+        return self._confirm_intent(intent_id)
+
+    def refund(self, payment, amount=None, idempotency_key: str = None) -> dict:
+        delay, error = self._outcome()
+        time.sleep(delay)
+        self._settle(error)
+        with self._lock:
+            refund_id = self._idempotency.get(idempotency_key) or f're_sim_{uuid.uuid4().hex}'
+            if idempotency_key:
+                self._idempotency[idempotency_key] = refund_id
+        return {'id': refund_id, 'status': 'succeeded'}
+
+    async def acreate_intent(self, order, idempotency_key: str = None) -> dict:
+        delay, error = self._outcome()
+        await asyncio.sleep(delay)
+        self._settle(error)
+        return self._store_intent(order, idempotency_key)
+
+    async def aconfirm(self, intent_id: str) -> dict:
+        delay, error = self._outcome()
+        await asyncio.sleep(delay)
+        self._settle(error)
+        return self._confirm_intent(intent_id)
+
+    def webhook_event(self, intent_id: str) -> dict:
+        """Stripe-shaped event for an intent's current state (for load tests)"""
+        with self._lock:
+            intent = dict(self._intents[intent_id])
+        event_type = 'payment_intent.succeeded' if intent['status'] == 'succeeded' else 'payment_intent.payment_failed'
+        return {
+            'id': f'evt_sim_{uuid.uuid4().hex}',
+            'type': event_type,
+            'created': int(time.time()),
+            'data': {'object': intent},
+        }
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(payment_method: str) -> PaymentProvider:
+    """
+    Provider instance for a Payment.payment_method value (one per process).
+
+    Raises:
+        PaymentError: If no provider is configured for the method
+    """
+    path = settings.PAYMENT_PROVIDERS.get(payment_method)
+    if path is None:
+        raise PaymentError(f"Payment method '{payment_method}' is not available.")
+
+    provider = _providers.get(path)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(path)
+            if provider is None:
+                provider = _providers[path] = import_string(path)()
+    return provider
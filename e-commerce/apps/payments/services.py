@@ -0,0 +1,519 @@
+"""
+Payment services: gateway clients and payment state transitions
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from utils.exceptions import PaymentError
+from utils.transactions import outside_transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _form_encode(data: dict, prefix: str = '') -> list:
+    """Flatten nested dicts into Stripe's form encoding (metadata[order_id]=...)"""
+    pairs = []
+    for key, value in data.items():
+        name = f'{prefix}[{key}]' if prefix else key
+        if isinstance(value, dict):
+            pairs.extend(_form_encode(value, name))
+        elif value is not None:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker for an external service.
+
+    Algorithm: The circuit opens after failure_threshold consecutive failed
+    calls; while open, calls fail immediately with PaymentError instead of
+    waiting on a degraded gateway. After recovery_timeout seconds a single
+    trial call is let through (half-open): success closes the circuit,
+    failure opens it for another recovery_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = None, recovery_timeout: float = None):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def failure_threshold(self) -> int:
+        return self._failure_threshold or settings.PAYMENT_BREAKER_FAILURE_THRESHOLD
+
+    @property
+    def recovery_timeout(self) -> float:
+        return self._recovery_timeout or settings.PAYMENT_BREAKER_RECOVERY_TIMEOUT
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def before_call(self):
+        """
+        Raises:
+            PaymentError: If the circuit is open (or a half-open trial is in flight)
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise PaymentError(f"Payment gateway {self.name} is temporarily unavailable; please retry shortly.")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN or self._trial_in_flight:
+                    logger.warning(f"Circuit for payment gateway {self.name} opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def reset(self):
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+
+stripe_breaker = CircuitBreaker('stripe')
+
+
+class StripeClientBase:
+    """
+    Request policy shared by the sync and async Stripe clients.
+
+    - Keep-alive connection pool per process (per event loop for async)
+    - Per-call timeouts (connect and overall)
+    - Retries with exponential backoff and jitter for network errors, 409,
+      429 and 5xx responses; only idempotent calls are retried: GETs and
+      POSTs carrying an idempotency key (generated when the caller has none)
+    - One circuit breaker per gateway, shared by both clients
+    """
+
+    RETRYABLE_STATUS = {409, 429, 500, 502, 503, 504}
+
+    def __init__(self, api_key: str = None, api_base: str = None, timeout: float = None,
+                 max_retries: int = None, breaker: CircuitBreaker = None, transport=None):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or stripe_breaker
+        self.transport = transport
+        self._client = None
+
+    def _client_options(self) -> dict:
+        return {
+            'base_url': f"{self.api_base or settings.STRIPE_API_BASE}/v1",
+            'timeout': self._timeout(),
+            'limits': httpx.Limits(
+                max_connections=settings.STRIPE_POOL_MAXSIZE,
+                max_keepalive_connections=settings.STRIPE_POOL_MAXSIZE,
+            ),
+            'transport': self.transport,
+        }
+
+    def _timeout(self, timeout: float = None) -> httpx.Timeout:
+        return httpx.Timeout(
+            timeout or self.timeout or settings.STRIPE_API_TIMEOUT,
+            connect=settings.STRIPE_CONNECT_TIMEOUT,
+        )
+
+    def _prepare(self, method: str, data: dict = None, idempotency_key: str = None):
+        """Headers and body for a call; POSTs always get an idempotency key"""
+        headers = {'Authorization': f'Bearer {self.api_key or settings.STRIPE_SECRET_KEY}'}
+        content = None
+        if data:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            content = urlencode(_form_encode(data))
+        if method == 'POST':
+            headers['Idempotency-Key'] = idempotency_key or str(uuid.uuid4())
+        return headers, content
+
+    @property
+    def retries(self) -> int:
+        return settings.STRIPE_MAX_RETRIES if self.max_retries is None else self.max_retries
+
+    def _should_retry(self, response) -> bool:
+        # Stripe says explicitly whether a failed request is safe to retry
+        should_retry = response.headers.get('Stripe-Should-Retry')
+        if should_retry is not None:
+            return should_retry == 'true'
+        return response.status_code in self.RETRYABLE_STATUS
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        delay = settings.STRIPE_RETRY_BACKOFF * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def _result(self, response) -> dict:
+        """
+        Decode a final response and update the circuit breaker.
+
+        Raises:
+            PaymentError: If the gateway rejected the request
+        """
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.status_code >= 500 or response.status_code == 429 or not payload:
+            self.breaker.record_failure()
+            raise PaymentError(f"Payment gateway error ({response.status_code})")
+
+        # Client errors (declines, validation) mean the gateway is healthy
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise PaymentError(payload.get('error', {}).get('message', 'Payment gateway error'))
+        return payload
+
+    def _network_failure(self, method: str, path: str, error):
+        self.breaker.record_failure()
+        logger.error(f"Stripe {method} {path} failed: {error}")
+        return PaymentError(f"Payment gateway unavailable: {error}")
+
+
+class StripeClient(StripeClientBase):
+    """Blocking Stripe API client over a shared httpx.Client"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    def request(self, method: str, path: str, data: dict = None, idempotency_key: str = None,
+                timeout: float = None) -> dict:
+        """
+        Call the Stripe API.
+
+        Raises:
+            PaymentError: If the circuit is open, the gateway is unreachable
+                or it rejects the request
+        """
+        self.breaker.before_call()
+        headers, content = self._prepare(method, data, idempotency_key)
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = self._get_client().request(
+                    method, path, content=content, headers=headers, timeout=self._timeout(timeout)
+                )
+            except httpx.HTTPError as e:
+                if last_attempt:
+                    raise self._network_failure(method, path, e)
+            else:
+                if last_attempt or not self._should_retry(response):
+                    return self._result(response)
+            time.sleep(self._backoff(attempt))
+
+    def create_payment_intent(self, amount: int, currency: str, metadata: dict = None,
+                              description: str = '', idempotency_key: str = None) -> dict:
+        return self.request('POST', '/payment_intents', {
+            'amount': amount,
+            'currency': currency,
+            'metadata': metadata or {},
+            'description': description,
+        }, idempotency_key=idempotency_key)
+
+    def retrieve_payment_intent(self, payment_intent_id: str) -> dict:
+        return self.request('GET', f'/payment_intents/{payment_intent_id}')
+
+    def create_refund(self, payment_intent_id: str, amount: int = None, idempotency_key: str = None) -> dict:
+        return self.request('POST', '/refunds', {
+            'payment_intent': payment_intent_id,
+            'amount': amount,
+        }, idempotency_key=idempotency_key)
+
+    def reset(self):
+        """Drop the connection pool (e.g. in a forked child)"""
+        self._client = None
+
+
+class AsyncStripeClient(StripeClientBase):
+    """
+    Async Stripe API client for the ASGI payment views.
+
+    A slow gateway call suspends the request coroutine instead of holding a
+    worker thread. An httpx.AsyncClient cannot be shared across event
+    loops, so the pool is created lazily per loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(**self._client_options())
+            self._loop = loop
+        return self._client
+
+    async def request(self, method: str, path: str, data: dict = None, idempotency_key: str = None,
+                      timeout: float = None) -> dict:
+        """
+        Call the Stripe API.
+
+        Raises:
+            PaymentError: If the circuit is open, the gateway is unreachable
+                or it rejects the request
+        """
+        self.breaker.before_call()
+        headers, content = self._prepare(method, data, idempotency_key)
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = await self._get_client().request(
+                    method, path, content=content, headers=headers, timeout=self._timeout(timeout)
+                )
+            except httpx.HTTPError as e:
+                if last_attempt:
+                    raise self._network_failure(method, path, e)
+            else:
+                if last_attempt or not self._should_retry(response):
+                    return self._result(response)
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def create_payment_intent(self, amount: int, currency: str, metadata: dict = None,
+                                    description: str = '', idempotency_key: str = None) -> dict:
+        return await self.request('POST', '/payment_intents', {
+            'amount': amount,
+            'currency': currency,
+            'metadata': metadata or {},
+            'description': description,
+        }, idempotency_key=idempotency_key)
+
+    async def retrieve_payment_intent(self, payment_intent_id: str) -> dict:
+        return await self.request('GET', f'/payment_intents/{payment_intent_id}')
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+stripe_gateway = StripeClient()
+async_stripe = AsyncStripeClient()
+
+# A forked worker must not reuse its parent's sockets
+os.register_at_fork(after_in_child=stripe_gateway.reset)
+
+
+def start_processing(order, note: str):
+    """Move a pending order to processing with a status history entry"""
+    from apps.orders.models import OrderStatusHistory
+
+    if order.status != 'pending':
+        return
+    order.status = 'processing'
+    order.save(update_fields=['status', 'updated_at'])
+
+    OrderStatusHistory.objects.create(order=order, status='processing', note=note)
+
+
+def complete_payment(payment, payment_intent_id: str, charge_id: str = None) -> bool:
+    """
+    Mark a payment completed and start processing its order.
+
+    Shared by the confirm views and webhook processing; call inside a
+    transaction with the payment row locked. Idempotent: a payment that is
+    already completed is left unchanged.
+
+    Returns:
+        True if the payment changed
+    """
+    if payment.status == 'completed':
+        return False
+
+    payment.status = 'completed'
+    payment.transaction_id = payment_intent_id
+    payment.payment_date = timezone.now()
+    payment.metadata = {
+        **payment.metadata,
+        'stripe_payment_intent': payment_intent_id,
+        'stripe_charge_id': charge_id,
+    }
+    payment.save()
+
+    start_processing(payment.order, 'Payment confirmed. Order processing started.')
+    return True
+
+
+def accept_cash_on_delivery(payment, reference: str) -> bool:
+    """
+    Accept a cash on delivery order for processing; the payment stays
+    pending until the cash is collected. Call with the payment row locked.
+
+    Returns:
+        True if the payment changed
+    """
+    if payment.status != 'pending' or payment.transaction_id == reference:
+        return False
+
+    payment.transaction_id = reference
+    payment.save(update_fields=['transaction_id', 'updated_at'])
+
+    start_processing(payment.order, 'Cash on delivery accepted. Order processing started.')
+    return True
+
+
+# Provider intent statuses that let the order go ahead
+CONFIRMED_STATUSES = ('succeeded', 'pending_collection')
+
+
+def apply_confirmation(payment, intent: dict) -> bool:
+    """
+    Apply a provider's confirmation result to a locked payment.
+
+    Raises:
+        PaymentError: If the provider has not completed the payment
+    """
+    if intent['status'] == 'succeeded':
+        return complete_payment(payment, intent['id'], intent.get('latest_charge'))
+    if intent['status'] == 'pending_collection':
+        return accept_cash_on_delivery(payment, intent['id'])
+    raise PaymentError('Payment not completed')
+
+
+def fail_payment(payment, reason: str = '') -> bool:
+    """
+    Mark a pending payment failed (completed and refunded payments are final).
+
+    Returns:
+        True if the payment changed
+    """
+    if payment.status in ('completed', 'refunded', 'failed'):
+        return False
+
+    payment.status = 'failed'
+    payment.metadata = {**payment.metadata, 'failure_reason': reason}
+    payment.save(update_fields=['status', 'metadata', 'updated_at'])
+    return True
+
+
+def refund_payment(payment, amount=None):
+    """
+    Refund a completed payment through its provider.
+
+    Algorithm: Under the payment's row lock the amount is checked against
+    the balance not yet refunded or reserved by refunds in flight, and
+    reserved under a new refund attempt id, which is the provider's
+    idempotency key. The provider is called outside any transaction, then
+    the outcome is recorded under the lock again (_record_refund). Concurrent
+    refunds can never exceed the payment amount, two partial refunds of the
+    same amount are two refunds, and a refund id the provider returns twice
+    is counted once. The payment becomes 'refunded' once the refunds cover
+    the full amount.
+
+    Args:
+        payment: Completed Payment
+        amount: Decimal amount to refund (default: the remaining balance)
+
+    Returns:
+        Updated Payment
+
+    Raises:
+        PaymentError: If the payment cannot be refunded or the provider fails
+    """
+    from .models import Payment
+    from .providers import get_provider
+
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=payment.pk)
+        if payment.status != 'completed':
+            raise PaymentError('Only completed payments can be refunded.')
+        pending = payment.metadata.get('pending_refunds', {})
+        remaining = (
+            payment.amount
+            - Decimal(payment.metadata.get('refunded_amount', '0'))
+            - sum((Decimal(reserved) for reserved in pending.values()), Decimal('0'))
+        )
+        amount = remaining if amount is None else Decimal(amount)
+        if amount <= 0 or amount > remaining:
+            raise PaymentError(f"Refund amount must be between 0 and {remaining}.")
+        attempt = uuid.uuid4().hex
+        payment.metadata = {**payment.metadata, 'pending_refunds': {**pending, attempt: str(amount)}}
+        payment.save(update_fields=['metadata', 'updated_at'])
+
+    try:
+        with outside_transaction():
+            refund = get_provider(payment.payment_method).refund(
+                payment, amount, idempotency_key=f'refund-{payment.id}-{attempt}'
+            )
+    except Exception:
+        _record_refund(payment, attempt)
+        raise
+
+    payment = _record_refund(payment, attempt, refund['id'])
+    logger.info(f"Refunded {amount} of payment {payment.id} ({refund['id']})")
+    return payment
+
+
+def _record_refund(payment, attempt: str, refund_id: str = None):
+    """Count a reserved refund attempt under the payment's row lock, or release it when refund_id is None"""
+    from .models import Payment
+
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=payment.pk)
+        pending = dict(payment.metadata.get('pending_refunds', {}))
+        amount = Decimal(pending.pop(attempt, '0'))
+        refunded = Decimal(payment.metadata.get('refunded_amount', '0'))
+        refund_ids = payment.metadata.get('refund_ids', [])
+        if refund_id in refund_ids:
+            logger.warning(f"Refund {refund_id} of payment {payment.id} was already recorded")
+        elif refund_id:
+            refunded += amount
+            refund_ids = refund_ids + [refund_id]
+
+        payment.metadata = {
+            **payment.metadata,
+            'refunded_amount': str(refunded),
+            'refund_ids': refund_ids,
+            'pending_refunds': pending,
+        }
+        if not pending:
+            del payment.metadata['pending_refunds']
+        if refunded >= payment.amount:
+            payment.status = 'refunded'
+        payment.save(update_fields=['status', 'metadata', 'updated_at'])
+    return payment
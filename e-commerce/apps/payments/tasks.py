@@ -0,0 +1,55 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_webhook_events():
+    """Apply pending gateway webhook events in batches"""
+    try:
+        from apps.payments.webhooks import process_pending
+        
+        totals = {'processed': 0, 'ignored': 0, 'deferred': 0, 'failed': 0}
+        while True:
+            result = process_pending()
+            for key in totals:
+                totals[key] += result[key]
+            # Stop when nothing was due; deferred events wait out their backoff
+            if result['claimed'] == result['deferred']:
+                break
+        
+        logger.info(
+            f"Webhook processing completed: {totals['processed']} processed, {totals['ignored']} ignored, "
+            f"{totals['deferred']} deferred, {totals['failed']} failed"
+        )
+        return totals
+        
+    except Exception as e:
+        logger.error(f"Error processing webhook events: {str(e)}")
+        raise
+
+
+@shared_task
+def purge_old_webhook_events():
+    """Purge handled webhook events past retention"""
+    try:
+        from datetime import timedelta
+        from django.conf import settings
+        from django.utils import timezone
+        from apps.payments.models import WebhookEvent
+        from utils.purge import purge_queryset
+        
+        result = purge_queryset(
+            WebhookEvent.objects.filter(
+                status__in=['processed', 'ignored', 'failed'],
+                received_at__lt=timezone.now() - timedelta(days=settings.WEBHOOK_RETENTION_DAYS),
+            )
+        )
+        
+        logger.info(f"Webhook event purge completed: {result['deleted']} events")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error purging webhook events: {str(e)}")
+        raise
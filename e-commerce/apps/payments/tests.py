@@ -2,7 +2,9 @@
 Tests for the Payments app.
 """
 import pytest
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -67,3 +69,562 @@ class PaymentAPITests(TestCase):
             status.HTTP_403_FORBIDDEN,
             status.HTTP_404_NOT_FOUND,
         ])
+
+
+@pytest.mark.django_db(transaction=True)
+class PaymentTransactionScopeTests(TransactionTestCase):
+    """Test that payment gateway calls never run inside a transaction."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.orders.models import Order
+        from apps.users.models import Address
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="payer@example.com", password="testpass123")
+        address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Payer", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+        self.order = Order.objects.create(
+            user=self.user, subtotal=20, total_amount=20,
+            shipping_address=address, billing_address=address,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.gateway_calls = []
+
+    def gateway(self, result):
+        """Fake Stripe call recording whether a transaction was open"""
+        from django.db import connection
+
+        def call(*args, **kwargs):
+            self.gateway_calls.append(connection.in_atomic_block)
+            return result
+
+        return call
+
+    def test_no_gateway_io_inside_transaction(self):
+        """Creating and confirming a payment calls Stripe with no transaction open."""
+        from apps.orders.models import Order
+        from apps.payments.models import Payment
+
+        intent = {"id": "pi_123", "client_secret": "secret", "status": "succeeded", "latest_charge": "ch_1"}
+        gateway = "apps.payments.providers.stripe_gateway"
+        with mock.patch(f"{gateway}.create_payment_intent", side_effect=self.gateway(intent)), \
+                mock.patch(f"{gateway}.retrieve_payment_intent", side_effect=self.gateway(intent)):
+            created = self.client.post("/api/v1/payments/create-intent/", {"order_id": str(self.order.id)})
+            confirmed = self.client.post(
+                "/api/v1/payments/confirm/", {"order_id": str(self.order.id), "payment_intent_id": "pi_123"}
+            )
+
+        self.assertEqual(created.status_code, status.HTTP_200_OK)
+        self.assertEqual(confirmed.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.gateway_calls, [False, False])
+        self.assertEqual(Payment.objects.get(order=self.order).status, "completed")
+        self.assertEqual(Order.objects.get(id=self.order.id).status, "processing")
+
+    def test_guard_rejects_io_inside_transaction(self):
+        """External I/O wrapped in outside_transaction fails fast inside an atomic block."""
+        from django.db import transaction
+        from django.db.transaction import TransactionManagementError
+        from utils.transactions import outside_transaction
+
+        with self.assertRaises(TransactionManagementError):
+            with transaction.atomic(), outside_transaction():
+                pass
+
+
+@pytest.mark.django_db(transaction=True)
+class AsyncPaymentViewTests(TransactionTestCase):
+    """Test the async payment views against a fake Stripe API."""
+
+    def setUp(self):
+        """Set up test data."""
+        from rest_framework_simplejwt.tokens import AccessToken
+        from apps.orders.models import Order
+        from apps.users.models import Address
+
+        self.user = User.objects.create_user(email="payer@example.com", password="testpass123")
+        address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Payer", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+        self.order = Order.objects.create(
+            user=self.user, subtotal=20, total_amount=20,
+            shipping_address=address, billing_address=address,
+        )
+        self.token = f"Bearer {AccessToken.for_user(self.user)}"
+        self.gateway_requests = []
+
+    def fake_stripe(self, status_code=200, intent_status="succeeded"):
+        """Async Stripe client whose requests are answered in-process"""
+        import httpx
+        from apps.payments.services import AsyncStripeClient
+
+        def handler(request):
+            self.gateway_requests.append(request)
+            if status_code >= 400:
+                return httpx.Response(status_code, json={"error": {"message": "Your card was declined."}})
+            return httpx.Response(status_code, json={
+                "id": "pi_123", "client_secret": "secret", "status": intent_status, "latest_charge": "ch_1",
+            })
+
+        client = AsyncStripeClient(api_key="sk_test", transport=httpx.MockTransport(handler))
+        return mock.patch("apps.payments.providers.async_stripe", client)
+
+    def async_post(self, view, data, authorization=True):
+        """Call an async view directly and decode its JSON"""
+        import json
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+
+        headers = {"Authorization": self.token} if authorization else None
+        request = AsyncRequestFactory().post(
+            "/", data=json.dumps(data), content_type="application/json", headers=headers
+        )
+        response = async_to_sync(view.as_view())(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_create_and_confirm_payment(self):
+        """The async views create the intent, then confirm and record the payment."""
+        from apps.orders.models import Order
+        from apps.payments.async_views import AsyncConfirmPaymentView, AsyncCreatePaymentIntentView
+        from apps.payments.models import Payment
+
+        with self.fake_stripe():
+            created = self.async_post(AsyncCreatePaymentIntentView, {"order_id": str(self.order.id)})
+            confirmed = self.async_post(
+                AsyncConfirmPaymentView, {"order_id": str(self.order.id), "payment_intent_id": "pi_123"}
+            )
+
+        self.assertEqual(created, (200, {"client_secret": "secret", "payment_intent_id": "pi_123"}))
+        self.assertEqual(confirmed[0], 200)
+        intent_request, retrieve_request = self.gateway_requests
+        self.assertEqual(intent_request.url.path, "/v1/payment_intents")
+        self.assertIn(b"amount=2000", intent_request.content)
+        self.assertIn(b"metadata%5Border_id%5D=" + str(self.order.id).encode(), intent_request.content)
+        self.assertEqual(intent_request.headers["Idempotency-Key"], f"payment-intent-{self.order.id}")
+        self.assertEqual(retrieve_request.url.path, "/v1/payment_intents/pi_123")
+        self.assertEqual(Payment.objects.get(order=self.order).status, "completed")
+        self.assertEqual(Order.objects.get(id=self.order.id).status, "processing")
+
+    def test_gateway_errors_and_auth(self):
+        """Declines and unfinished intents return 400; anonymous callers get 401."""
+        from apps.payments.async_views import AsyncConfirmPaymentView, AsyncCreatePaymentIntentView
+
+        with self.fake_stripe(status_code=402):
+            status_code, data = self.async_post(AsyncCreatePaymentIntentView, {"order_id": str(self.order.id)})
+        self.assertEqual((status_code, data), (400, {"error": "Your card was declined."}))
+
+        with self.fake_stripe(intent_status="processing"):
+            status_code, data = self.async_post(
+                AsyncConfirmPaymentView, {"order_id": str(self.order.id), "payment_intent_id": "pi_123"}
+            )
+        self.assertEqual((status_code, data), (400, {"error": "Payment not completed", "status": "processing"}))
+
+        status_code, _ = self.async_post(
+            AsyncCreatePaymentIntentView, {"order_id": str(self.order.id)}, authorization=False
+        )
+        self.assertEqual(status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(STRIPE_RETRY_BACKOFF=0.01)
+class GatewayClientTests(TestCase):
+    """Test retries, timeouts and the circuit breaker against a local fake gateway."""
+
+    def setUp(self):
+        """Start a fake Stripe API answering from a script of (delay, status) replies."""
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.replies = []
+        self.received = []
+        test = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                test.received.append((self.command, self.path, self.headers.get("Idempotency-Key")))
+                delay, status_code = test.replies.pop(0) if test.replies else (0, 200)
+                time.sleep(delay)
+                if status_code >= 400:
+                    body = {"error": {"message": f"Gateway said {status_code}"}}
+                else:
+                    body = {"id": "pi_123", "client_secret": "secret", "status": "succeeded"}
+                payload = json.dumps(body).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def gateway_clients(self, **kwargs):
+        """Sync and async clients sharing one breaker, pointed at the fake gateway"""
+        from apps.payments.services import AsyncStripeClient, CircuitBreaker, StripeClient
+
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=kwargs.pop("recovery", 60))
+        options = {"api_key": "sk_test", "api_base": f"http://127.0.0.1:{self.server.server_address[1]}",
+                   "breaker": breaker, **kwargs}
+        return StripeClient(**options), AsyncStripeClient(**options)
+
+    def test_idempotent_retries(self):
+        """5xx replies are retried with the same idempotency key; declines are not retried."""
+        client, _ = self.gateway_clients()
+        self.replies = [(0, 503), (0, 500), (0, 200)]
+        intent = client.create_payment_intent(amount=100, currency="usd", idempotency_key="order-1")
+
+        self.assertEqual(intent["id"], "pi_123")
+        self.assertEqual([key for _, _, key in self.received], ["order-1"] * 3)
+
+        self.received.clear()
+        self.replies = [(0, 402)]
+        with self.assertRaisesMessage(Exception, "Gateway said 402"):
+            client.retrieve_payment_intent("pi_123")
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_timeout_opens_circuit(self):
+        """Timed-out calls count as failures; an open circuit fails fast without a request."""
+        from asgiref.sync import async_to_sync
+        from utils.exceptions import PaymentError
+
+        client, async_client = self.gateway_clients(timeout=0.2, max_retries=1)
+        self.replies = [(0.5, 200)] * 2
+        with self.assertRaisesMessage(PaymentError, "Payment gateway unavailable"):
+            client.retrieve_payment_intent("pi_123")
+        self.assertEqual(len(self.received), 2)
+
+        self.replies = [(0, 502)] * 2
+        with self.assertRaisesMessage(PaymentError, "Payment gateway error (502)"):
+            async_to_sync(async_client.retrieve_payment_intent)("pi_123")
+        self.assertEqual(client.breaker.state, "open")
+
+        self.received.clear()
+        with self.assertRaisesMessage(PaymentError, "temporarily unavailable"):
+            client.create_payment_intent(amount=100, currency="usd")
+        with self.assertRaisesMessage(PaymentError, "temporarily unavailable"):
+            async_to_sync(async_client.retrieve_payment_intent)("pi_123")
+        self.assertEqual(self.received, [])
+
+    def test_half_open_recovery(self):
+        """After the recovery timeout one trial call is let through and closes the circuit."""
+        import time
+
+        client, _ = self.gateway_clients(max_retries=0, recovery=0.1)
+        self.replies = [(0, 500), (0, 500)]
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                client.retrieve_payment_intent("pi_123")
+        self.assertEqual(client.breaker.state, "open")
+
+        time.sleep(0.15)
+        self.assertEqual(client.breaker.state, "half_open")
+        self.assertEqual(client.retrieve_payment_intent("pi_123")["status"], "succeeded")
+        self.assertEqual(client.breaker.state, "closed")
+
+
+SIMULATED_PROVIDERS = {
+    "stripe": "apps.payments.providers.SimulatorProvider",
+    "cod": "apps.payments.providers.CashOnDeliveryProvider",
+}
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(PAYMENT_PROVIDERS=SIMULATED_PROVIDERS, PAYMENT_SIMULATOR_LATENCY=0)
+class PaymentProviderTests(TransactionTestCase):
+    """Test checkout payments through the simulator and cash on delivery providers."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.orders.models import Order
+        from apps.payments import providers
+        from apps.users.models import Address
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="payer@example.com", password="testpass123")
+        address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Payer", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+        self.order = Order.objects.create(
+            user=self.user, subtotal=20, total_amount=20,
+            shipping_address=address, billing_address=address,
+        )
+        self.client.force_authenticate(user=self.user)
+        providers._providers.clear()
+        self.addCleanup(providers._providers.clear)
+
+    def pay(self, **data):
+        """Create and confirm a payment for the test order"""
+        created = self.client.post("/api/v1/payments/create-intent/", {"order_id": str(self.order.id), **data})
+        if created.status_code != status.HTTP_200_OK:
+            return created, None
+        confirmed = self.client.post("/api/v1/payments/confirm/", {
+            "order_id": str(self.order.id), "payment_intent_id": created.data["payment_intent_id"],
+        })
+        return created, confirmed
+
+    def test_simulated_checkout_and_refund(self):
+        """The simulator completes the payment end to end; refunds are recorded on the payment."""
+        from apps.payments.models import Payment
+        from apps.payments.services import refund_payment
+
+        created, confirmed = self.pay()
+        self.assertTrue(created.data["payment_intent_id"].startswith("pi_sim_"))
+        self.assertEqual(confirmed.status_code, status.HTTP_200_OK)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "processing")
+
+        payment = refund_payment(Payment.objects.get(order=self.order), amount=5)
+        self.assertEqual((payment.status, payment.metadata["refunded_amount"]), ("completed", "5"))
+        payment = refund_payment(payment)
+        self.assertEqual(payment.status, "refunded")
+        self.assertEqual(len(payment.metadata["refund_ids"]), 2)
+
+    def test_refunds_are_reserved_and_keyed_per_attempt(self):
+        """Equal partial refunds are distinct; replays, failures and racing refunds never over-refund."""
+        from apps.payments.models import Payment
+        from apps.payments.providers import get_provider
+        from apps.payments.services import refund_payment
+        from utils.exceptions import PaymentError
+
+        self.pay()
+        payment = Payment.objects.get(order=self.order)
+        simulator = get_provider("stripe")
+        real_refund = simulator.refund
+        keys = []
+
+        def keyed_refund(payment, amount=None, idempotency_key=None):
+            keys.append(idempotency_key)
+            return real_refund(payment, amount, idempotency_key)
+
+        with mock.patch.object(simulator, "refund", side_effect=keyed_refund):
+            refund_payment(payment, amount=5)
+            payment = refund_payment(payment, amount=5)
+        self.assertEqual(len(set(keys)), 2)
+        self.assertEqual(payment.metadata["refunded_amount"], "10")
+        self.assertEqual(len(payment.metadata["refund_ids"]), 2)
+
+        # The provider replays an already recorded refund: nothing more is counted
+        replayed = {"id": payment.metadata["refund_ids"][0], "status": "succeeded"}
+        with mock.patch.object(simulator, "refund", return_value=replayed):
+            payment = refund_payment(payment, amount=5)
+        self.assertEqual((payment.metadata["refunded_amount"], len(payment.metadata["refund_ids"])), ("10", 2))
+
+        # A failed call releases its reservation
+        with mock.patch.object(simulator, "refund", side_effect=PaymentError("Payment gateway error (503)")):
+            with self.assertRaises(PaymentError):
+                refund_payment(payment)
+        self.assertNotIn("pending_refunds", Payment.objects.get(pk=payment.pk).metadata)
+
+        # A refund racing one that holds the remaining balance is rejected
+        def racing_refund(payment, amount=None, idempotency_key=None):
+            with self.assertRaises(PaymentError):
+                refund_payment(payment)
+            return real_refund(payment, amount, idempotency_key)
+
+        with mock.patch.object(simulator, "refund", side_effect=racing_refund):
+            payment = refund_payment(payment)
+        self.assertEqual((payment.status, payment.metadata["refunded_amount"]), ("refunded", "20.00"))
+        self.assertEqual(len(payment.metadata["refund_ids"]), 3)
+
+    def test_cash_on_delivery(self):
+        """Confirming cash on delivery starts processing; the payment stays pending."""
+        from apps.payments.models import Payment
+
+        _, confirmed = self.pay(payment_method="cod")
+
+        self.assertEqual(confirmed.status_code, status.HTTP_200_OK)
+        payment = Payment.objects.get(order=self.order)
+        self.assertEqual((payment.payment_method, payment.status), ("cod", "pending"))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "processing")
+
+        created, _ = self.pay(payment_method="paypal")
+        self.assertEqual(created.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PAYMENT_BREAKER_FAILURE_THRESHOLD=2)
+    def test_degraded_simulator(self):
+        """Declines leave the order pending; gateway errors open the simulator's circuit."""
+        from apps.payments.providers import get_provider
+
+        simulator = get_provider("stripe")
+        simulator.decline_rate = 1
+        _, confirmed = self.pay()
+        self.assertEqual(confirmed.data, {"error": "Payment not completed", "status": "requires_payment_method"})
+
+        simulator.failure_rate = 1
+        for _ in range(2):
+            created, _ = self.pay()
+            self.assertEqual(created.data, {"error": "Payment gateway error (503)"})
+        created, _ = self.pay()
+        self.assertIn("temporarily unavailable", created.data["error"])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class WebhookProcessingTests(TransactionTestCase):
+    """Test webhook ingestion and background processing."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.orders.models import Order
+        from apps.payments.models import Payment
+        from apps.users.models import Address
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="payer@example.com", password="testpass123")
+        address = Address.objects.create(
+            user=self.user, address_type="shipping", full_name="Payer", phone_number="123456789",
+            street_address="1 Main St", city="Accra", state="GA", country="Ghana", zip_code="00233",
+        )
+        self.order = Order.objects.create(
+            user=self.user, subtotal=20, total_amount=20,
+            shipping_address=address, billing_address=address,
+        )
+        self.payment = Payment.objects.create(order=self.order, payment_method="stripe", amount=20)
+
+    def event(self, event_id, event_type, created, order=None):
+        """Stripe event payload for the test order's payment intent"""
+        return {
+            "id": event_id,
+            "type": event_type,
+            "created": created,
+            "data": {"object": {
+                "id": "pi_123",
+                "latest_charge": "ch_1",
+                "metadata": {"order_id": str((order or self.order).id)},
+                "last_payment_error": {"message": "Your card was declined."},
+            }},
+        }
+
+    def deliver(self, event):
+        """POST a correctly signed webhook"""
+        import hashlib
+        import hmac
+        import json
+        import time
+
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(b"whsec_test", f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            "/api/v1/payments/webhook/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+        )
+
+    def test_webhook_completes_payment_once(self):
+        """A delivered success event completes the payment; redeliveries are no-ops."""
+        from apps.orders.models import OrderStatusHistory
+        from apps.payments.models import WebhookEvent
+
+        event = self.event("evt_1", "payment_intent.succeeded", 1700000100)
+        for _ in range(3):
+            self.assertEqual(self.deliver(event).status_code, status.HTTP_200_OK)
+
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, "completed")
+        self.assertEqual(self.payment.transaction_id, "pi_123")
+        self.assertEqual(self.order.status, "processing")
+        self.assertEqual(OrderStatusHistory.objects.filter(order=self.order).count(), 1)
+        self.assertEqual(WebhookEvent.objects.get().status, "processed")
+
+        with mock.patch("apps.payments.providers.stripe_gateway.retrieve_payment_intent") as retrieve:
+            self.client.force_authenticate(user=self.user)
+            response = self.client.post(
+                "/api/v1/payments/confirm/", {"order_id": str(self.order.id), "payment_intent_id": "pi_123"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        retrieve.assert_not_called()
+
+    def test_out_of_order_and_invalid_deliveries(self):
+        """Stale failures never undo a success; bad signatures are rejected."""
+        from apps.payments.models import WebhookEvent
+        from apps.payments.webhooks import process_pending, record_event
+
+        with mock.patch("apps.notifications.outbox.publisher.submit"):
+            record_event(self.event("evt_2", "payment_intent.succeeded", 1700000200))
+            record_event(self.event("evt_1", "payment_intent.payment_failed", 1700000100))
+            record_event(self.event("evt_3", "payment_intent.payment_failed", 1700000050))
+        result = process_pending()
+
+        self.assertEqual(result["processed"], 2)
+        self.assertEqual(result["ignored"], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "completed")
+        self.assertEqual(
+            dict(WebhookEvent.objects.values_list("event_id", "status")),
+            {"evt_3": "processed", "evt_1": "ignored", "evt_2": "processed"},
+        )
+
+        # A failure delivered after the success was applied is stale
+        with mock.patch("apps.notifications.outbox.publisher.submit"):
+            record_event(self.event("evt_0", "payment_intent.payment_failed", 1700000000))
+        self.assertEqual(process_pending()["ignored"], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "completed")
+
+        response = self.client.post(
+            "/api/v1/payments/webhook/", "{}", content_type="application/json", HTTP_STRIPE_SIGNATURE="t=1,v1=bad"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_event_for_unknown_payment_is_deferred(self):
+        """Events whose payment is not committed yet are retried, then failed."""
+        from apps.payments.models import WebhookEvent
+        from apps.payments.webhooks import process_pending, record_event
+
+        self.payment.delete()
+        with mock.patch("apps.notifications.outbox.publisher.submit"):
+            record_event(self.event("evt_1", "payment_intent.succeeded", 1700000100))
+
+        with override_settings(WEBHOOK_MAX_ATTEMPTS=2):
+            self.assertEqual(process_pending()["deferred"], 1)
+            self.assertEqual(WebhookEvent.objects.get().status, "pending")
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(process_pending()["failed"], 1)
+        self.assertEqual(WebhookEvent.objects.get().status, "failed")
+
+    def test_deferred_event_backs_off_until_payment_commits(self):
+        """A deferred event is not re-claimed before its backoff, then applies once the payment exists."""
+        from apps.payments.models import Payment, WebhookEvent
+        from apps.payments.tasks import process_webhook_events
+        from apps.payments.webhooks import process_pending, record_event
+
+        self.payment.delete()
+        with mock.patch("apps.notifications.outbox.publisher.submit"):
+            record_event(self.event("evt_1", "payment_intent.succeeded", 1700000100))
+
+        with override_settings(WEBHOOK_RETRY_BACKOFF=5):
+            self.assertEqual(process_webhook_events()["deferred"], 1)
+            # Further runs, e.g. triggered by other webhooks, leave it alone
+            for _ in range(3):
+                self.assertEqual(process_pending()["claimed"], 0)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        payment = Payment.objects.create(order=self.order, payment_method="stripe", amount=20)
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_webhook_events()["processed"], 1)
+
+        event.refresh_from_db()
+        payment.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ("processed", 2))
+        self.assertEqual(payment.status, "completed")
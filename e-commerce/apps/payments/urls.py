@@ -1,9 +1,18 @@
 # apps/payments/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    create_payment_intent = async_views.AsyncCreatePaymentIntentView.as_view()
+    confirm_payment = async_views.AsyncConfirmPaymentView.as_view()
+else:
+    create_payment_intent = views.CreatePaymentIntentView.as_view()
+    confirm_payment = views.ConfirmPaymentView.as_view()
+
 urlpatterns = [
-    path('create-intent/', views.CreatePaymentIntentView.as_view(), name='create_payment_intent'),
-    path('confirm/', views.ConfirmPaymentView.as_view(), name='confirm_payment'),
+    path('create-intent/', create_payment_intent, name='create_payment_intent'),
+    path('confirm/', confirm_payment, name='confirm_payment'),
     path('webhook/', views.StripeWebhookView.as_view(), name='stripe_webhook'),
 ]
@@ -5,49 +5,47 @@ from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from django.utils import timezone
-import stripe
+from django.db import transaction
 
 from .models import Payment
+from .providers import get_provider
 from .serializers import PaymentSerializer
-from apps.orders.models import Order, OrderStatusHistory
-
-
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from .services import CONFIRMED_STATUSES, apply_confirmation
+from .webhooks import record_event
+from apps.orders.models import Order
+from utils.exceptions import PaymentError
+from utils.transactions import outside_transaction
 
 
 class CreatePaymentIntentView(generics.GenericAPIView):
-    """Create payment intent for Stripe"""
+    """Create a payment intent with the order's provider (called outside any transaction)"""
     
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
         order_id = request.data.get('order_id')
+        payment_method = request.data.get('payment_method', settings.PAYMENT_DEFAULT_METHOD)
         order = get_object_or_404(Order, id=order_id, user=request.user)
         
         try:
-            # Create Stripe payment intent
-            intent = stripe.PaymentIntent.create(
-                amount=int(order.total_amount * 100),  # Amount in cents
-                currency='usd',
-                metadata={'order_id': str(order.id)},
-                description=f'Payment for order {order.order_number}'
-            )
+            provider = get_provider(payment_method)
+            with outside_transaction():
+                intent = provider.create_intent(order, idempotency_key=f'payment-intent-{order.id}')
             
             # Create payment record
             Payment.objects.get_or_create(
                 order=order,
                 defaults={
-                    'payment_method': 'stripe',
+                    'payment_method': payment_method,
                     'amount': order.total_amount,
                     'status': 'pending'
                 }
             )
             
             return Response({
-                'client_secret': intent.client_secret,
-                'payment_intent_id': intent.id
+                'client_secret': intent['client_secret'],
+                'payment_intent_id': intent['id']
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -55,7 +53,11 @@ class CreatePaymentIntentView(generics.GenericAPIView):
 
 
 class ConfirmPaymentView(generics.GenericAPIView):
-    """Confirm payment"""
+    """
+    Confirm payment. Usually the payment_intent.succeeded webhook has already
+    completed it; the provider is only queried (before the write transaction
+    opens) when the webhook has not been applied yet.
+    """
     
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -66,67 +68,50 @@ class ConfirmPaymentView(generics.GenericAPIView):
         
         order = get_object_or_404(Order, id=order_id, user=request.user)
         
+        if Payment.objects.filter(order=order, status='completed').exists():
+            return Response({
+                'message': 'Payment confirmed successfully',
+                'order_id': str(order.id)
+            }, status=status.HTTP_200_OK)
+        
         try:
-            # Retrieve payment intent
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            payment_method = (
+                Payment.objects.filter(order=order).values_list('payment_method', flat=True).first()
+                or settings.PAYMENT_DEFAULT_METHOD
+            )
+            with outside_transaction():
+                intent = get_provider(payment_method).confirm(payment_intent_id)
             
-            if intent.status == 'succeeded':
-                # Update payment
-                payment = Payment.objects.get(order=order)
-                payment.status = 'completed'
-                payment.transaction_id = intent.id
-                payment.payment_date = timezone.now()
-                payment.metadata = {
-                    'stripe_payment_intent': intent.id,
-                    'stripe_charge_id': intent.latest_charge
-                }
-                payment.save()
-                
-                # Update order status
-                order.status = 'processing'
-                order.save()
-                
-                # Create status history
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='processing',
-                    note='Payment confirmed. Order processing started.'
-                )
-                
-                return Response({
-                    'message': 'Payment confirmed successfully',
-                    'order_id': str(order.id)
-                }, status=status.HTTP_200_OK)
-            else:
+            if intent['status'] not in CONFIRMED_STATUSES:
                 return Response({
                     'error': 'Payment not completed',
-                    'status': intent.status
+                    'status': intent['status']
                 }, status=status.HTTP_400_BAD_REQUEST)
+            
+            with transaction.atomic():
+                payment = Payment.objects.select_for_update().select_related('order').get(order=order)
+                apply_confirmation(payment, intent)
+            
+            return Response({
+                'message': 'Payment confirmed successfully',
+                'order_id': str(order.id)
+            }, status=status.HTTP_200_OK)
                 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @csrf_exempt
-def stripe_webhook(request):
-    """Handle Stripe webhooks"""
-    
-    payload = request.body
-    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-    endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
+def stripe_webhook(request, provider='stripe'):
+    """Verify and store gateway webhooks; a Celery worker applies them (see webhooks.py)"""
     
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
-    except (ValueError, stripe.error.SignatureVerificationError):
-        return JsonResponse({'error': 'Invalid signature'}, status=400)
+        event = get_provider(provider).parse_webhook(request.body, request.headers)
+    except PaymentError as e:
+        return JsonResponse({'error': str(e.detail)}, status=400)
     
-    # Handle event
-    if event['type'] == 'payment_intent.succeeded':
-        # Handle successful payment
-        pass
-    elif event['type'] == 'payment_intent.payment_failed':
-        # Handle failed payment
-        pass
+    # Acknowledge right away; redeliveries of a stored event are no-ops
+    record_event(event)
     
     return JsonResponse({'status': 'success'}, status=200)
 
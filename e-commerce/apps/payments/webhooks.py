@@ -0,0 +1,182 @@
+"""
+Gateway webhook ingestion.
+
+The webhook endpoint only verifies the signature, stores the event as a
+WebhookEvent row and acknowledges it; the payment, order and status history
+updates are applied by a Celery worker in batches. The unique event id makes
+redeliveries no-ops, and events for the same payment are applied in the
+order the gateway created them: an event older than the last one applied to
+a payment is ignored, and completed payments never move back to failed.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
+from .services import complete_payment, fail_payment
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = (
+    'payment_intent.succeeded',
+    'payment_intent.payment_failed',
+)
+
+
+def record_event(event: dict):
+    """
+    Store a verified webhook event and schedule its processing.
+
+    Args:
+        event: Decoded event payload
+
+    Returns:
+        Tuple of (WebhookEvent or None for unhandled types, created)
+    """
+    from apps.notifications.outbox import enqueue_task
+    from .tasks import process_webhook_events
+
+    if event.get('type') not in HANDLED_EVENTS:
+        return None, False
+
+    intent = event.get('data', {}).get('object', {})
+    try:
+        order_id = uuid.UUID(intent.get('metadata', {}).get('order_id', ''))
+    except ValueError:
+        order_id = None
+
+    with transaction.atomic():
+        webhook_event, created = WebhookEvent.objects.get_or_create(
+            event_id=event['id'],
+            defaults={
+                'event_type': event['type'],
+                'payment_intent_id': intent.get('id', ''),
+                'order_id': order_id,
+                'gateway_created': datetime.fromtimestamp(event.get('created', 0), tz=dt_timezone.utc),
+                'payload': event,
+            }
+        )
+        if created:
+            enqueue_task(process_webhook_events)
+    return webhook_event, created
+
+
+def apply_event(payment, event) -> bool:
+    """
+    Apply one event to its payment (inside the batch transaction).
+
+    Returns:
+        True if the payment changed, False for stale or duplicate events
+    """
+    event_created = event.gateway_created.timestamp()
+    last_applied = payment.metadata.get('gateway_event_created')
+    if last_applied is not None and event_created < last_applied:
+        return False
+
+    intent = event.payload.get('data', {}).get('object', {})
+    if event.event_type == 'payment_intent.succeeded':
+        changed = complete_payment(payment, event.payment_intent_id, intent.get('latest_charge'))
+    else:
+        error = intent.get('last_payment_error') or {}
+        changed = fail_payment(payment, error.get('message', ''))
+
+    if changed:
+        payment.metadata['gateway_event_created'] = event_created
+        payment.save(update_fields=['metadata', 'updated_at'])
+    return changed
+
+
+def process_pending(batch_size: int = None) -> dict:
+    """
+    Apply a batch of pending webhook events.
+
+    Algorithm: Events are claimed oldest first with SELECT ... FOR UPDATE
+    SKIP LOCKED so concurrent workers never apply the same event; their
+    payments and orders are loaded and locked with one query, each event is
+    applied in gateway order, and the event outcomes are saved with a single
+    bulk_update. Events whose payment does not exist yet (the webhook beat
+    the payment intent view's commit) or that raised stay pending and are
+    not claimed again until next_attempt_at, which backs off exponentially
+    from WEBHOOK_RETRY_BACKOFF, so a drain loop or a burst of new webhooks
+    cannot burn through WEBHOOK_MAX_ATTEMPTS before the payment commits.
+
+    Args:
+        batch_size: Maximum number of events to claim
+
+    Returns:
+        Dictionary with claimed, processed, ignored, deferred and failed counts
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    result = {'claimed': 0, 'processed': 0, 'ignored': 0, 'deferred': 0, 'failed': 0}
+
+    with transaction.atomic():
+        now = timezone.now()
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('gateway_created', 'received_at')[:batch_size]
+        )
+        if not events:
+            return result
+        result['claimed'] = len(events)
+
+        payments = {
+            payment.order_id: payment
+            for payment in Payment.objects.select_for_update().select_related('order').filter(
+                order_id__in={event.order_id for event in events if event.order_id}
+            )
+        }
+
+        for event in events:
+            event.attempts += 1
+            payment = payments.get(event.order_id)
+
+            if payment is None:
+                event.last_error = f"No payment for order {event.order_id}"
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    event.status = 'failed'
+                    result['failed'] += 1
+                    logger.warning(f"Webhook event {event.event_id} failed: {event.last_error}")
+                else:
+                    _schedule_retry(event, now)
+                    result['deferred'] += 1
+                continue
+
+            try:
+                with transaction.atomic():
+                    changed = apply_event(payment, event)
+            except Exception as e:
+                # The savepoint rolled back; drop any in-memory changes too
+                payment.refresh_from_db()
+                payment.order.refresh_from_db()
+                event.last_error = str(e)[:1000]
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    event.status = 'failed'
+                    result['failed'] += 1
+                else:
+                    _schedule_retry(event, now)
+                    result['deferred'] += 1
+                logger.error(f"Error applying webhook event {event.event_id}: {e}")
+                continue
+
+            event.status = 'processed' if changed else 'ignored'
+            event.processed_at = now
+            event.last_error = ''
+            result['processed' if changed else 'ignored'] += 1
+
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'last_error', 'next_attempt_at', 'processed_at']
+        )
+
+    return result
+
+
+def _schedule_retry(event: WebhookEvent, now: datetime):
+    """Keep a deferred event pending until its exponential backoff elapses"""
+    delay = settings.WEBHOOK_RETRY_BACKOFF * 2 ** (event.attempts - 1)
+    event.next_attempt_at = now + timedelta(seconds=delay)
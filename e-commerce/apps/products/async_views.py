@@ -0,0 +1,137 @@
+"""
+Async catalog views for ASGI deployments.
+
+Same URLs, parameters and JSON as the DRF views in views.py. Every query
+runs through the async ORM and the querysets are built so the existing
+serializers find all related data prefetched or annotated, so
+serialization runs on the event loop without lazy queries.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from rest_framework import exceptions
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+from .models import Product, Wishlist
+from .serializers import CategorySerializer, ProductDetailSerializer, ProductListSerializer
+from .views import (
+    ProductListView, category_queryset, link_category_tree, product_detail_queryset, product_list_queryset,
+)
+from utils.async_api import AsyncAPIView
+from utils.pagination import StandardPagination
+
+
+BOOLEAN_CHOICES = {
+    'true': True, 'True': True, '1': True, '2': True,
+    'false': False, 'False': False, '0': False, '3': False,
+}
+
+
+async def category_tree(include_inactive=False) -> dict:
+    """
+    Load categories with their active children and active product counts.
+
+    Algorithm: One query annotated with product counts; the tree is linked
+    in memory, so CategorySerializer reads ``active_children`` and
+    ``active_product_count`` at any depth without further queries.
+
+    Returns:
+        Dictionary of category id -> Category
+    """
+    return link_category_tree([category async for category in category_queryset(include_inactive)])
+
+
+class AsyncCategoryListView(AsyncAPIView):
+    """List root categories (async)"""
+
+    throttle_scope = 'catalog'
+
+    async def get(self, request):
+        cache_key = 'categories_list_root_async'
+        roots = await cache.aget(cache_key)
+
+        if roots is None:
+            categories = await category_tree()
+            roots = [category for category in categories.values() if category.parent_id is None]
+            await cache.aset(cache_key, roots, 3600)
+
+        page = await self.paginate_queryset(roots)
+        if page is None:
+            return CategorySerializer(roots, many=True, context={'request': request}).data
+        page['results'] = CategorySerializer(page['results'], many=True, context={'request': request}).data
+        return page
+
+
+class AsyncProductListView(AsyncAPIView):
+    """List products with filtering, searching and pagination (async)"""
+
+    filter_backends = [SearchFilter, OrderingFilter]
+    search_fields = ['name', 'description', 'sku']
+    ordering_fields = ['price', 'created_at', 'name']
+    ordering = ['-created_at']
+    pagination_class = StandardPagination
+    get_throttle_scope = ProductListView.get_throttle_scope
+
+    def filter_queryset(self, queryset):
+        # Mirrors filterset_fields = ['category', 'is_featured'] without the
+        # ModelChoiceFilter lookup query
+        params = self.request.query_params
+        category = params.get('category')
+        if category:
+            try:
+                queryset = queryset.filter(category_id=uuid.UUID(category))
+            except ValueError:
+                raise exceptions.ValidationError({
+                    'category': ['Select a valid choice. That choice is not one of the available choices.']
+                })
+        is_featured = BOOLEAN_CHOICES.get(params.get('is_featured'))
+        if is_featured is not None:
+            queryset = queryset.filter(is_featured=is_featured)
+        return super().filter_queryset(queryset)
+
+    async def get(self, request):
+        queryset = self.filter_queryset(product_list_queryset())
+        page = await self.paginate_queryset(queryset)
+        if page is None:
+            products = [product async for product in queryset]
+            return ProductListSerializer(products, many=True, context={'request': request}).data
+        page['results'] = ProductListSerializer(page['results'], many=True, context={'request': request}).data
+        return page
+
+
+class AsyncProductDetailView(AsyncAPIView):
+    """Get product details with caching (async)"""
+
+    throttle_scope = 'catalog'
+
+    async def get(self, request, slug):
+        cache_key = f'product_detail_{slug}'
+        anonymous = not request.user.is_authenticated
+
+        if anonymous:
+            cached_data = await cache.aget(cache_key)
+            if cached_data:
+                return cached_data
+
+        queryset = product_detail_queryset()
+        if not anonymous:
+            queryset = queryset.annotate(
+                in_wishlist=Exists(Wishlist.objects.filter(user=request.user, product=OuterRef('pk')))
+            )
+        try:
+            product = await queryset.aget(slug=slug)
+        except Product.DoesNotExist:
+            raise exceptions.NotFound('No Product matches the given query.')
+
+        if product.category_id:
+            categories = await category_tree(include_inactive=True)
+            product.category = categories[product.category_id]
+
+        data = ProductDetailSerializer(product, context={'request': request}).data
+
+        # Cache for 5 minutes (for anonymous users only)
+        if anonymous:
+            await cache.aset(cache_key, data, 300)
+        return data
+
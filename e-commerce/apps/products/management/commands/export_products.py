@@ -0,0 +1,40 @@
+"""
+Export products, variants and images as CSV or JSONL.
+
+    python manage.py export_products catalog.csv
+    python manage.py export_products catalog.jsonl
+    python manage.py export_products - --format jsonl | gzip > catalog.jsonl.gz
+
+The catalog is read with an iterator queryset and written line by line,
+so memory stays flat however large it is. The output is accepted as is
+by import_products.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.catalog_io import FORMATS, detect_format, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream the catalog to a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, or - for standard output')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, help='Products read per query (default: CATALOG_IO_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        if file_format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+
+        lines = export_lines(file_format, options['batch_size'])
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f'Catalog exported to {path}'))
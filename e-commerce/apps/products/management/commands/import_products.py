@@ -0,0 +1,94 @@
+"""
+Import products, variants and images from a CSV or JSONL file.
+
+    python manage.py import_products catalog.csv
+    python manage.py import_products catalog.jsonl --batch-size 5000 --checkpoint catalog.checkpoint
+    python manage.py import_products catalog.csv --errors errors.json
+
+Records are upserted on sku in batches, each in its own transaction (see
+utils.catalog_io for the columns). With --checkpoint the number of the
+last committed record is written after every batch; running the same
+command again resumes after it, and the file is removed once the import
+completes.
+"""
+
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.catalog_io import FORMATS, CatalogImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert products, variants and images from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, help='Records per batch (default: CATALOG_IO_BATCH_SIZE)')
+        parser.add_argument('--checkpoint', help='Checkpoint file to resume an interrupted import from')
+        parser.add_argument('--errors', help='Write the rejected records to this JSON file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        if file_format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+
+        checkpoint = options['checkpoint']
+        start_after = self.read_checkpoint(checkpoint, path)
+        if start_after:
+            self.stdout.write(f'Resuming after record {start_after:,}')
+
+        last_report = [0.0]
+
+        def progress(summary):
+            if checkpoint:
+                self.write_checkpoint(checkpoint, path, summary['last_record'])
+            # At most one line per second
+            if time.monotonic() - last_report[0] >= 1:
+                last_report[0] = time.monotonic()
+                self.stdout.write(
+                    f"  record {summary['last_record']:,}: {summary['products']:,} products, "
+                    f"{summary['variants']:,} variants, {summary['images']:,} images, "
+                    f"{summary['error_count']:,} errors ({summary['records_per_second']:,.0f} records/s)"
+                )
+
+        importer = CatalogImporter(batch_size=options['batch_size'], start_after=start_after, progress=progress)
+        with open(path, 'rb') as stream:
+            summary = importer.run(stream, file_format)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if options['errors']:
+            with open(options['errors'], 'w') as f:
+                json.dump(summary['errors'], f, indent=2)
+        for error in summary['errors'][:10]:
+            self.stdout.write(self.style.WARNING(f"record {error['record']} ({error['sku']}): {'; '.join(error['errors'])}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['records']:,} records in {summary['elapsed_seconds']:.1f}s: "
+            f"{summary['products']:,} products, {summary['variants']:,} variants, {summary['images']:,} images, "
+            f"{summary['error_count']:,} rejected"
+        ))
+
+    @staticmethod
+    def read_checkpoint(checkpoint: str, path: str) -> int:
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get('source') != os.path.abspath(path):
+            raise CommandError(f"{checkpoint} belongs to {state.get('source')}, not {path}")
+        return state['last_record']
+
+    @staticmethod
+    def write_checkpoint(checkpoint: str, path: str, last_record: int):
+        # Written aside and renamed, so an interruption never leaves a torn file
+        with open(f'{checkpoint}.tmp', 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'last_record': last_record}, f)
+        os.replace(f'{checkpoint}.tmp', checkpoint)
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_product_products_is_acti_d7265b_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="stock_updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="Last time the stock quantity was written",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["stock_updated_at"], name="products_stock_u_45bd62_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:15
+
+import utils.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_stock_updated_at_and_more"),
+    ]
+
+    # The default is applied in Python only: no schema change, existing keys
+    # are left as they are and new rows get time-ordered UUIDv7 keys.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="review",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.ids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
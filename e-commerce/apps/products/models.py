@@ -1,9 +1,11 @@
 # apps/products/models.py
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 import uuid
+from utils.ids import uuid7
 
 
 class Category(models.Model):
@@ -89,6 +91,10 @@ class Product(models.Model):
     quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     track_inventory = models.BooleanField(default=True)
     low_stock_threshold = models.IntegerField(default=10, validators=[MinValueValidator(0)])
+    stock_updated_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Last time the stock quantity was written"
+    )
     
     # Product details
     weight = models.DecimalField(
@@ -125,6 +131,7 @@ class Product(models.Model):
             models.Index(fields=['is_active', 'quantity']),  # For filtering active products in stock
             models.Index(fields=['category', 'is_featured', 'is_active']),  # For featured products by category
             models.Index(fields=['is_active', '-created_at']),  # For listing active products by date
+            models.Index(fields=['stock_updated_at']),  # For incremental low stock checks
         ]
     
     def __str__(self):
@@ -133,6 +140,13 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        
+        # Stamp stock writes so the low stock check can run incrementally
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'quantity' in update_fields:
+            self.stock_updated_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'stock_updated_at'}
         super().save(*args, **kwargs)
     
     @property
@@ -230,7 +244,7 @@ class ProductVariant(models.Model):
 class Review(models.Model):
     """Product review model"""
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
@@ -11,13 +11,17 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'image', 'parent', 'children', 'product_count']
     
     def get_children(self, obj) -> list:
-        """Get active child categories."""
+        """Get active child categories (prefetched as active_children when available)."""
+        if hasattr(obj, 'active_children'):
+            return CategorySerializer(obj.active_children, many=True).data
         if obj.children.filter(is_active=True).exists():
             return CategorySerializer(obj.children.filter(is_active=True), many=True).data
         return []
     
     def get_product_count(self, obj) -> int:
         """Count active products in this category."""
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -70,8 +74,11 @@ class ProductListSerializer(serializers.ModelSerializer):
         ]
     
     def get_primary_image(self, obj) -> str | None:
-        """Get primary product image URL."""
-        image = obj.images.filter(is_primary=True).first()
+        """Get primary product image URL (from prefetched images when available)."""
+        if 'images' in getattr(obj, '_prefetched_objects_cache', {}):
+            image = next((image for image in obj.images.all() if image.is_primary), None)
+        else:
+            image = obj.images.filter(is_primary=True).first()
         if image and self.context.get('request'):
             return self.context['request'].build_absolute_uri(image.image.url)
         return None
@@ -82,10 +89,14 @@ class ProductListSerializer(serializers.ModelSerializer):
     
     def get_average_rating(self, obj) -> float:
         """Get average rating of product."""
+        if hasattr(obj, 'approved_rating'):
+            return obj.approved_rating or 0
         return obj.average_rating
     
     def get_review_count(self, obj) -> int:
         """Count approved reviews."""
+        if hasattr(obj, 'approved_review_count'):
+            return obj.approved_review_count
         return obj.reviews.filter(is_approved=True).count()
     
     def get_is_in_stock(self, obj) -> bool:
@@ -121,6 +132,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     
     def get_average_rating(self, obj) -> float:
         """Get average product rating."""
+        if hasattr(obj, 'approved_rating'):
+            return obj.approved_rating or 0
         return obj.average_rating
     
     def get_is_in_stock(self, obj) -> bool:
@@ -133,6 +146,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     
     def get_is_in_wishlist(self, obj) -> bool:
         """Check if product is in user's wishlist."""
+        if hasattr(obj, 'in_wishlist'):
+            return obj.in_wishlist
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Wishlist.objects.filter(user=request.user, product=obj).exists()
@@ -152,7 +167,10 @@ class WishlistSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
     
     def get_product_image(self, obj) -> str | None:
-        primary_image = obj.product.images.filter(is_primary=True).first()
+        if 'images' in getattr(obj.product, '_prefetched_objects_cache', {}):
+            primary_image = next((image for image in obj.product.images.all() if image.is_primary), None)
+        else:
+            primary_image = obj.product.images.filter(is_primary=True).first()
         if primary_image:
             return primary_image.image.url
         return None
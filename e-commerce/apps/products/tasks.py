@@ -6,67 +6,74 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+LOW_STOCK_WATERMARK_KEY = 'inventory:low_stock:last_run'
+
+
 @shared_task
-def check_low_stock_products():
-    """Check for products with low stock and create notifications"""
+def check_low_stock_products(full_scan=False):
+    """
+    Create one pending in-app alert per admin for each low stock product.
+    
+    Only products whose stock changed since the previous run are re-evaluated;
+    the first run (or a lost watermark) falls back to a full scan. Products
+    that already have a pending alert are skipped, and the unique constraint on
+    (user, dedupe_key) guards against concurrent runs.
+    """
     try:
         from apps.products.models import Product
         from apps.notifications.models import Notification
         from apps.users.models import User
+        from django.utils import timezone
+        
+        run_started_at = timezone.now()
+        last_run = None if full_scan else cache.get(LOW_STOCK_WATERMARK_KEY)
         
-        # Get all low stock products
         low_stock_products = Product.objects.filter(
             track_inventory=True,
             quantity__lte=models.F('low_stock_threshold'),
             quantity__gt=0,
             is_active=True
         )
+        if last_run is not None:
+            low_stock_products = low_stock_products.filter(stock_updated_at__gte=last_run)
+        products = list(low_stock_products.values_list('id', 'name', 'quantity'))
         
-        # Get admin users
-        admins = User.objects.filter(is_staff=True)
-        
-        for product in low_stock_products:
-            # Create notification for each admin
-            for admin in admins:
-                Notification.objects.get_or_create(
-                    user=admin,
+        created = 0
+        if products:
+            admin_ids = list(User.objects.filter(is_staff=True, is_active=True).values_list('id', flat=True))
+            keys = {f'low_stock:{product_id}': (product_id, name, quantity) for product_id, name, quantity in products}
+            
+            # Anti-join against alerts that have not been dealt with yet
+            existing = set(Notification.objects.filter(
+                status='pending',
+                user_id__in=admin_ids,
+                dedupe_key__in=keys
+            ).values_list('user_id', 'dedupe_key'))
+            
+            alerts = [
+                Notification(
+                    user_id=admin_id,
                     notification_type='in_app',
-                    defaults={
-                        'subject': f'Low Stock Alert: {product.name}',
-                        'message': f'{product.name} has only {product.quantity} units left in stock.',
-                        'status': 'pending',
-                        'data': {'product_id': str(product.id)}
-                    }
+                    subject=f'Low Stock Alert: {name}',
+                    message=f'{name} has only {quantity} units left in stock.',
+                    status='pending',
+                    data={'product_id': str(product_id)},
+                    dedupe_key=key,
                 )
+                for key, (product_id, name, quantity) in keys.items()
+                for admin_id in admin_ids
+                if (admin_id, key) not in existing
+            ]
+            Notification.objects.bulk_create(alerts, batch_size=500, ignore_conflicts=True)
+            created = len(alerts)
         
-        logger.info(f"Low stock check completed. Found {low_stock_products.count()} products")
-        return f"Checked {low_stock_products.count()} low stock products"
+        cache.set(LOW_STOCK_WATERMARK_KEY, run_started_at, None)
         
-    except Exception as e:
-        logger.error(f"Error checking low stock products: {str(e)}")
-        raise
-
-
-@shared_task
-def cleanup_expired_tokens():
-    """Remove expired email verification and password reset tokens"""
-    try:
-        from apps.users.models import EmailVerificationToken, PasswordResetToken
-        from django.utils import timezone
-        
-        # Delete expired verification tokens
-        EmailVerificationToken.objects.filter(expires_at__lt=timezone.now()).delete()
-        
-        # Delete expired or used password reset tokens
-        PasswordResetToken.objects.filter(
-            models.Q(expires_at__lt=timezone.now()) | models.Q(is_used=True)
-        ).delete()
-        
-        logger.info("Token cleanup completed")
-        return "Expired tokens cleaned up"
+        logger.info(f"Low stock check completed. Found {len(products)} products, queued {created} alerts")
+        return f"Checked {len(products)} low stock products"
         
     except Exception as e:
-        logger.error(f"Error cleaning up tokens: {str(e)}")
+        logger.error(f"Error checking low stock products: {str(e)}")
         raise
 
 
@@ -0,0 +1,809 @@
+"""
+Tests for the Products app.
+"""
+import pytest
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from apps.products.models import Product, Category
+from apps.products.tasks import check_low_stock_products
+from apps.notifications.models import Notification
+from utils.testing import PerformanceAssertionsMixin
+
+User = get_user_model()
+
+
+@pytest.mark.django_db(transaction=True)
+class LowStockTaskTests(TestCase):
+    """Test the low stock alert task."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.admins = [
+            User.objects.create_user(email=f"admin{i}@example.com", password="testpass123", is_staff=True)
+            for i in range(2)
+        ]
+        self.category = Category.objects.create(name="Electronics")
+        self.low = Product.objects.create(
+            name="Low Product",
+            slug="low-product",
+            description="Test Description",
+            price=10,
+            quantity=3,
+            sku="LOW-SKU-001",
+            category=self.category,
+        )
+        self.other_low = Product.objects.create(
+            name="Other Low Product",
+            slug="other-low-product",
+            description="Test Description",
+            price=10,
+            quantity=5,
+            sku="LOW-SKU-002",
+            category=self.category,
+        )
+        Product.objects.create(
+            name="Stocked Product",
+            slug="stocked-product",
+            description="Test Description",
+            price=10,
+            quantity=100,
+            sku="OK-SKU-001",
+            category=self.category,
+        )
+
+    def test_one_alert_per_product_per_admin(self):
+        """Each low stock product gets its own alert for every admin."""
+        check_low_stock_products()
+        self.assertEqual(Notification.objects.count(), 4)
+        self.assertEqual(
+            set(Notification.objects.values_list("dedupe_key", flat=True)),
+            {f"low_stock:{self.low.id}", f"low_stock:{self.other_low.id}"},
+        )
+
+    def test_pending_alerts_are_not_duplicated(self):
+        """Re-running does not create alerts that are still pending."""
+        check_low_stock_products(full_scan=True)
+        check_low_stock_products(full_scan=True)
+        self.assertEqual(Notification.objects.count(), 4)
+
+    def test_incremental_run_only_checks_changed_stock(self):
+        """Only products whose stock changed after the last run are re-evaluated."""
+        check_low_stock_products()
+        Notification.objects.update(status="sent")
+
+        Product.objects.filter(id=self.other_low.id).update(
+            stock_updated_at=timezone.now() - timedelta(days=1)
+        )
+        self.low.quantity = 2
+        self.low.save(update_fields=["quantity"])
+
+        check_low_stock_products()
+        pending = Notification.objects.filter(status="pending")
+        self.assertEqual(pending.count(), 2)
+        self.assertEqual(set(pending.values_list("dedupe_key", flat=True)), {f"low_stock:{self.low.id}"})
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    """Test read replica routing for catalog reads."""
+
+    def setUp(self):
+        """Set up test data."""
+        from django.test import RequestFactory
+        from utils.db_routing import ReadReplicaMiddleware, ReplicaRouter, health
+
+        cache.clear()
+        health.reset()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.health_check = mock.patch.object(health, "check", return_value=True)
+        self.health_check.start()
+        self.addCleanup(self.health_check.stop)
+
+        def get_response(request):
+            self.middleware.process_view(request, request.view, (), {})
+            return request.view(request)
+
+        self.middleware = ReadReplicaMiddleware(get_response)
+
+    def dispatch(self, method, view, **extra):
+        request = getattr(self.factory, method)("/api/v1/products/", **extra)
+        request.view = view
+        return self.middleware(request)
+
+    def read_view(self, request):
+        from django.http import HttpResponse
+
+        self.read_db = self.router.db_for_read(Product)
+        return HttpResponse()
+
+    def test_safe_requests_read_from_replica(self):
+        """GET reads use the replica; writes and other methods use the primary."""
+        self.dispatch("get", self.read_view)
+        self.assertEqual(self.read_db, "replica")
+        self.dispatch("post", self.read_view)
+        self.assertEqual(self.read_db, "default")
+
+    def test_reads_follow_writes(self):
+        """After a write, the request and the client's next reads use the primary."""
+        from django.http import HttpResponse
+
+        def write_view(request):
+            self.router.db_for_write(Product)
+            self.read_db = self.router.db_for_read(Product)
+            return HttpResponse()
+
+        response = self.dispatch("get", write_view, HTTP_AUTHORIZATION="Bearer abc")
+        self.assertEqual(self.read_db, "default")
+
+        request_cookies = {"HTTP_COOKIE": response.cookies.output(header="", sep=";").strip()}
+        self.dispatch("get", self.read_view, **request_cookies)
+        self.assertEqual(self.read_db, "default")
+
+        self.dispatch("get", self.read_view, HTTP_AUTHORIZATION="Bearer abc")
+        self.assertEqual(self.read_db, "default")
+        self.dispatch("get", self.read_view, HTTP_AUTHORIZATION="Bearer other")
+        self.assertEqual(self.read_db, "replica")
+
+    def test_view_opt_out_and_unhealthy_replica(self):
+        """Opted-out views and unhealthy replicas fall back to the primary."""
+        from utils.db_routing import health, use_primary_db
+
+        @use_primary_db
+        def primary_view(request):
+            return self.read_view(request)
+
+        self.dispatch("get", primary_view)
+        self.assertEqual(self.read_db, "default")
+
+        health.reset()
+        self.health_check.stop()
+        with mock.patch.object(health, "check", return_value=False):
+            self.dispatch("get", self.read_view)
+        self.health_check.start()
+        self.assertEqual(self.read_db, "default")
+
+    def test_lag_check_treats_idle_caught_up_replica_as_healthy(self):
+        """Lag is measured only when replay is behind what the replica received."""
+        from utils.db_routing import REPLICA_LAG_SQL, ReplicaHealth
+
+        self.assertIn("pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0", REPLICA_LAG_SQL)
+        connection = mock.MagicMock(vendor="postgresql")
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with mock.patch("utils.db_routing.connections", {"replica": connection}), \
+                self.settings(REPLICA_MAX_LAG=5):
+            cursor.fetchone.return_value = (0,)
+            self.assertTrue(ReplicaHealth.check("replica"))
+            cursor.fetchone.return_value = (12.5,)
+            self.assertFalse(ReplicaHealth.check("replica"))
+        cursor.execute.assert_called_with(REPLICA_LAG_SQL)
+
+    def test_background_reads_stay_on_primary(self):
+        """Outside a request, reads use the primary unless explicitly allowed."""
+        from utils.db_routing import replica_reads
+
+        self.assertEqual(self.router.db_for_read(Product), "default")
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), "replica")
+
+
+class DatabasePoolingTests(TestCase):
+    """Test connection pooling configuration and reporting."""
+
+    POSTGRES = {"ENGINE": "django.db.backends.postgresql", "NAME": "ecommerce", "CONN_MAX_AGE": 600}
+
+    def test_native_pool_from_environment(self):
+        """DB_POOL sizes the psycopg pool from env and disables persistent connections."""
+        from utils import db_pool
+
+        env = {"DB_POOL": "true", "DB_POOL_MAX_SIZE": "4", "DB_POOL_TIMEOUT": "2.5"}
+        with mock.patch.dict("os.environ", env), \
+                mock.patch.object(db_pool, "native_pool_available", return_value=True):
+            database = db_pool.configure_pooling(dict(self.POSTGRES))
+
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 4)
+        self.assertEqual(database["OPTIONS"]["pool"]["timeout"], 2.5)
+        self.assertEqual(database["OPTIONS"]["pool"]["min_size"], 2)
+
+    def test_pgbouncer_mode_and_fallback(self):
+        """PgBouncer mode drops server-side cursors and prepared statements; an
+        unsupported stack keeps persistent connections."""
+        from utils import db_pool
+
+        with mock.patch.dict("os.environ", {"DB_POOL": "true", "DB_PGBOUNCER": "1"}), \
+                mock.patch.object(db_pool, "native_pool_available", return_value=False), \
+                mock.patch.object(db_pool, "_psycopg_version", return_value=3):
+            database = db_pool.configure_pooling(dict(self.POSTGRES))
+
+        self.assertNotIn("pool", database["OPTIONS"])
+        self.assertEqual(database["CONN_MAX_AGE"], 600)
+        self.assertTrue(database["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertIsNone(database["OPTIONS"]["prepare_threshold"])
+
+    def test_readiness_reports_pool(self):
+        """The readiness probe includes the connection pool state."""
+        response = self.client.get("/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["database_pool"]["pooled"], False)
+
+
+@skipUnless("postgres" in settings.DATABASES, "set TEST_POSTGRES_URL to run against PostgreSQL")
+class NativePoolTests(TestCase):
+    """Test the psycopg 3 pool on a real PostgreSQL database."""
+
+    databases = {"default", "postgres"}
+
+    def test_pool_serves_connections_and_reports_stats(self):
+        """With DB_POOL the connection comes from the native pool and pool_stats() reports it."""
+        from copy import deepcopy
+        from django.db import connections
+        from django.db.backends.postgresql.base import DatabaseWrapper
+        from utils import db_pool
+
+        self.assertTrue(db_pool.native_pool_available())
+        env = {"DB_POOL": "true", "DB_POOL_MIN_SIZE": "1", "DB_POOL_MAX_SIZE": "3"}
+        with mock.patch.dict("os.environ", env):
+            database = db_pool.configure_pooling(deepcopy(connections["postgres"].settings_dict))
+        connections["pooled"] = DatabaseWrapper(database, alias="pooled")
+        self.addCleanup(connections.__delitem__, "pooled")
+        self.addCleanup(connections["pooled"].close_pool)
+
+        with connections["pooled"].cursor() as cursor:
+            cursor.execute("SELECT 1")
+            stats = db_pool.pool_stats("pooled")
+        self.assertTrue(stats["pooled"])
+        self.assertEqual((stats["min_size"], stats["max_size"]), (1, 3))
+        self.assertGreaterEqual(stats["in_use"], 1)
+
+
+class AsyncCatalogViewTests(TestCase):
+    """Test that the async catalog views match the sync views."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.products.models import ProductImage, ProductVariant, Review
+
+        cache.clear()
+        self.user = User.objects.create_user(email="shopper@example.com", password="testpass123")
+        self.category = Category.objects.create(name="Electronics")
+        Category.objects.create(name="Phones", parent=self.category)
+        Category.objects.create(name="Retired", parent=self.category, is_active=False)
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}",
+                slug=f"product-{i}",
+                description="Test Description",
+                price=10 + i,
+                compare_price=20 + i,
+                quantity=i,
+                sku=f"ASYNC-SKU-{i}",
+                category=self.category,
+                is_featured=i % 2 == 0,
+            )
+            for i in range(5)
+        ]
+        product = self.products[0]
+        ProductImage.objects.create(product=product, image="products/a.jpg", alt_text="A", order=1)
+        ProductImage.objects.create(product=product, image="products/b.jpg", alt_text="B", is_primary=True)
+        ProductVariant.objects.create(product=product, name="Large", sku="ASYNC-VAR-1", attributes={"size": "L"})
+        for rating, approved in [(5, True), (2, True), (1, False)]:
+            reviewer = User.objects.create_user(email=f"reviewer{rating}@example.com", password="testpass123")
+            Review.objects.create(
+                product=product, user=reviewer, rating=rating, title="Review", comment="Review", is_approved=approved
+            )
+
+    def async_get(self, view, path, headers=None, **view_kwargs):
+        """Call an async view directly and decode its JSON"""
+        import json
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+
+        request = AsyncRequestFactory().get(path, headers=headers)
+        response = async_to_sync(view.as_view())(request, **view_kwargs)
+        return response.status_code, json.loads(response.content)
+
+    def test_async_views_match_sync_views(self):
+        """List, category and detail payloads are identical to the DRF views."""
+        from apps.products import async_views
+
+        for path in [
+            "/api/v1/products/",
+            "/api/v1/products/?search=Product&ordering=price&page_size=2&page=2",
+            "/api/v1/products/?is_featured=true&category=" + str(self.category.id),
+        ]:
+            self.assertEqual(self.async_get(async_views.AsyncProductListView, path), (200, self.client.get(path).json()))
+
+        path = "/api/v1/products/categories/"
+        self.assertEqual(self.async_get(async_views.AsyncCategoryListView, path), (200, self.client.get(path).json()))
+
+        path = "/api/v1/products/product-0/"
+        expected = self.client.get(path).json()
+        cache.clear()
+        status_code, data = self.async_get(async_views.AsyncProductDetailView, path, slug="product-0")
+        self.assertEqual((status_code, data), (200, expected))
+        self.assertEqual(data["average_rating"], 3.5)
+
+        _, data = self.async_get(async_views.AsyncProductListView, "/api/v1/products/?ordering=price")
+        self.assertEqual(data["results"][0]["review_count"], 2)
+        self.assertTrue(data["results"][0]["primary_image"].endswith("products/b.jpg"))
+
+    def test_search_scope_throttles_sync_and_async(self):
+        """Searches share one limit across the sync and async views; browsing has its own."""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+        from rest_framework.settings import api_settings
+        from apps.products import async_views
+        from apps.products.views import ProductListView
+        from utils.throttling import ScopedSlidingWindowThrottle, limiter
+
+        limiter.reset()
+        self.addCleanup(limiter.reset)
+        throttles = [ScopedSlidingWindowThrottle]
+        with mock.patch.object(ProductListView, "throttle_classes", throttles), \
+                mock.patch.object(async_views.AsyncProductListView, "throttle_classes", throttles), \
+                mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, {"search": "2/min", "catalog": "100/min"}):
+            for _ in range(2):
+                self.assertEqual(self.client.get("/api/v1/products/?search=Product").status_code, 200)
+            self.assertEqual(self.client.get("/api/v1/products/?search=Product").status_code, 429)
+            self.assertEqual(self.client.get("/api/v1/products/").status_code, 200)
+
+            request = AsyncRequestFactory().get("/api/v1/products/?search=Product")
+            response = async_to_sync(async_views.AsyncProductListView.as_view())(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_async_list_avoids_per_product_queries(self):
+        """A page costs a count, the page and one image prefetch, sync or async."""
+        from apps.products import async_views
+
+        with self.assertNumQueries(3):
+            self.async_get(async_views.AsyncProductListView, "/api/v1/products/")
+        with self.assertNumQueries(3):
+            self.client.get("/api/v1/products/")
+
+    def test_async_detail_authenticated_and_errors(self):
+        """JWT users get their wishlist flag; unknown slugs and pages return DRF-style 404s."""
+        from rest_framework_simplejwt.tokens import AccessToken
+        from apps.products import async_views
+        from apps.products.models import Wishlist
+
+        Wishlist.objects.create(user=self.user, product=self.products[1])
+        token = f"Bearer {AccessToken.for_user(self.user)}"
+
+        status_code, data = self.async_get(
+            async_views.AsyncProductDetailView, "/api/v1/products/product-1/", slug="product-1",
+            headers={"Authorization": token},
+        )
+        self.assertEqual(status_code, 200)
+        self.assertTrue(data["is_in_wishlist"])
+
+        status_code, data = self.async_get(
+            async_views.AsyncProductDetailView, "/api/v1/products/missing/", slug="missing"
+        )
+        self.assertEqual(status_code, 404)
+        status_code, data = self.async_get(async_views.AsyncProductListView, "/api/v1/products/?page=9")
+        self.assertEqual((status_code, data), (404, {"detail": "Invalid page."}))
+        status_code, data = self.async_get(
+            async_views.AsyncProductListView, "/api/v1/products/", headers={"Authorization": "Bearer invalid"}
+        )
+        self.assertEqual(status_code, 401)
+
+    def test_custom_middleware_runs_natively_under_asgi(self):
+        """The project's own middleware keeps an async chain async."""
+        from asgiref.sync import iscoroutinefunction
+        from utils.db_routing import ReadReplicaMiddleware
+        from utils.middleware import WhiteNoiseMiddleware
+
+        async def get_response(request):
+            return None
+
+        for middleware_class in (ReadReplicaMiddleware, WhiteNoiseMiddleware):
+            self.assertTrue(middleware_class.async_capable)
+            self.assertTrue(iscoroutinefunction(middleware_class(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware_class(lambda request: None)))
+        self.assertTrue(iscoroutinefunction(ReadReplicaMiddleware(get_response).process_view))
+
+
+@pytest.mark.django_db(transaction=True)
+class RequestProfilingTests(TestCase):
+    """Test query counting, Server-Timing, slow query plans and N+1 detection."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.category = Category.objects.create(name="Books")
+        for i in range(6):
+            Product.objects.create(
+                name=f"Book {i}", slug=f"book-{i}", description="Book", price=10, quantity=5,
+                sku=f"BOOK-{i}", category=self.category,
+            )
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_server_timing_and_log_line(self):
+        """A profiled request reports its queries, cache reads and serializer time."""
+        import json
+        from rest_framework.test import APIClient
+
+        with self.assertLogs("utils.profiling", level="INFO") as logs:
+            response = APIClient().get("/api/v1/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "request_profile")
+        self.assertEqual(record["endpoint"], "product_list")
+        self.assertEqual(record["queries"], 3)
+        self.assertEqual(record["repeated_queries"], {})
+
+        # The cached category list is a miss, then a hit
+        APIClient().get("/api/v1/products/categories/")
+        response = APIClient().get("/api/v1/products/categories/")
+        self.assertIn('cache;desc="1 hits, 0 misses"', response["Server-Timing"])
+
+    def test_disabled_middleware_is_removed(self):
+        """With profiling off the middleware is not in the chain at all."""
+        from django.core.exceptions import MiddlewareNotUsed
+        from utils.profiling import QueryProfilingMiddleware
+
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryProfilingMiddleware(lambda request: None)
+        self.assertNotIn("Server-Timing", self.client.get("/api/v1/products/"))
+
+    @override_settings(SLOW_QUERY_MS=0, NPLUSONE_THRESHOLD=5)
+    def test_repeated_shapes_and_slow_query_plans(self):
+        """Per-row lookups share one SQL shape; slow SELECTs carry their plan."""
+        from utils.profiling import profiling
+
+        with profiling() as profile:
+            products = list(Product.objects.order_by("sku"))
+            for product in products:
+                Category.objects.get(pk=product.category_id)
+
+        self.assertEqual(profile.queries, 7)
+        [(shape, count)] = profile.repeated_queries.items()
+        self.assertEqual(count, 6)
+        self.assertIn('FROM "categories" WHERE', shape)
+        self.assertTrue(all(query["plan"] for query in profile.slow_queries))
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_async_views_are_profiled(self):
+        """Queries an async view runs through the async ORM land in its request's profile."""
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from django.test import AsyncRequestFactory
+        from apps.products.async_views import AsyncProductListView
+        from utils.profiling import QueryProfilingMiddleware
+
+        middleware = QueryProfilingMiddleware(AsyncProductListView.as_view())
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs("utils.profiling", level="INFO"):
+            response = async_to_sync(middleware)(AsyncRequestFactory().get("/api/v1/products/"))
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+
+
+class SyntheticDatasetTests(TestCase):
+    """Test the chunked, Zipf-skewed synthetic data generator."""
+
+    def generate(self, seed=7):
+        from utils.datagen import SyntheticDataGenerator
+
+        generator = SyntheticDataGenerator(
+            users=20, products=50, variants_per_product=1, reviews=150, carts=10, orders=40,
+            chunk_size=16, seed=seed,
+        )
+        return generator, generator.generate()
+
+    def test_generates_requested_rows(self):
+        """Every table is filled to the requested size through chunked inserts."""
+        from apps.cart.models import CartItem
+        from apps.orders.models import Order
+        from apps.products.models import Review
+
+        _, summary = self.generate()
+        self.assertEqual(summary["rows"]["users"], 20)
+        self.assertEqual(Product.objects.filter(sku__startswith="SYN-7-").count(), 50)
+        self.assertEqual(Review.objects.count(), 150)
+        self.assertEqual(CartItem.objects.count(), summary["rows"]["cart_items"])
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(len({order.order_number for order in Order.objects.all()}), 40)
+        for order in Order.objects.prefetch_related("items"):
+            self.assertEqual(order.subtotal, sum(item.subtotal for item in order.items.all()))
+
+    def test_popularity_is_skewed(self):
+        """The most reviewed product collects far more than a uniform share."""
+        from django.db.models import Count
+        from apps.products.models import Review
+
+        self.generate()
+        top = Review.objects.values("product").annotate(n=Count("id")).order_by("-n").first()["n"]
+        self.assertGreater(top, 150 / 50 * 3)
+
+    def test_same_seed_reproduces_dataset_and_clear_removes_it(self):
+        """A seed reproduces the same rows; clear() deletes only synthetic data."""
+        from utils.datagen import SyntheticDataGenerator
+
+        self.generate()
+        first = list(Product.objects.order_by("sku").values_list("name", "price", "quantity"))
+        SyntheticDataGenerator.clear()
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+        self.generate()
+        self.assertEqual(list(Product.objects.order_by("sku").values_list("name", "price", "quantity")), first)
+
+
+@pytest.mark.django_db(transaction=True)
+class ProductQueryBudgetTests(PerformanceAssertionsMixin, TestCase):
+    """Query and serializer budgets for the catalog endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Budget")
+        self.user = User.objects.create_user(email="budget@example.com", password="testpass123")
+        self.created = 0
+
+    def create_products(self, count):
+        from apps.products.models import ProductImage
+
+        products = []
+        for _ in range(count):
+            self.created += 1
+            products.append(Product(
+                name=f"Budget {self.created}", slug=f"budget-{self.created}", description="Budget",
+                price=10, quantity=5, sku=f"BUDGET-{self.created}", category=self.category,
+            ))
+        Product.objects.bulk_create(products)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image="products/budget.jpg", alt_text="Budget", is_primary=True)
+            for product in products
+        ])
+        return products
+
+    def create_reviews(self, product, count):
+        from apps.products.models import Review
+
+        users = User.objects.bulk_create([
+            User(email=f"reviewer{self.created}-{i}@example.com", first_name="Reviewer") for i in range(count)
+        ])
+        Review.objects.bulk_create([
+            Review(product=product, user=user, rating=4, title="Good", comment="Good") for user in users
+        ])
+
+    def test_list_queries_do_not_scale_with_page_size(self):
+        """A product list page costs the same queries for 1 or 50 products."""
+        def setup(size):
+            Product.objects.all().delete()
+            self.create_products(size)
+            return size
+
+        queries = self.assertQueriesDoNotScale(
+            (1, 50), setup, lambda size: self.client.get(f"/api/v1/products/?page_size={size}"),
+        )
+        self.assertLessEqual(queries, 3)
+        with self.assertMaxSerializerTime(100):
+            self.client.get("/api/v1/products/?page_size=50&search=budget")
+
+    def test_detail_queries_do_not_scale_with_reviews(self):
+        """Product detail costs the same queries with 0 or 500 reviews."""
+        self.client.force_authenticate(user=self.user)  # skips the anonymous response cache
+
+        def setup(size):
+            product = self.create_products(1)[0]
+            self.create_reviews(product, size)
+            return product
+
+        queries = self.assertQueriesDoNotScale(
+            (0, 500), setup, lambda product: self.client.get(f"/api/v1/products/{product.slug}/"),
+        )
+        self.assertLessEqual(queries, 7)
+        product = Product.objects.latest("created_at")
+        with self.assertMaxSerializerTime(250):
+            self.client.get(f"/api/v1/products/{product.slug}/")
+
+    def test_review_list_queries_do_not_scale(self):
+        """A page of reviews costs the same queries for 1 or 50 reviews."""
+        def setup(size):
+            product = self.create_products(1)[0]
+            self.create_reviews(product, size)
+            return product
+
+        queries = self.assertQueriesDoNotScale(
+            (1, 50), setup, lambda product: self.client.get(f"/api/v1/products/{product.slug}/reviews/?page_size=50"),
+        )
+        self.assertLessEqual(queries, 3)
+
+    def test_category_queries_do_not_scale(self):
+        """The category tree costs the same queries for 1 or 20 subcategories."""
+        def setup(size):
+            cache.clear()
+            parent = Category.objects.create(name=f"Parent {size}")
+            for i in range(size):
+                Category.objects.create(name=f"Child {size}-{i}", parent=parent)
+
+        queries = self.assertQueriesDoNotScale(
+            (1, 20), setup, lambda _: self.client.get("/api/v1/products/categories/"),
+        )
+        self.assertLessEqual(queries, 1)
+
+    def test_wishlist_queries_do_not_scale(self):
+        """The wishlist costs the same queries for 1 or 50 products."""
+        from apps.products.models import Wishlist
+
+        self.client.force_authenticate(user=self.user)
+
+        def setup(size):
+            Wishlist.objects.all().delete()
+            Wishlist.objects.bulk_create([
+                Wishlist(user=self.user, product=product) for product in self.create_products(size)
+            ])
+
+        queries = self.assertQueriesDoNotScale(
+            (1, 50), setup, lambda _: self.client.get("/api/v1/products/wishlist/me/?page_size=50"),
+        )
+        self.assertLessEqual(queries, 3)
+
+
+class CatalogImportExportTests(TestCase):
+    """Test streaming catalog import and export."""
+
+    CSV = (
+        "type,sku,product_sku,name,description,category,price,quantity,is_active,attributes,image,is_primary\n"
+        "product,IMP-1,,Imported One,First,imports,19.99,5,true,,,\n"
+        "variant,IMP-1-L,IMP-1,Large,,,21.50,2,,\"{\"\"size\"\": \"\"L\"\"}\",,\n"
+        "image,,IMP-1,,,,,,,,products/imp-1.jpg,true\n"
+        "product,IMP-2,,Imported Two,Second,imports,5,0,false,,,\n"
+    )
+
+    def setUp(self):
+        """Set up test data."""
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Imports")
+        self.admin = User.objects.create_user(email="admin@example.com", password="testpass123", is_staff=True)
+
+    def run_import(self, content, file_format="csv", **kwargs):
+        from io import BytesIO
+        from utils.catalog_io import CatalogImporter
+
+        return CatalogImporter(**kwargs).run(BytesIO(content.encode()), file_format)
+
+    def test_import_upserts_products_variants_and_images(self):
+        """Importing twice updates in place instead of duplicating rows."""
+        from apps.products.models import ProductImage, ProductVariant
+
+        summary = self.run_import(self.CSV)
+        self.assertEqual(summary["error_count"], 0, summary["errors"])
+        self.assertEqual((summary["products"], summary["variants"], summary["images"]), (2, 1, 1))
+        product = Product.objects.get(sku="IMP-1")
+        self.assertEqual((str(product.price), product.quantity, product.category), ("19.99", 5, self.category))
+        self.assertEqual(product.slug, "imported-one-imp-1")
+        self.assertFalse(Product.objects.get(sku="IMP-2").is_active)
+        self.assertEqual(ProductVariant.objects.get(sku="IMP-1-L").attributes, {"size": "L"})
+
+        summary = self.run_import(self.CSV.replace("19.99,5", "17.00,9"), batch_size=2)
+        self.assertEqual(summary["error_count"], 0, summary["errors"])
+        product.refresh_from_db()
+        self.assertEqual((str(product.price), product.quantity, product.slug), ("17.00", 9, "imported-one-imp-1"))
+        self.assertEqual(Product.objects.filter(sku__startswith="IMP-").count(), 2)
+        self.assertEqual(ProductImage.objects.filter(product=product, is_primary=True).count(), 1)
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        """Each rejected record is reported with its number; valid ones still import."""
+        content = "\n".join([
+            '{"sku": "ok-1", "name": "Lowercase", "price": "1"}',
+            '{"sku": "JSON-1", "name": "Negative", "price": "-1"}',
+            '{"sku": "JSON-2", "name": "Nowhere", "price": "1", "category": "missing"}',
+            'not json',
+            '{"type": "variant", "sku": "JSON-V", "product_sku": "JSON-404", "name": "Orphan"}',
+            '{"sku": "JSON-3", "name": "Valid", "price": 12.5, "quantity": 3}',
+        ])
+        summary = self.run_import(content, "jsonl")
+        self.assertEqual(summary["products"], 1)
+        self.assertEqual([error["record"] for error in summary["errors"]], [4, 1, 2, 3, 5])
+        self.assertIn("Price cannot be negative", summary["errors"][2]["errors"][0])
+        self.assertEqual(str(Product.objects.get(sku="JSON-3").price), "12.50")
+
+    def test_resume_skips_committed_records(self):
+        """A run resumed after record 2 leaves the first records untouched."""
+        summary = self.run_import(self.CSV, start_after=2)
+        self.assertEqual(summary["records"], 2)
+        self.assertEqual(summary["last_record"], 4)
+        self.assertFalse(Product.objects.filter(sku="IMP-1").exists())
+        self.assertTrue(Product.objects.filter(sku="IMP-2").exists())
+
+    def test_command_writes_and_clears_checkpoint(self):
+        """Progress is checkpointed per batch and the checkpoint removed on success."""
+        import json
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.csv")
+            checkpoint = os.path.join(directory, "catalog.checkpoint")
+            with open(path, "w") as f:
+                f.write(self.CSV)
+            with open(checkpoint, "w") as f:
+                json.dump({"source": os.path.abspath(path), "last_record": 3}, f)
+
+            out = StringIO()
+            call_command("import_products", path, "--checkpoint", checkpoint, stdout=out)
+            self.assertIn("Resuming after record 3", out.getvalue())
+            self.assertFalse(os.path.exists(checkpoint))
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["IMP-2"])
+
+    def test_upload_resumes_only_the_same_file(self):
+        """An import_id checkpoint resumes its own file, rejects another one and is cleared when done."""
+        import hashlib
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_authenticate(user=self.admin)
+        fingerprint = hashlib.sha256(self.CSV.encode()).hexdigest()
+        cache.set("catalog_import:resume", {"fingerprint": fingerprint, "last_record": 3}, 60)
+
+        other = SimpleUploadedFile("catalog.csv", self.CSV.replace("IMP-", "OTHER-").encode(), content_type="text/csv")
+        response = self.client.post("/api/v1/products/catalog/import/", {"file": other, "import_id": "resume"})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Product.objects.exists())
+
+        upload = SimpleUploadedFile("catalog.csv", self.CSV.encode(), content_type="text/csv")
+        response = self.client.post("/api/v1/products/catalog/import/", {"file": upload, "import_id": "resume"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["resumed_after"], 3)
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["IMP-2"])
+        self.assertIsNone(cache.get("catalog_import:resume"))
+
+    def test_export_streams_what_import_reads(self):
+        """The exported JSONL imports back unchanged."""
+        import json
+
+        self.run_import(self.CSV)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get("/api/v1/products/catalog/export/?file_format=jsonl")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(record["type"], record.get("sku")) for record in records], [
+            ("product", "IMP-1"), ("variant", "IMP-1-L"), ("image", None), ("product", "IMP-2"),
+        ])
+
+        Product.objects.filter(sku="IMP-1").update(price=1)
+        summary = self.run_import(content, "jsonl")
+        self.assertEqual(summary["error_count"], 0, summary["errors"])
+        self.assertEqual(str(Product.objects.get(sku="IMP-1").price), "19.99")
+
+    def test_endpoints_are_admin_only(self):
+        """Customers can neither import nor export; admins import uploads."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        customer = User.objects.create_user(email="customer@example.com", password="testpass123")
+        self.client.force_authenticate(user=customer)
+        self.assertEqual(self.client.get("/api/v1/products/catalog/export/").status_code, 403)
+
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile("catalog.csv", self.CSV.encode(), content_type="text/csv")
+        response = self.client.post("/api/v1/products/catalog/import/", {"file": upload, "import_id": "first"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["products"], 2)
+        self.assertIsNone(cache.get("catalog_import:first"))
+
+        response = self.client.get("/api/v1/products/catalog/export/")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertTrue(lines[0].startswith("type,sku,product_sku,name,slug"))
+        self.assertEqual(len(lines), 5)
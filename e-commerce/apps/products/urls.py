@@ -1,11 +1,24 @@
 # apps/products/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    category_list = async_views.AsyncCategoryListView.as_view()
+    product_list = async_views.AsyncProductListView.as_view()
+    product_detail = async_views.AsyncProductDetailView.as_view()
+else:
+    category_list = views.CategoryListView.as_view()
+    product_list = views.ProductListView.as_view()
+    product_detail = views.ProductDetailView.as_view()
+
 urlpatterns = [
-    path('categories/', views.CategoryListView.as_view(), name='category_list'),
-    path('', views.ProductListView.as_view(), name='product_list'),
-    path('<slug:slug>/', views.ProductDetailView.as_view(), name='product_detail'),
+    path('categories/', category_list, name='category_list'),
+    path('catalog/import/', views.import_catalog, name='catalog_import'),
+    path('catalog/export/', views.export_catalog, name='catalog_export'),
+    path('', product_list, name='product_list'),
+    path('<slug:slug>/', product_detail, name='product_detail'),
     path('<slug:slug>/reviews/', views.ProductReviewListCreateView.as_view(), name='product_reviews'),
     path('<slug:slug>/wishlist/', views.toggle_wishlist, name='toggle_wishlist'),
     path('wishlist/me/', views.user_wishlist, name='user_wishlist'),
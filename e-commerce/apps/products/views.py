@@ -1,12 +1,18 @@
+import hashlib
+
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
 from drf_spectacular.utils import extend_schema
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
-from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.db.models import Avg, Count, Prefetch, Q
 
 from .models import Category, Product, Review, Wishlist
 from .serializers import (
@@ -14,7 +20,74 @@ from .serializers import (
     ReviewSerializer, WishlistSerializer
 )
 from apps.orders.models import OrderItem
+from utils.catalog_io import CONTENT_TYPES, FORMATS, CatalogImporter, detect_format, export_lines
 from utils.pagination import StandardPagination
+from utils.permissions import IsAdminUser
+
+
+def product_list_queryset(active_only: bool = True):
+    """
+    Active products with everything ProductListSerializer reads.
+
+    Review count and rating are annotated and images prefetched, so
+    serializing a page costs no per-product queries (shared by the sync and
+    async list views, and prefetched for cart and order items with
+    active_only=False).
+    """
+    approved = Q(reviews__is_approved=True)
+    products = Product.objects.filter(is_active=True) if active_only else Product.objects.all()
+    return products.select_related(
+        'category'
+    ).prefetch_related(
+        'images'  # Prefetch related images to avoid N+1
+    ).only(
+        'id', 'name', 'slug', 'price', 'compare_price', 'quantity', 'track_inventory',
+        'is_featured', 'is_active', 'category_id', 'created_at'
+    ).annotate(
+        approved_review_count=Count('reviews', filter=approved),
+        approved_rating=Avg('reviews__rating', filter=approved),
+    )
+
+
+def category_queryset(include_inactive=False):
+    """Categories annotated with the active product count CategorySerializer reads"""
+    queryset = Category.objects.annotate(
+        active_product_count=Count('products', filter=Q(products__is_active=True))
+    )
+    if not include_inactive:
+        queryset = queryset.filter(is_active=True)
+    return queryset
+
+
+def link_category_tree(categories) -> dict:
+    """
+    Attach each category's active children as ``active_children``, so
+    CategorySerializer renders the tree at any depth without further queries.
+
+    Returns:
+        Dictionary of category id -> Category
+    """
+    categories = {category.pk: category for category in categories}
+    for category in categories.values():
+        category.active_children = []
+    for category in categories.values():
+        parent = categories.get(category.parent_id)
+        if parent is not None and category.is_active:
+            parent.active_children.append(category)
+    return categories
+
+
+def product_detail_queryset():
+    """Active products with the relations ProductDetailSerializer reads"""
+    return Product.objects.filter(is_active=True).select_related(
+        'category'
+    ).prefetch_related(
+        'images',
+        'variants',
+        Prefetch('reviews', queryset=Review.objects.filter(is_approved=True).select_related('user'))
+    ).annotate(
+        approved_rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
+    )
 
 
 class CategoryListView(generics.ListAPIView):
@@ -22,6 +95,7 @@ class CategoryListView(generics.ListAPIView):
     
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'catalog'
     
     def get_queryset(self):
         # Prevent errors during schema generation
@@ -33,17 +107,12 @@ class CategoryListView(generics.ListAPIView):
         categories = cache.get(cache_key)
         
         if categories is None:
-            # Query optimization: only get root categories with select_related
-            categories = Category.objects.filter(
-                is_active=True, 
-                parent__isnull=True
-            ).prefetch_related(
-                Prefetch('children', queryset=Category.objects.filter(is_active=True))
-            )
+            # One annotated query; children are linked in memory at every depth
+            tree = link_category_tree(category_queryset())
+            categories = [category for category in tree.values() if category.parent_id is None]
             # Cache for 1 hour
-            cache.set(cache_key, list(categories), 3600)
-            return categories
-        
+            cache.set(cache_key, categories, 3600)
+
         return categories
 
 
@@ -59,18 +128,13 @@ class ProductListView(generics.ListAPIView):
     ordering = ['-created_at']
     pagination_class = StandardPagination
     
+    def get_throttle_scope(self, request):
+        # Full-text searches cost far more than browsing
+        return 'search' if request.query_params.get(api_settings.SEARCH_PARAM) else 'catalog'
+    
     def get_queryset(self):
-        # Query optimization: use select_related for foreign keys
-        queryset = Product.objects.filter(is_active=True).select_related(
-            'category'
-        ).prefetch_related(
-            'images',  # Prefetch related images to avoid N+1
-            Prefetch('reviews', queryset=Review.objects.filter(is_approved=True))
-        ).only(
-            'id', 'name', 'slug', 'price', 'compare_price', 'quantity',
-            'is_featured', 'is_active', 'category_id'
-        )
-        return queryset
+        # Query optimization: select_related, prefetched images, annotated ratings
+        return product_list_queryset()
 
 
 class ProductDetailView(generics.RetrieveAPIView):
@@ -78,17 +142,12 @@ class ProductDetailView(generics.RetrieveAPIView):
     
     serializer_class = ProductDetailSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'catalog'
     lookup_field = 'slug'
     
     def get_queryset(self):
         # Use prefetch_related to avoid N+1 queries on related objects
-        return Product.objects.filter(is_active=True).select_related(
-            'category'
-        ).prefetch_related(
-            'images',
-            'variants',
-            Prefetch('reviews', queryset=Review.objects.filter(is_approved=True).select_related('user'))
-        )
+        return product_detail_queryset()
     
     def retrieve(self, request, *args, **kwargs):
         # Implement caching for product details (for anonymous users)
@@ -119,6 +178,9 @@ class ProductReviewListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardPagination
     
+    def get_throttle_scope(self, request):
+        return 'catalog' if request.method in SAFE_METHODS else 'reviews'
+    
     def get_queryset(self):
         # Prevent errors during schema generation
         if getattr(self, 'swagger_fake_view', False):
@@ -203,3 +265,69 @@ def user_wishlist(request):
     paginated_items = paginator.paginate_queryset(wishlist_items, request)
     serializer = WishlistSerializer(paginated_items, many=True, context={'request': request})
     return paginator.get_paginated_response(serializer.data)
+
+
+@extend_schema(request=None, responses=None)
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def import_catalog(request):
+    """
+    Import products, variants and images from an uploaded CSV or JSONL file
+    (see utils.catalog_io).
+
+    The upload is read as a stream in batches. With an import_id the last
+    committed record and the file's SHA-256 are kept for a day, and uploading
+    the same file with the same import_id resumes after that record; another
+    file under that import_id is rejected. The checkpoint is deleted once the
+    import completes. Catalogs of millions of rows are better imported with
+    the import_products command.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload the catalog as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+    file_format = request.data.get('file_format') or detect_format(upload.name)
+    if file_format not in FORMATS:
+        return Response({'error': f'file_format must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    import_id = request.data.get('import_id')
+    checkpoint_key = f'catalog_import:{import_id}'
+    fingerprint = upload_fingerprint(upload) if import_id else None
+    checkpoint = cache.get(checkpoint_key) if import_id else None
+    if checkpoint and checkpoint['fingerprint'] != fingerprint:
+        return Response(
+            {'error': f'import_id {import_id} belongs to a different file'}, status=status.HTTP_409_CONFLICT
+        )
+    start_after = checkpoint['last_record'] if checkpoint else 0
+
+    def save_checkpoint(summary):
+        if import_id:
+            cache.set(checkpoint_key, {'fingerprint': fingerprint, 'last_record': summary['last_record']}, 86400)
+
+    summary = CatalogImporter(start_after=start_after, progress=save_checkpoint).run(upload.file, file_format)
+    if import_id:
+        cache.delete(checkpoint_key)
+    return Response({**summary, 'resumed_after': start_after}, status=status.HTTP_200_OK)
+
+
+def upload_fingerprint(upload) -> str:
+    """SHA-256 of an uploaded file, leaving it rewound for reading"""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+@extend_schema(request=None, responses=None)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_catalog(request):
+    """Stream the whole catalog as CSV or JSONL (?file_format=, default csv)"""
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in FORMATS:
+        return Response({'error': f'file_format must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(export_lines(file_format), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+    return response
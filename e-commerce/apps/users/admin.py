@@ -28,6 +28,14 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('email', 'password1', 'password2', 'first_name', 'last_name'),
         }),
     )
+    
+    # Changes that must not wait for outstanding JWTs to expire
+    TOKEN_REVOKING_FIELDS = {'email', 'password', 'is_active', 'is_staff', 'is_superuser'}
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and self.TOKEN_REVOKING_FIELDS.intersection(form.changed_data):
+            obj.revoke_tokens()
 
 
 @admin.register(UserProfile)
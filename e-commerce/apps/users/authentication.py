@@ -0,0 +1,115 @@
+"""
+Authentication backends for the API
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import (
+    TOKEN_VERSION_CLAIM, acurrent_token_version, current_token_version, token_cache, user_from_claims
+)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a user query per request.
+
+    Algorithm: A raw token seen within JWT_USER_CACHE_TTL seconds is served
+    from the in-process LRU (no signature check, no I/O). Otherwise the
+    token is validated and its version claim compared with the user's
+    current token version from the shared cache (one cache read, a database
+    read only on a cache miss). request.user is built from the claims and
+    loads the rest of its row only if a view touches another field. Tokens
+    issued before the claims existed fall back to the database lookup.
+    """
+
+    def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        validated_token = token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = self.get_validated_token(raw_token)
+            if TOKEN_VERSION_CLAIM not in validated_token:
+                return self.get_user(validated_token), validated_token
+
+            user_id = self.get_user_id(validated_token)
+            self.check_version(validated_token, current_token_version(user_id))
+            self.cache_token(raw_token, validated_token)
+
+        return user_from_claims(validated_token), validated_token
+
+    def get_request_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_version(validated_token, current_version: int):
+        """
+        Raises:
+            AuthenticationFailed: If the token was issued before a revocation
+        """
+        if validated_token[TOKEN_VERSION_CLAIM] != current_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+    @staticmethod
+    def cache_token(raw_token, validated_token):
+        # Never keep a token in the cache past its expiry
+        remaining = validated_token['exp'] - validated_token.current_time.timestamp()
+        token_cache.set(raw_token, validated_token, ttl=min(remaining, token_cache.ttl))
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """
+    JWT authentication for async views.
+
+    Token validation is pure CPU work; the version check and the fallback
+    user lookup go through the async cache and ORM.
+    """
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+
+        validated_token = token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = self.get_validated_token(raw_token)
+            if TOKEN_VERSION_CLAIM not in validated_token:
+                return await self.aget_user(validated_token), validated_token
+
+            user_id = self.get_user_id(validated_token)
+            self.check_version(validated_token, await acurrent_token_version(user_id))
+            self.cache_token(raw_token, validated_token)
+
+        return user_from_claims(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Async counterpart of JWTAuthentication.get_user"""
+        user_id = self.get_user_id(validated_token)
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
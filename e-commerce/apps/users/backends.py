@@ -0,0 +1,64 @@
+"""
+Authentication backend verifying passwords in the bounded hash pool
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.db import close_old_connections
+
+from .hashers import hash_pool
+
+
+def rehash_password(user_id, old_encoded: str, raw_password: str):
+    """
+    Store the password under the preferred hasher and parameters.
+
+    Algorithm: Conditional update on the old hash, so a password changed
+    while the rehash was queued is never overwritten.
+    """
+    get_user_model().objects.filter(pk=user_id, password=old_encoded).update(password=make_password(raw_password))
+
+
+def _background_rehash(user_id, old_encoded: str, raw_password: str):
+    try:
+        rehash_password(user_id, old_encoded, raw_password)
+    finally:
+        # Pool threads live on; don't keep their connections past CONN_MAX_AGE
+        close_old_connections()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend whose password checks run in hashers.hash_pool.
+
+    Algorithm: Look the user up by email, verify the password in the pool
+    (an unknown email hashes the password anyway so response times don't
+    reveal which accounts exist), and when the stored hash uses an older
+    hasher or other cost parameters queue a background rehash instead of
+    saving it inside the login request.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            hash_pool.run(make_password, password)
+            return None
+
+        is_correct, must_update = hash_pool.run(verify_password, password, user.password)
+        if not (is_correct and self.user_can_authenticate(user)):
+            return None
+
+        if must_update:
+            if settings.PASSWORD_REHASH_IN_BACKGROUND:
+                hash_pool.submit(_background_rehash, user.pk, user.password, password)
+            else:
+                rehash_password(user.pk, user.password, password)
+        return user
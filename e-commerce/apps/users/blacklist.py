@@ -0,0 +1,210 @@
+"""
+Cached refresh token blacklist.
+
+Membership lives in the shared cache (Redis in production): one key per
+blacklisted jti that expires with the token, so a check is a single O(1)
+cache read and the set never outgrows the live tokens. The
+token_blacklist tables stay the system of record: blacklist entries are
+written in the request so a restart cannot lose them, while the far more
+frequent outstanding-token inserts are batched by a per-process background
+writer that is flushed when the process exits.
+
+While the cache has not been (re)loaded from the tables - a fresh or
+flushed Redis, marked by a missing READY_KEY - checks fall back to the
+database; tasks.warm_token_blacklist reloads the cache and sets the marker.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+logger = logging.getLogger(__name__)
+
+READY_KEY = 'jwt_blacklist_ready'
+
+_STOP = object()
+
+
+def blacklist_key(jti: str) -> str:
+    return f'jwt_blacklist_{jti}'
+
+
+def is_blacklisted(jti: str) -> bool:
+    """Check a refresh token's jti with one cache round trip"""
+    key = blacklist_key(jti)
+    values = cache.get_many([key, READY_KEY])
+    if key in values:
+        return True
+    if READY_KEY in values:
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def cache_blacklisted(jti: str, exp: int):
+    """Add a jti to the cached blacklist until the token expires"""
+    ttl = exp - int(time.time())
+    if ttl > 0:
+        cache.set(blacklist_key(jti), 1, ttl)
+
+
+def token_record(token, blacklisted: bool) -> dict:
+    """Row data for the token_blacklist tables (JSON-friendly for the writer queue)"""
+    return {
+        'jti': token[api_settings.JTI_CLAIM],
+        'user_id': token.get(api_settings.USER_ID_CLAIM),
+        'token': str(token),
+        'iat': token.get('iat'),
+        'exp': token['exp'],
+        'blacklisted': blacklisted,
+    }
+
+
+def write_records(records: list) -> dict:
+    """
+    Store outstanding and blacklisted tokens.
+
+    Algorithm: One bulk insert of outstanding tokens (existing jtis are
+    skipped), one query for their ids and one bulk insert of blacklist
+    entries, however many tokens the batch holds.
+
+    Returns:
+        Dictionary with outstanding and blacklisted counts
+    """
+    outstanding = {
+        record['jti']: OutstandingToken(
+            user_id=record['user_id'],
+            jti=record['jti'],
+            token=record['token'],
+            created_at=datetime_from_epoch(record['iat']) if record['iat'] else timezone.now(),
+            expires_at=datetime_from_epoch(record['exp']),
+        )
+        for record in records
+    }
+    OutstandingToken.objects.bulk_create(outstanding.values(), ignore_conflicts=True)
+
+    blacklisted_jtis = {record['jti'] for record in records if record['blacklisted']}
+    if blacklisted_jtis:
+        token_ids = OutstandingToken.objects.filter(jti__in=blacklisted_jtis).values_list('id', flat=True)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in token_ids], ignore_conflicts=True
+        )
+    return {'outstanding': len(outstanding), 'blacklisted': len(blacklisted_jtis)}
+
+
+class BlacklistWriter:
+    """
+    Per-process background thread writing token records in batches.
+
+    submit() never blocks the request; records are drained into batches of
+    up to JWT_BLACKLIST_BATCH_SIZE. flush() writes whatever is still queued
+    and runs at interpreter exit and from gunicorn's worker_exit hook. With
+    JWT_BLACKLIST_WRITE_BEHIND off (tests) records are written synchronously.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record: dict):
+        if not settings.JWT_BLACKLIST_WRITE_BEHIND:
+            write_records([record])
+            return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='jwt-blacklist-writer', daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float = 5):
+        """Stop the writer thread and write every queued record"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        while True:
+            records, _ = self._next_batch(block=False)
+            if not records:
+                break
+            self._write(records)
+
+    def _run(self):
+        while True:
+            records, stop = self._next_batch(block=True)
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _next_batch(self, block: bool):
+        """Up to JWT_BLACKLIST_BATCH_SIZE queued records and whether flush() asked to stop"""
+        batch_size = settings.JWT_BLACKLIST_BATCH_SIZE
+        records = []
+        while len(records) < batch_size:
+            try:
+                # Wait for the first record only
+                record = self._queue.get(block=block and not records)
+            except queue.Empty:
+                break
+            if record is _STOP:
+                return records, True
+            records.append(record)
+        return records, False
+
+    def _write(self, records: list):
+        try:
+            write_records(records)
+        except Exception as e:
+            logger.error(f"Failed to record {len(records)} JWT tokens: {e}")
+        finally:
+            close_old_connections()
+
+
+writer = BlacklistWriter()
+atexit.register(writer.flush)
+
+
+def record_outstanding(token):
+    """Record a newly issued refresh token"""
+    writer.submit(token_record(token, blacklisted=False))
+
+
+def blacklist(token):
+    """Blacklist a refresh token in the cache and the tables before returning"""
+    cache_blacklisted(token[api_settings.JTI_CLAIM], token['exp'])
+    write_records([token_record(token, blacklisted=True)])
+
+
+def warm_cache(chunk_size: int = 1000) -> int:
+    """
+    Load unexpired blacklist entries into the cache and mark it ready.
+
+    Returns:
+        Number of entries cached
+    """
+    entries = (
+        BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        .values_list('token__jti', 'token__expires_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    count = 0
+    for jti, expires_at in entries:
+        cache_blacklisted(jti, int(expires_at.timestamp()))
+        count += 1
+    cache.set(READY_KEY, 1, None)
+    return count
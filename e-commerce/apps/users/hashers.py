@@ -0,0 +1,114 @@
+"""
+Password hashing for login throughput.
+
+TunedArgon2PasswordHasher takes its cost from settings (Argon2id, memory
+and time cost from PASSWORD_ARGON2_*), so the work per login can be sized
+for the web tier. Raising or lowering a parameter makes Django's
+must_update() flag existing hashes, and backends.PooledModelBackend
+rehashes them after the next successful login.
+
+hash_pool bounds how many password hashes a process computes at once.
+Argon2 and PBKDF2 both release the GIL while hashing, so a thread pool runs
+them in parallel; requests beyond the pool and its queue wait at most
+PASSWORD_HASH_QUEUE_TIMEOUT seconds and then get a 503 instead of piling up
+on every worker thread.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+from utils.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with the cost parameters from settings"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class HashPool:
+    """
+    Bounded per-process pool for password hashing.
+
+    Algorithm: A semaphore admits PASSWORD_HASH_WORKERS running plus
+    PASSWORD_HASH_QUEUE_SIZE queued jobs. run() waits up to
+    PASSWORD_HASH_QUEUE_TIMEOUT seconds for a slot and blocks on the
+    result; submit() is fire-and-forget and drops the job when the pool is
+    full (background work must never delay a login).
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        queue_size = settings.PASSWORD_HASH_QUEUE_SIZE if queue_size is None else queue_size
+        self.capacity = self.workers + queue_size
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+    def _submit(self, fn, *args):
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """
+        Run fn(*args) in the pool and return its result.
+
+        Raises:
+            ServiceUnavailableError: If no slot frees up in time
+        """
+        if not self._slots.acquire(timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT):
+            raise ServiceUnavailableError('Too many sign-in attempts in progress. Please try again shortly.')
+        return self._submit(fn, *args).result()
+
+    def submit(self, fn, *args) -> bool:
+        """Queue fn(*args) in the background; returns False if the pool is full"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        future = self._submit(fn, *args)
+        future.add_done_callback(self._log_failure)
+        return True
+
+    @staticmethod
+    def _log_failure(future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Background password hashing failed: {error}")
+
+    def reset(self):
+        """Drop the executor (its threads do not survive a fork)"""
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.capacity)
+
+
+hash_pool = HashPool()
+os.register_at_fork(after_in_child=hash_pool.reset)
@@ -38,6 +38,8 @@ class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # Carried in JWTs; bumping it revokes every token issued before
+    token_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -60,6 +62,25 @@ class User(AbstractUser):
     
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # A user built from token claims loads the rest of its row on the
+        # first deferred field access instead of one query per field
+        if fields is not None and getattr(self, 'from_token', False):
+            fields = list({*fields, *self.get_deferred_fields()})
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+    
+    def revoke_tokens(self):
+        """
+        Invalidate every JWT issued to this user so far (password change,
+        password reset, deactivation). Takes effect on all workers within
+        JWT_USER_CACHE_TTL seconds.
+        """
+        from .tokens import publish_token_version
+        
+        User.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.token_version = User.objects.values_list('token_version', flat=True).get(pk=self.pk)
+        publish_token_version(self.pk, self.token_version)
 
 
 class UserProfile(models.Model):
@@ -1,8 +1,13 @@
 # apps/users/serializers.py
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
 from .models import User, UserProfile, Address
+from .blacklist import record_outstanding
+from .tokens import TOKEN_VERSION_CLAIM, RefreshToken, add_user_claims
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -147,4 +152,35 @@ class UserSerializer(serializers.ModelSerializer):
                 setattr(profile, attr, value)
             profile.save()
         
-        return instance
\ No newline at end of file
+        return instance
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh serializer that re-reads the user: revoked tokens and inactive
+    users are rejected, and the new tokens carry up-to-date claims.
+    """
+    
+    token_class = RefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None or refresh.get(TOKEN_VERSION_CLAIM, user.token_version) != user.token_version:
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        add_user_claims(refresh, user)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            record_outstanding(refresh)
+            
+            data['refresh'] = str(refresh)
+        
+        return data
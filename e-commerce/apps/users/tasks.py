@@ -1,106 +1,92 @@
 # apps/users/tasks.py
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
-def send_verification_email(self, user_id, token):
-    """Send email verification link to user"""
+def _send_user_email(task, kind, user_id, **context):
+    """Send one account email, retrying the task on failure"""
     try:
-        from .models import User
+        from apps.notifications.services import TransactionalEmailService
         
-        user = User.objects.get(id=user_id)
-        verification_url = f"{settings.FRONTEND_URL}/verify-email/{token}"
+        sent = TransactionalEmailService.send_user_emails(kind, [user_id], {str(user_id): context})
         
-        subject = 'Verify Your Email Address'
-        html_message = render_to_string('emails/verify_email.html', {
-            'user': user,
-            'verification_url': verification_url,
-        })
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Verification email sent to {user.email}")
-        return f"Email sent to {user.email}"
+        logger.info(f"Sent {sent} {kind} email(s) to user {user_id}")
+        return f"Sent {sent} {kind} email(s) to user {user_id}"
         
     except Exception as e:
-        logger.error(f"Failed to send verification email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)  # Retry after 60 seconds
+        logger.error(f"Failed to send {kind} email: {str(e)}")
+        raise task.retry(exc=e, countdown=60)  # Retry after 60 seconds
+
+
+@shared_task(bind=True, max_retries=3)
+def send_verification_email(self, user_id, token):
+    """Send email verification link to user"""
+    verification_url = f"{settings.FRONTEND_URL}/verify-email/{token}"
+    return _send_user_email(self, 'verify_email', user_id, verification_url=verification_url)
 
 
 @shared_task(bind=True, max_retries=3)
 def send_password_reset_email(self, user_id, token):
     """Send password reset link to user"""
+    reset_url = f"{settings.FRONTEND_URL}/reset-password/{token}"
+    return _send_user_email(self, 'reset_password', user_id, reset_url=reset_url)
+
+
+@shared_task(bind=True, max_retries=3)
+def send_welcome_email(self, user_id):
+    """Send welcome email after verification"""
+    return _send_user_email(self, 'welcome', user_id)
+
+
+@shared_task
+def cleanup_expired_tokens():
+    """Purge expired account tokens, JWT records and sessions in small chunks"""
     try:
-        from .models import User
-        
-        user = User.objects.get(id=user_id)
-        reset_url = f"{settings.FRONTEND_URL}/reset-password/{token}"
+        from django.contrib.sessions.models import Session
+        from django.db.models import Q
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from apps.users.models import EmailVerificationToken, PasswordResetToken
+        from utils.purge import purge_queryset
         
-        subject = 'Reset Your Password'
-        html_message = render_to_string('emails/reset_password.html', {
-            'user': user,
-            'reset_url': reset_url,
-        })
-        plain_message = strip_tags(html_message)
+        now = timezone.now()
+        targets = {
+            'email_verification_tokens': EmailVerificationToken.objects.filter(expires_at__lt=now),
+            'password_reset_tokens': PasswordResetToken.objects.filter(Q(expires_at__lt=now) | Q(is_used=True)),
+            # Blacklist entries go first so outstanding tokens are left without cascades
+            'blacklisted_tokens': BlacklistedToken.objects.filter(token__expires_at__lt=now),
+            'outstanding_tokens': OutstandingToken.objects.filter(expires_at__lt=now),
+            'sessions': Session.objects.filter(expire_date__lt=now),
+        }
         
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        results = {name: purge_queryset(queryset) for name, queryset in targets.items()}
+        deleted = sum(result['deleted'] for result in results.values())
         
-        logger.info(f"Password reset email sent to {user.email}")
-        return f"Email sent to {user.email}"
+        logger.info(f"Token cleanup completed: {deleted} rows purged")
+        return results
         
     except Exception as e:
-        logger.error(f"Failed to send password reset email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        logger.error(f"Error cleaning up tokens: {str(e)}")
+        raise
 
 
-@shared_task(bind=True, max_retries=3)
-def send_welcome_email(self, user_id):
-    """Send welcome email after verification"""
+@shared_task
+def warm_token_blacklist():
+    """Reload the cached JWT blacklist from the database after a cache flush"""
     try:
-        from .models import User
-        
-        user = User.objects.get(id=user_id)
-        
-        subject = 'Welcome to Our E-commerce Store!'
-        html_message = render_to_string('emails/welcome.html', {
-            'user': user,
-        })
-        plain_message = strip_tags(html_message)
+        from django.core.cache import cache
+        from apps.users.blacklist import READY_KEY, warm_cache
         
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        if cache.get(READY_KEY):
+            return 0
         
-        logger.info(f"Welcome email sent to {user.email}")
-        return f"Welcome email sent to {user.email}"
+        count = warm_cache()
+        logger.info(f"JWT blacklist cache warmed with {count} entries")
+        return count
         
     except Exception as e:
-        logger.error(f"Failed to send welcome email: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
\ No newline at end of file
+        logger.error(f"Error warming JWT blacklist cache: {str(e)}")
+        raise
@@ -2,10 +2,13 @@
 Tests for the Users app.
 """
 import pytest
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from utils.testing import PerformanceAssertionsMixin
 
 User = get_user_model()
 
@@ -96,3 +99,420 @@ class UserAPITests(TestCase):
             status.HTTP_403_FORBIDDEN,
             status.HTTP_404_NOT_FOUND,
         ])
+
+
+@pytest.mark.django_db(transaction=True)
+class StatelessJWTAuthenticationTests(TestCase):
+    """Test token-claim authentication, lazy user loading and revocation."""
+
+    def setUp(self):
+        """Set up test data."""
+        from django.core.cache import cache
+        from apps.users.tokens import token_cache
+
+        cache.clear()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="claims@example.com", password="testpass123", first_name="Claim", phone_number="555",
+        )
+        response = self.client.post("/api/v1/auth/login/", {"email": "claims@example.com", "password": "testpass123"})
+        self.tokens = response.data["tokens"]
+
+    def authenticate(self, access):
+        """Run the authentication class on a request carrying the token"""
+        from rest_framework.test import APIRequestFactory
+        from apps.users.authentication import StatelessJWTAuthentication
+
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access}")
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_user_built_from_claims(self):
+        """Only a cold version cache costs a query; other fields load lazily in one query."""
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate(self.tokens["access"])
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(self.tokens["access"])
+            self.assertEqual((user.pk, user.email, user.is_staff), (self.user.pk, "claims@example.com", False))
+
+        with self.assertNumQueries(1):
+            self.assertEqual((user.first_name, user.phone_number), ("Claim", "555"))
+            self.assertTrue(user.check_password("testpass123"))
+
+        response = self.client.get("/api/v1/auth/me/", HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(response.data["first_name"], "Claim")
+
+    def test_revoked_tokens_rejected(self):
+        """Revoking bumps the token version; old access and refresh tokens stop working."""
+        from rest_framework.exceptions import AuthenticationFailed
+
+        self.authenticate(self.tokens["access"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.tokens["access"])
+        response = self.client.post("/api/v1/auth/refresh/", {"refresh": self.tokens["refresh"]})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_issues_new_tokens(self):
+        """Changing the password signs out old tokens and returns fresh ones."""
+        from rest_framework.exceptions import AuthenticationFailed
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/auth/password/change/",
+                {"old_password": "testpass123", "new_password": "N3w-passw0rd!", "new_password_confirm": "N3w-passw0rd!"},
+                HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.tokens["access"])
+        user, _ = self.authenticate(response.data["tokens"]["access"])
+        self.assertEqual(user.pk, self.user.pk)
+
+        refreshed = self.client.post("/api/v1/auth/refresh/", {"refresh": response.data["tokens"]["refresh"]})
+        self.assertEqual(refreshed.status_code, status.HTTP_200_OK)
+
+    def test_tokens_without_claims_fall_back_to_database(self):
+        """Tokens issued before the claims existed still authenticate with a user query."""
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate(str(AccessToken.for_user(self.user)))
+        self.assertFalse(getattr(user, "from_token", False))
+
+
+@pytest.mark.django_db(transaction=True)
+class TokenBlacklistTests(TestCase):
+    """Test the cached refresh token blacklist and its database records."""
+
+    def setUp(self):
+        """Set up test data."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="refresh@example.com", password="testpass123")
+
+    @mock.patch.multiple(jwt_settings, ROTATE_REFRESH_TOKENS=True, BLACKLIST_AFTER_ROTATION=True)
+    def test_rotation_blacklists_old_token(self):
+        """A rotated refresh token is rejected; both tokens are recorded in the tables."""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from apps.users.blacklist import warm_cache
+        from apps.users.tokens import RefreshToken
+
+        warm_cache()
+        refresh = RefreshToken.for_user(self.user)
+        response = self.client.post("/api/v1/auth/refresh/", {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Membership checks are cache reads once the cache is warm
+        with self.assertNumQueries(0):
+            RefreshToken(response.data["refresh"])
+        reused = self.client.post("/api/v1/auth/refresh/", {"refresh": str(refresh)})
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        new_jti = RefreshToken(response.data["refresh"])["jti"]
+        self.assertEqual(set(OutstandingToken.objects.values_list("jti", flat=True)), {refresh["jti"], new_jti})
+        self.assertEqual(list(BlacklistedToken.objects.values_list("token__jti", flat=True)), [refresh["jti"]])
+
+    def test_flushed_cache_falls_back_and_rewarms(self):
+        """After a cache flush checks use the database until the warm task reloads the cache."""
+        from django.core.cache import cache
+        from rest_framework_simplejwt.exceptions import TokenError
+        from apps.users.tasks import warm_token_blacklist
+        from apps.users.tokens import RefreshToken
+
+        refresh = RefreshToken.for_user(self.user)
+        refresh.blacklist()
+        cache.clear()
+
+        with self.assertNumQueries(1), self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+        self.assertEqual(warm_token_blacklist(), 1)
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+
+    def test_write_records_in_batches(self):
+        """A batch is written with a fixed number of queries and tolerates duplicates."""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from apps.users.blacklist import token_record, write_records
+        from apps.users.tokens import RefreshToken
+
+        tokens = [RefreshToken.for_user(self.user) for _ in range(5)]
+        records = [token_record(token, blacklisted=True) for token in tokens]
+        with self.assertNumQueries(3):
+            write_records(records + records[:2])
+
+        self.assertEqual(OutstandingToken.objects.count(), 5)
+        self.assertEqual(BlacklistedToken.objects.count(), 5)
+
+    @override_settings(JWT_BLACKLIST_WRITE_BEHIND=True)
+    def test_queued_records_survive_shutdown(self):
+        """Blacklist entries are stored immediately; queued outstanding tokens are written by flush()."""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from apps.users.blacklist import BlacklistWriter, writer
+        from apps.users.tokens import RefreshToken
+
+        # Keep the writer thread from draining the queue
+        with mock.patch.object(BlacklistWriter, "_ensure_started"):
+            tokens = [RefreshToken.for_user(self.user) for _ in range(3)]
+            tokens[0].blacklist()
+            self.assertEqual(list(BlacklistedToken.objects.values_list("token__jti", flat=True)), [tokens[0]["jti"]])
+            self.assertEqual(OutstandingToken.objects.count(), 1)
+
+            writer.flush()
+        self.assertEqual(set(OutstandingToken.objects.values_list("jti", flat=True)), {t["jti"] for t in tokens})
+
+
+@pytest.mark.django_db(transaction=True)
+class PasswordHashingTests(TestCase):
+    """Test tuned Argon2 hashing, rehash on login and the bounded hash pool."""
+
+    hashers = override_settings(
+        PASSWORD_HASHERS=[
+            "apps.users.hashers.TunedArgon2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ],
+        PASSWORD_ARGON2_TIME_COST=1,
+        PASSWORD_ARGON2_MEMORY_COST=1024,
+        PASSWORD_ARGON2_PARALLELISM=1,
+    )
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="hash@example.com", password="testpass123")
+
+    def login(self, password="testpass123"):
+        return self.client.post("/api/v1/auth/login/", {"email": "hash@example.com", "password": password})
+
+    def test_login_rehashes_old_hash(self):
+        """A successful login upgrades an MD5 hash to Argon2id with the configured cost."""
+        from django.contrib.auth.hashers import identify_hasher
+
+        self.assertTrue(self.user.password.startswith("md5$"))
+        with self.hashers:
+            response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.user.refresh_from_db()
+            decoded = identify_hasher(self.user.password).decode(self.user.password)
+        self.assertEqual(decoded["variety"], "argon2id")
+        self.assertEqual((decoded["time_cost"], decoded["memory_cost"]), (1, 1024))
+
+        # Tokens issued before the rehash stay valid: it is not a password change
+        self.assertEqual(self.user.token_version, 0)
+
+    def test_cost_change_rehashes_and_wrong_password_does_not(self):
+        """New cost parameters rehash on the next successful login only."""
+        with self.hashers:
+            self.login()
+            self.user.refresh_from_db()
+            argon2_hash = self.user.password
+
+            with override_settings(PASSWORD_ARGON2_TIME_COST=2):
+                self.assertEqual(self.login("wrongpass").status_code, status.HTTP_400_BAD_REQUEST)
+                self.user.refresh_from_db()
+                self.assertEqual(self.user.password, argon2_hash)
+
+                self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+                self.user.refresh_from_db()
+                self.assertNotEqual(self.user.password, argon2_hash)
+                self.assertIn("t=2", self.user.password)
+
+    def test_saturated_pool_rejects_with_503(self):
+        """When every slot is busy, login fails fast with 503 instead of queueing forever."""
+        import threading
+        from apps.users.backends import hash_pool
+        from apps.users.hashers import HashPool
+
+        pool = HashPool(workers=1, queue_size=0)
+        release = threading.Event()
+        self.assertTrue(pool.submit(release.wait, 5))
+        # Background jobs are dropped rather than waiting for a slot
+        self.assertFalse(pool.submit(release.wait, 5))
+
+        with override_settings(PASSWORD_HASH_QUEUE_TIMEOUT=0.05), \
+                mock.patch.object(hash_pool, "run", pool.run):
+            response = self.login()
+        release.set()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+
+
+@pytest.mark.django_db(transaction=True)
+class RateLimitTests(TestCase):
+    """Test the sliding window throttles, their keys and the Redis fallback."""
+
+    def setUp(self):
+        """Set up test data."""
+        from rest_framework.settings import api_settings
+        from apps.users.views import UserLoginView
+        from utils.throttling import ScopedSlidingWindowThrottle, limiter
+
+        limiter.reset()
+        self.addCleanup(limiter.reset)
+        for patcher in (
+            mock.patch.object(UserLoginView, "throttle_classes", [ScopedSlidingWindowThrottle]),
+            mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, {"login": "3/min"}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        User.objects.create_user(email="limited@example.com", password="testpass123")
+
+    def login(self, ip="10.0.0.1", **extra):
+        data = {"email": "limited@example.com", "password": "wrongpass"}
+        return self.client.post("/api/v1/auth/login/", data, REMOTE_ADDR=ip, **extra)
+
+    def test_login_scope_limits_per_ip_with_retry_after(self):
+        """The fourth login in a minute from one IP gets 429 and Retry-After; other IPs are unaffected."""
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 120)
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_spoofed_forwarded_for_does_not_reset_count(self):
+        """A client-supplied X-Forwarded-For header cannot rotate the per-IP key."""
+        from rest_framework.settings import api_settings
+
+        # Direct connections ignore the header
+        for i in range(3):
+            self.login(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}")
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR="203.0.113.9").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Behind one proxy only the address it appended counts
+        with mock.patch.object(api_settings, "NUM_PROXIES", 1):
+            for i in range(3):
+                response = self.login(ip="10.0.0.254", HTTP_X_FORWARDED_FOR=f"198.51.100.{i}, 192.0.2.7")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.login(ip="10.0.0.254", HTTP_X_FORWARDED_FOR="198.51.100.9, 192.0.2.7")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_redis_failure_falls_back_to_process_counters(self):
+        """A Redis error switches to in-process counters instead of failing requests."""
+        from utils.throttling import limiter
+
+        broken = mock.Mock(side_effect=ConnectionError("Connection refused"))
+        with mock.patch.object(limiter, "_redis_script", return_value=broken):
+            statuses = [self.login().status_code for _ in range(4)]
+        self.assertEqual(broken.call_count, 1)
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_sliding_window_weights_previous_window(self):
+        """Requests from the previous window count by their overlap with the sliding window."""
+        from utils.throttling import sliding_window
+
+        # 10/min, 8 in the previous minute, 15s into this one: 8 * 0.75 + 2 = 8 used
+        self.assertEqual(sliding_window(2, 8, 15, 60, 10), (True, 1, 0))
+        allowed, _, wait = sliding_window(4, 8, 15, 60, 10)
+        self.assertFalse(allowed)
+        # Fits again once 8 * (60 - t) / 60 + 4 + 1 <= 10, i.e. at t = 22.5s
+        self.assertAlmostEqual(wait, 7.5)
+        allowed, _, wait = sliding_window(10, 0, 15, 60, 10)
+        self.assertFalse(allowed)
+        # Current window full: wait for the next one until 10 * weight + 1 <= 10
+        self.assertAlmostEqual(wait, 45 + 6)
+
+
+@pytest.mark.django_db(transaction=True)
+class ExpiredTokenCleanupTests(TestCase):
+    """Test chunked purging of expired tokens."""
+
+    def setUp(self):
+        """Set up test data."""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.users.models import EmailVerificationToken
+
+        self.user = User.objects.create_user(email="tokens@example.com", password="testpass123")
+        now = timezone.now()
+        EmailVerificationToken.objects.bulk_create(
+            [EmailVerificationToken(user=self.user, expires_at=now - timedelta(hours=1)) for _ in range(5)]
+            + [EmailVerificationToken(user=self.user, expires_at=now + timedelta(hours=1)) for _ in range(2)]
+        )
+
+    def test_purge_deletes_in_bounded_chunks(self):
+        """Each chunk reads only primary keys and issues one DELETE."""
+        from django.utils import timezone
+        from apps.users.models import EmailVerificationToken
+        from utils.purge import purge_queryset
+
+        expired = EmailVerificationToken.objects.filter(expires_at__lt=timezone.now())
+        # per chunk: pk select, savepoint, delete, release
+        with self.assertNumQueries(12):
+            result = purge_queryset(expired, chunk_size=2, pause=0)
+
+        self.assertEqual(result["deleted"], 5)
+        self.assertEqual(result["chunks"], 3)
+        self.assertGreater(result["rows_per_second"], 0)
+        self.assertEqual(EmailVerificationToken.objects.count(), 2)
+
+    def test_cleanup_task_purges_expired_records(self):
+        """Expired account tokens and JWT records are removed, live ones kept."""
+        from datetime import timedelta
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from apps.users.models import PasswordResetToken
+        from apps.users.tasks import cleanup_expired_tokens
+
+        PasswordResetToken.objects.create(user=self.user, expires_at=timezone.now() + timedelta(hours=1), is_used=True)
+        RefreshToken.for_user(self.user).blacklist()
+        RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(blacklistedtoken__isnull=False).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        results = cleanup_expired_tokens()
+
+        self.assertEqual(results["email_verification_tokens"]["deleted"], 5)
+        self.assertEqual(results["password_reset_tokens"]["deleted"], 1)
+        self.assertEqual(results["blacklisted_tokens"]["deleted"], 1)
+        self.assertEqual(results["outstanding_tokens"]["deleted"], 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@pytest.mark.django_db(transaction=True)
+class UserQueryBudgetTests(PerformanceAssertionsMixin, TestCase):
+    """Query budgets for the account endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.created = 0
+
+    def create_user(self, addresses):
+        from apps.users.models import Address
+
+        self.created += 1
+        user = User.objects.create_user(email=f"budget{self.created}@example.com", password="testpass123")
+        Address.objects.bulk_create([
+            Address(
+                user=user, address_type="shipping", full_name="Budget", phone_number="1",
+                street_address=f"{i} Street", city="City", state="State", country="Country", zip_code="1",
+            )
+            for i in range(addresses)
+        ])
+        self.client.force_authenticate(user=user)
+        return user
+
+    def test_profile_queries(self):
+        """The profile costs at most two queries."""
+        self.create_user(addresses=3)
+        with self.assertMaxQueries(2):
+            self.assertEqual(self.client.get("/api/v1/auth/me/").status_code, status.HTTP_200_OK)
+
+    def test_address_list_queries_do_not_scale(self):
+        """The address book costs the same queries for 1 or 20 addresses."""
+        queries = self.assertQueriesDoNotScale(
+            (1, 20), self.create_user, lambda _: self.client.get("/api/v1/auth/me/addresses/"),
+        )
+        self.assertLessEqual(queries, 2)
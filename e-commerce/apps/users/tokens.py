@@ -0,0 +1,143 @@
+"""
+JWT tokens carrying the user's identity claims.
+
+Access and refresh tokens include email, is_staff, is_verified and the
+user's token_version, so API requests can be authenticated without loading
+the user row (see authentication.StatelessJWTAuthentication). Claims are
+re-read from the database on every token refresh; User.revoke_tokens()
+bumps token_version to invalidate outstanding tokens, and the current
+version is published to the shared cache so every worker sees it.
+Refresh token blacklisting goes through the cached blacklist in
+blacklist.py.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import blacklist as token_blacklist
+from utils.cache import LRUCache
+
+TOKEN_VERSION_CLAIM = 'ver'
+USER_CLAIMS = ('email', 'is_staff', 'is_verified')
+
+# Version stored for users that must not authenticate at all
+REVOKED = -1
+
+# Validated access tokens per raw token (per process)
+token_cache = LRUCache(maxsize=settings.JWT_USER_CACHE_SIZE, ttl=settings.JWT_USER_CACHE_TTL)
+
+
+def add_user_claims(token, user):
+    """Stamp the user's identity claims and token version onto a token"""
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token whose access tokens carry the user claims, checked
+    against and added to the cached blacklist.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # Skips BlacklistMixin.for_user: the outstanding row is written in the background
+        token = super(tokens.BlacklistMixin, cls).for_user(user)
+        add_user_claims(token, user)
+        token_blacklist.record_outstanding(token)
+        return token
+
+    def check_blacklist(self):
+        if token_blacklist.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        token_blacklist.blacklist(self)
+
+
+class AccessToken(tokens.AccessToken):
+    """Access token carrying the user claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_user_claims(token, user)
+        return token
+
+
+def token_version_key(user_id) -> str:
+    return f'user_token_version_{user_id}'
+
+
+def publish_token_version(user_id, version: int):
+    """Share a new token version with every worker once the change commits"""
+    def publish():
+        cache.set(token_version_key(user_id), version, settings.JWT_TOKEN_VERSION_CACHE_TTL)
+        token_cache.clear()
+
+    transaction.on_commit(publish)
+
+
+def _version_from_row(row) -> int:
+    if row is None or not row[1]:
+        return REVOKED
+    return row[0]
+
+
+def current_token_version(user_id) -> int:
+    """
+    Current token version of a user (REVOKED for unknown or inactive users).
+
+    Algorithm: Read from the shared cache; on a miss, read token_version and
+    is_active from the database and cache them.
+    """
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        version = _version_from_row(row)
+        cache.set(key, version, settings.JWT_TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+async def acurrent_token_version(user_id) -> int:
+    """Async counterpart of current_token_version"""
+    key = token_version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        row = await get_user_model().objects.filter(pk=user_id).values_list('token_version', 'is_active').afirst()
+        version = _version_from_row(row)
+        await cache.aset(key, version, settings.JWT_TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+def user_from_claims(validated_token):
+    """
+    Build a User instance from token claims without a query.
+
+    Only the claimed fields are loaded; every other field is deferred and
+    the first access to one loads the rest of the row (User.refresh_from_db).
+    The instance works as a foreign key value in filters and writes.
+    """
+    User = get_user_model()
+    claims = {
+        User._meta.get_field(api_settings.USER_ID_FIELD).attname: validated_token[api_settings.USER_ID_CLAIM],
+        'is_active': True,
+        'token_version': validated_token[TOKEN_VERSION_CLAIM],
+        **{claim: validated_token[claim] for claim in USER_CLAIMS},
+    }
+    fields = [field for field in User._meta.concrete_fields if field.attname in claims]
+    user = User.from_db(
+        router.db_for_read(User),
+        [field.attname for field in fields],
+        [field.to_python(claims[field.attname]) for field in fields],
+    )
+    user.from_token = True
+    return user
@@ -2,12 +2,13 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
+from .serializers import TokenRefreshSerializer
 
 urlpatterns = [
     path('register/', views.UserRegistrationView.as_view(), name='register'),
     path('login/', views.UserLoginView.as_view(), name='login'),
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
-    path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('refresh/', TokenRefreshView.as_view(serializer_class=TokenRefreshSerializer), name='token_refresh'),
     path('verify-email/<uuid:token>/', views.EmailVerificationView.as_view(), name='verify_email'),
     path('password/change/', views.PasswordChangeView.as_view(), name='password_change'),
     path('password/reset/', views.PasswordResetRequestView.as_view(), name='password_reset'),
@@ -1,7 +1,7 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
@@ -12,6 +12,8 @@ from .serializers import (
     PasswordResetConfirmSerializer
 )
 from .tasks import send_verification_email, send_password_reset_email
+from .tokens import RefreshToken
+from apps.notifications.outbox import enqueue_task
 from utils.pagination import StandardPagination
 
 
@@ -20,24 +22,22 @@ class UserRegistrationView(APIView):
     
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
     
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            
-            # Create email verification token
-            token = EmailVerificationToken.objects.create(
-                user=user,
-                expires_at=timezone.now() + timedelta(days=1)
-            )
-            
-            # Send verification email asynchronously
-            try:
-                send_verification_email.delay(user.id, str(token.token))
-            except Exception as e:
-                # Log error but don't fail registration if email sending fails
-                print(f"Warning: Failed to send verification email: {str(e)}")
+            with transaction.atomic():
+                user = serializer.save()
+                
+                # Create email verification token
+                token = EmailVerificationToken.objects.create(
+                    user=user,
+                    expires_at=timezone.now() + timedelta(days=1)
+                )
+                
+                # Send verification email once the user is committed (never blocks on the broker)
+                enqueue_task(send_verification_email, str(user.id), str(token.token))
             
             return Response({
                 'message': 'User registered successfully. Please check your email to verify your account.',
@@ -57,6 +57,7 @@ class UserLoginView(APIView):
     
     serializer_class = UserLoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'login'
     
     def post(self, request):
         serializer = UserLoginSerializer(data=request.data, context={'request': request})
@@ -96,6 +97,8 @@ class UserLogoutView(APIView):
             if refresh_token:
                 token = RefreshToken(refresh_token)
                 token.blacklist()
+            if request.data.get('all_devices') in (True, 'true', '1'):
+                request.user.revoke_tokens()
             return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -147,9 +150,16 @@ class PasswordChangeView(APIView):
             user = request.user
             user.set_password(serializer.validated_data['new_password'])
             user.save(update_fields=['password'])  # Update only password field
+            user.revoke_tokens()
             
+            # Other sessions are signed out; this one continues with new tokens
+            refresh = RefreshToken.for_user(user)
             return Response({
-                'message': 'Password changed successfully'
+                'message': 'Password changed successfully',
+                'tokens': {
+                    'refresh': str(refresh),
+                    'access': str(refresh.access_token),
+                },
             }, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -160,6 +170,7 @@ class PasswordResetRequestView(APIView):
     
     serializer_class = PasswordResetRequestSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'password_reset'
     
     def post(self, request):
         serializer = PasswordResetRequestSerializer(data=request.data)
@@ -170,19 +181,20 @@ class PasswordResetRequestView(APIView):
                 user = User.objects.get(email=email)
                 
                 # Create password reset token (or update existing one)
-                token, created = PasswordResetToken.objects.get_or_create(
-                    user=user,
-                    defaults={'expires_at': timezone.now() + timedelta(hours=1)}
-                )
-                
-                if not created:
-                    # Update expiry for existing token
-                    token.expires_at = timezone.now() + timedelta(hours=1)
-                    token.is_used = False
-                    token.save(update_fields=['expires_at', 'is_used'])
-                
-                # Send password reset email asynchronously
-                send_password_reset_email.delay(user.id, str(token.token))
+                with transaction.atomic():
+                    token, created = PasswordResetToken.objects.get_or_create(
+                        user=user,
+                        defaults={'expires_at': timezone.now() + timedelta(hours=1)}
+                    )
+                    
+                    if not created:
+                        # Update expiry for existing token
+                        token.expires_at = timezone.now() + timedelta(hours=1)
+                        token.is_used = False
+                        token.save(update_fields=['expires_at', 'is_used'])
+                    
+                    # Send password reset email once the token is committed (never blocks on the broker)
+                    enqueue_task(send_password_reset_email, str(user.id), str(token.token))
                 
             except User.DoesNotExist:
                 pass  # Don't reveal if email exists
@@ -199,6 +211,7 @@ class PasswordResetConfirmView(APIView):
     
     serializer_class = PasswordResetConfirmSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'password_reset'
     
     def post(self, request):
         serializer = PasswordResetConfirmSerializer(data=request.data)
@@ -215,6 +228,7 @@ class PasswordResetConfirmView(APIView):
                 user = token.user
                 user.set_password(serializer.validated_data['new_password'])
                 user.save(update_fields=['password'])
+                user.revoke_tokens()
                 
                 # Mark token as used
                 token.is_used = True
@@ -240,7 +254,8 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     
     def get_object(self):
-        return self.request.user
+        # Load the full row: request.user only carries the token claims
+        return User.objects.select_related('profile').prefetch_related('addresses').get(pk=self.request.user.pk)
 
 
 class AddressListCreateView(generics.ListCreateAPIView):
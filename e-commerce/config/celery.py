@@ -1,6 +1,8 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown
+from kombu import Exchange, Queue
 
 # Set default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
@@ -13,23 +15,218 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Auto-discover tasks from all registered Django apps
 app.autodiscover_tasks()
 
+# Queue topology: latency-sensitive emails get their own lane so bulk sends
+# and long maintenance scans can never hold up a password reset
+QUEUE_TRANSACTIONAL_EMAIL = 'transactional_email'
+QUEUE_BULK_NOTIFICATIONS = 'bulk_notifications'
+QUEUE_MAINTENANCE = 'maintenance'
+QUEUE_INVENTORY = 'inventory'
+QUEUE_DEFAULT = 'celery'
+
+MAX_PRIORITY = 10
+
+app.conf.task_queues = (
+    Queue(
+        QUEUE_TRANSACTIONAL_EMAIL,
+        Exchange(QUEUE_TRANSACTIONAL_EMAIL),
+        routing_key=QUEUE_TRANSACTIONAL_EMAIL,
+        queue_arguments={'x-max-priority': MAX_PRIORITY},
+    ),
+    Queue(QUEUE_BULK_NOTIFICATIONS, Exchange(QUEUE_BULK_NOTIFICATIONS), routing_key=QUEUE_BULK_NOTIFICATIONS),
+    Queue(QUEUE_MAINTENANCE, Exchange(QUEUE_MAINTENANCE), routing_key=QUEUE_MAINTENANCE),
+    Queue(QUEUE_INVENTORY, Exchange(QUEUE_INVENTORY), routing_key=QUEUE_INVENTORY),
+    Queue(QUEUE_DEFAULT, Exchange(QUEUE_DEFAULT), routing_key=QUEUE_DEFAULT),
+)
+app.conf.task_default_queue = QUEUE_DEFAULT
+
+# Urgency of each transactional email, from 0 (can wait) to 9 (most urgent).
+# Priorities only order work inside the transactional lane.
+TRANSACTIONAL_URGENCY = {
+    'apps.users.tasks.send_password_reset_email': 9,
+    'apps.users.tasks.send_verification_email': 7,
+    'apps.orders.tasks.send_order_confirmation': 5,
+    'apps.orders.tasks.send_order_shipped': 4,
+    'apps.orders.tasks.send_order_delivered': 4,
+    'apps.users.tasks.send_welcome_email': 3,
+}
+DEFAULT_URGENCY = 5
+
+
+def is_redis_broker(broker_url) -> bool:
+    return str(broker_url or '').split('://', 1)[0] in ('redis', 'rediss', 'sentinel')
+
+
+def broker_priority(urgency: int, redis: bool) -> int:
+    """
+    Message priority for an urgency. RabbitMQ (x-max-priority) delivers the
+    highest priority first; kombu's Redis transport polls its priority_steps
+    lists in ascending order and so delivers priority 0 first, which
+    inverts the scale.
+    """
+    return MAX_PRIORITY - 1 - urgency if redis else urgency
+
+
+def build_task_routes(redis: bool) -> dict:
+    routes = {
+        task_name: {'queue': QUEUE_TRANSACTIONAL_EMAIL, 'priority': broker_priority(urgency, redis)}
+        for task_name, urgency in TRANSACTIONAL_URGENCY.items()
+    }
+    routes.update({
+        'apps.orders.tasks.send_order_emails': {'queue': QUEUE_BULK_NOTIFICATIONS},
+        'apps.notifications.tasks.purge_old_notifications': {'queue': QUEUE_MAINTENANCE},
+        'apps.notifications.tasks.*': {'queue': QUEUE_BULK_NOTIFICATIONS},
+        'apps.products.tasks.check_low_stock_products': {'queue': QUEUE_INVENTORY},
+        'apps.orders.tasks.maintain_partitions': {'queue': QUEUE_MAINTENANCE},
+        'apps.products.tasks.*': {'queue': QUEUE_MAINTENANCE},
+        'apps.users.tasks.*': {'queue': QUEUE_MAINTENANCE},
+        'apps.payments.tasks.purge_old_webhook_events': {'queue': QUEUE_MAINTENANCE},
+    })
+    return routes
+
+
+REDIS_BROKER = is_redis_broker(app.conf.broker_url)
+app.conf.task_default_priority = broker_priority(DEFAULT_URGENCY, REDIS_BROKER)
+app.conf.task_routes = build_task_routes(REDIS_BROKER)
+
+# Redis has no native priorities: one list per step (RabbitMQ uses
+# x-max-priority above). Ignored by other transports.
+app.conf.broker_transport_options = {
+    'priority_steps': list(range(MAX_PRIORITY)),
+    'queue_order_strategy': 'priority',
+}
+
+# Idempotent tasks are acknowledged after they finish so a lost worker's
+# message is redelivered instead of dropped
+app.conf.task_annotations = {
+    'apps.notifications.tasks.send_pending_notifications': {'acks_late': True},
+    'apps.notifications.tasks.relay_outbox_messages': {'acks_late': True},
+    'apps.products.tasks.check_low_stock_products': {'acks_late': True},
+    'apps.users.tasks.cleanup_expired_tokens': {'acks_late': True},
+    'apps.users.tasks.warm_token_blacklist': {'acks_late': True},
+    'apps.notifications.tasks.purge_old_notifications': {'acks_late': True},
+    'apps.payments.tasks.process_webhook_events': {'acks_late': True},
+    'apps.payments.tasks.purge_old_webhook_events': {'acks_late': True},
+}
+app.conf.task_reject_on_worker_lost = True
+
+# Worker profiles, selected with CELERY_WORKER_PROFILE, e.g.
+#   CELERY_WORKER_PROFILE=transactional celery -A config worker
+# Short tasks that must start immediately prefetch one message per process;
+# bulk lanes prefetch more to amortize broker round trips.
+WORKER_PROFILES = {
+    'transactional': {
+        'queues': [QUEUE_TRANSACTIONAL_EMAIL],
+        'concurrency': 4,
+        'prefetch_multiplier': 1,
+    },
+    'notifications': {
+        'queues': [QUEUE_BULK_NOTIFICATIONS, QUEUE_DEFAULT],
+        'concurrency': 4,
+        'prefetch_multiplier': 4,
+    },
+    'maintenance': {
+        'queues': [QUEUE_MAINTENANCE],
+        'concurrency': 1,
+        'prefetch_multiplier': 1,
+    },
+    'inventory': {
+        'queues': [QUEUE_INVENTORY],
+        'concurrency': 1,
+        'prefetch_multiplier': 1,
+    },
+}
+
+WORKER_PROFILE = WORKER_PROFILES.get(os.environ.get('CELERY_WORKER_PROFILE', ''))
+if WORKER_PROFILE:
+    app.conf.worker_concurrency = WORKER_PROFILE['concurrency']
+    app.conf.worker_prefetch_multiplier = WORKER_PROFILE['prefetch_multiplier']
+
 # Celery Beat schedule for periodic tasks
 app.conf.beat_schedule = {
     'check-low-stock-products': {
         'task': 'apps.products.tasks.check_low_stock_products',
-        'schedule': crontab(hour=0, minute=0),  # Run daily at midnight
+        'schedule': crontab(minute='*/15'),  # Incremental, only re-checks changed stock
     },
     'cleanup-expired-tokens': {
         'task': 'apps.users.tasks.cleanup_expired_tokens',
         'schedule': crontab(minute=0, hour='*/6'),  # Run every 6 hours
     },
+    'warm-token-blacklist': {
+        'task': 'apps.users.tasks.warm_token_blacklist',
+        'schedule': crontab(minute='*/5'),  # No-op unless the cache lost the blacklist
+    },
+    'maintain-partitions': {
+        'task': 'apps.orders.tasks.maintain_partitions',
+        'schedule': crontab(minute=15, hour=2),  # Daily, keeps future months ready
+    },
+    'purge-old-notifications': {
+        'task': 'apps.notifications.tasks.purge_old_notifications',
+        'schedule': crontab(minute=30, hour=3),  # Daily, off-peak
+    },
     'send-pending-notifications': {
         'task': 'apps.notifications.tasks.send_pending_notifications',
         'schedule': crontab(minute='*/5'),  # Run every 5 minutes
     },
+    'relay-outbox-messages': {
+        'task': 'apps.notifications.tasks.relay_outbox_messages',
+        'schedule': crontab(),  # Run every minute as a safety net
+    },
+    'process-webhook-events': {
+        'task': 'apps.payments.tasks.process_webhook_events',
+        'schedule': crontab(),  # Safety net for events whose dispatch was missed or deferred
+    },
+    'purge-old-webhook-events': {
+        'task': 'apps.payments.tasks.purge_old_webhook_events',
+        'schedule': crontab(minute=45, hour=3),  # Daily, off-peak
+    },
 }
 
 
+@worker_init.connect
+def select_profile_queues(sender=None, **kwargs):
+    """Consume only the profile's queues unless -Q was given explicitly"""
+    queues = sender.app.amqp.queues
+    if WORKER_PROFILE and set(queues.consume_from) == set(queues):
+        queues.select(WORKER_PROFILE['queues'])
+
+
+@worker_process_init.connect
+def warm_email_templates(**kwargs):
+    """Compile transactional email templates once per worker process"""
+    from apps.notifications.services import TransactionalEmailService
+    TransactionalEmailService.warm()
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """Serve the worker's metrics (all pool processes in multiprocess mode)"""
+    from django.conf import settings
+    if settings.METRICS_CELERY_PORT:
+        from prometheus_client import start_http_server
+        from utils.metrics import registry
+        start_http_server(settings.METRICS_CELERY_PORT, registry=registry())
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    """Drop a finished pool process's live gauges from the multiprocess directory"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+@task_prerun.connect
+def record_task_started(task_id=None, **kwargs):
+    from utils.metrics import record_task_started
+    record_task_started(task_id)
+
+
+@task_postrun.connect
+def record_task_finished(task_id=None, task=None, state=None, **kwargs):
+    from utils.metrics import record_task_finished
+    record_task_finished(task_id, task.name, state)
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
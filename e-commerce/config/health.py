@@ -1,11 +1,14 @@
 """
-Health check endpoints for Kubernetes liveness and readiness probes.
+Health check endpoints for Kubernetes liveness and readiness probes,
+and the Prometheus scrape endpoint.
 """
 from django.http import JsonResponse  # type: ignore
 from django.db import connection  # type: ignore
 from django.core.cache import cache  # type: ignore
 import logging
 
+from utils.db_pool import pool_stats
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +33,8 @@ def healthz(request):
 def ready(request):
     """
     Readiness probe - checks if the application is ready to serve traffic.
-    Verifies database and cache connectivity.
+    Verifies database and cache connectivity and reports connection pool
+    utilization and wait times.
     """
     try:
         # Check database connectivity
@@ -49,6 +53,7 @@ def ready(request):
         return JsonResponse({
             'status': 'ready',
             'database': 'connected',
+            'database_pool': pool_stats(),
             'service': 'ecommerce-api'
         }, status=200)
     except Exception as e:
@@ -81,3 +86,26 @@ def startup(request):
         }, status=503)
 
 
+def metrics(request):
+    """
+    Prometheus scrape endpoint.
+    Aggregates every worker process in multiprocess mode; requires
+    "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set,
+    and is not served at all without one when METRICS_REQUIRE_TOKEN is on
+    (production).
+    """
+    from django.conf import settings  # type: ignore
+    from django.http import HttpResponse  # type: ignore
+    from django.utils.crypto import constant_time_compare  # type: ignore
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    from utils.metrics import registry
+
+    if not settings.METRICS_TOKEN:
+        if settings.METRICS_REQUIRE_TOKEN:
+            logger.error("Refusing to serve /metrics: METRICS_TOKEN is not set")
+            return HttpResponse(status=404)
+    else:
+        authorization = request.headers.get('Authorization', '')
+        if not constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponse(status=401)
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -50,13 +50,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.metrics.PrometheusMiddleware',  # removes itself unless METRICS_ENABLED is on
+    'utils.profiling.QueryProfilingMiddleware',  # removes itself unless REQUEST_PROFILING is on
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'utils.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utils.db_routing.ReadReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,6 +92,13 @@ DATABASES = {
     }
 }
 
+# Read replicas (aliases in DATABASES); reads stay on the primary when empty
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['utils.db_routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=10)  # read-your-writes window
+REPLICA_HEALTH_CHECK_INTERVAL = env.int('REPLICA_HEALTH_CHECK_INTERVAL', default=30)  # seconds
+REPLICA_MAX_LAG = env.int('REPLICA_MAX_LAG', default=5)  # seconds of replay lag tolerated
+
 # Cache configuration - Default to LocMemCache, can override in settings modules
 CACHES = {
     'default': {
@@ -121,7 +131,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Only include static directory if it exists
 STATIC_DIR = BASE_DIR / 'static'
 STATICFILES_DIRS = [str(STATIC_DIR)] if STATIC_DIR.exists() else []
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -133,10 +146,57 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
+# Password hashing (apps.users.hashers): PASSWORD_HASHER picks the hasher for
+# new and rehashed passwords; the others stay listed so existing hashes verify
+_PASSWORD_HASHERS = {
+    'argon2': 'apps.users.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = env('PASSWORD_HASHER', default='argon2')
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+# Argon2id cost (OWASP baseline: 19 MiB, 2 passes, 1 lane); changing these rehashes on next login
+PASSWORD_ARGON2_TIME_COST = env.int('PASSWORD_ARGON2_TIME_COST', default=2)
+PASSWORD_ARGON2_MEMORY_COST = env.int('PASSWORD_ARGON2_MEMORY_COST', default=19456)  # KiB
+PASSWORD_ARGON2_PARALLELISM = env.int('PASSWORD_ARGON2_PARALLELISM', default=1)
+# Concurrent password hashes per process (0 = one per CPU) and how many may wait
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=0)
+PASSWORD_HASH_QUEUE_SIZE = env.int('PASSWORD_HASH_QUEUE_SIZE', default=32)
+PASSWORD_HASH_QUEUE_TIMEOUT = env.float('PASSWORD_HASH_QUEUE_TIMEOUT', default=5.0)  # seconds before a 503
+PASSWORD_REHASH_IN_BACKGROUND = env.bool('PASSWORD_REHASH_IN_BACKGROUND', default=True)
+
+AUTHENTICATION_BACKENDS = ['apps.users.backends.PooledModelBackend']
+
+# Rate limits (utils.throttling): per IP for anonymous clients, per user otherwise;
+# override a scope with THROTTLE_RATE_<SCOPE>, e.g. THROTTLE_RATE_LOGIN=20/min
+THROTTLE_RATES = {
+    scope: env(f'THROTTLE_RATE_{scope.upper()}', default=rate)
+    for scope, rate in {
+        'anon': '300/min',
+        'user': '600/min',
+        'catalog': '120/min',
+        'search': '30/min',
+        'login': '10/min',
+        'register': '10/hour',
+        'password_reset': '5/hour',
+        'cart_add': '60/min',
+        'reviews': '10/hour',
+    }.items()
+}
+THROTTLE_CACHE_ALIAS = 'default'  # django-redis cache holding the counters
+THROTTLE_FALLBACK_SIZE = env.int('THROTTLE_FALLBACK_SIZE', default=100000)  # in-process keys while Redis is down
+THROTTLE_REDIS_RETRY_INTERVAL = env.float('THROTTLE_REDIS_RETRY_INTERVAL', default=30.0)  # seconds
+# Reverse proxies appending to X-Forwarded-For in front of the app; 0 keys anonymous clients on REMOTE_ADDR
+NUM_PROXIES = env.int('NUM_PROXIES', default=0)
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -150,6 +210,13 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'utils.throttling.AnonSlidingWindowThrottle',
+        'utils.throttling.UserSlidingWindowThrottle',
+        'utils.throttling.ScopedSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,
+    'NUM_PROXIES': NUM_PROXIES,
 }
 
 # JWT Settings
@@ -162,6 +229,14 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
 
+# Stateless JWT authentication (apps.users.authentication)
+JWT_USER_CACHE_SIZE = env.int('JWT_USER_CACHE_SIZE', default=10000)  # validated tokens per process
+JWT_USER_CACHE_TTL = env.int('JWT_USER_CACHE_TTL', default=60)  # seconds; bounds revocation delay
+JWT_TOKEN_VERSION_CACHE_TTL = env.int('JWT_TOKEN_VERSION_CACHE_TTL', default=86400)  # seconds
+# Refresh token blacklist: checked in the cache; outstanding tokens recorded in background batches
+JWT_BLACKLIST_WRITE_BEHIND = env.bool('JWT_BLACKLIST_WRITE_BEHIND', default=True)
+JWT_BLACKLIST_BATCH_SIZE = env.int('JWT_BLACKLIST_BATCH_SIZE', default=500)
+
 # DRF Spectacular Settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'E-Commerce API',
@@ -188,6 +263,23 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Task outbox relay
+OUTBOX_PUBLISH_BATCH_SIZE = env.int('OUTBOX_PUBLISH_BATCH_SIZE', default=100)
+OUTBOX_RETENTION_DAYS = env.int('OUTBOX_RETENTION_DAYS', default=7)
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=8)
+OUTBOX_RETRY_BACKOFF = env.int('OUTBOX_RETRY_BACKOFF', default=10)  # seconds, doubled per attempt
+
+# Monthly table partitioning (PostgreSQL, see utils.partitioning)
+PARTITION_MONTHS_AHEAD = env.int('PARTITION_MONTHS_AHEAD', default=3)
+PARTITION_ARCHIVE_DIR = env('PARTITION_ARCHIVE_DIR', default=str(BASE_DIR / 'archives'))
+
+# Chunked purges of expired rows
+PURGE_CHUNK_SIZE = env.int('PURGE_CHUNK_SIZE', default=1000)
+PURGE_CHUNK_PAUSE = env.float('PURGE_CHUNK_PAUSE', default=0.1)  # seconds between chunks
+
+# Bulk catalog import/export (utils.catalog_io)
+CATALOG_IO_BATCH_SIZE = env.int('CATALOG_IO_BATCH_SIZE', default=2000)  # records per batch and transaction
+
 # Email Configuration
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = env('EMAIL_HOST', default='smtp.gmail.com')
@@ -196,11 +288,68 @@ EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
 EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='noreply@ecommerce.com')
+FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
+
+# Notification dispatch
+NOTIFICATION_DISPATCH_BATCH_SIZE = env.int('NOTIFICATION_DISPATCH_BATCH_SIZE', default=100)
+NOTIFICATION_DISPATCH_TIME_BUDGET = env.int('NOTIFICATION_DISPATCH_TIME_BUDGET', default=240)  # seconds per run
+NOTIFICATION_MAX_ATTEMPTS = env.int('NOTIFICATION_MAX_ATTEMPTS', default=5)
+NOTIFICATION_RETRY_BACKOFF = env.int('NOTIFICATION_RETRY_BACKOFF', default=60)  # seconds, doubled per attempt
+NOTIFICATION_RETENTION_DAYS = env.int('NOTIFICATION_RETENTION_DAYS', default=90)
 
 # Stripe Configuration
 STRIPE_PUBLIC_KEY = env('STRIPE_PUBLIC_KEY', default='')
 STRIPE_SECRET_KEY = env('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = env('STRIPE_WEBHOOK_SECRET', default='')
+STRIPE_API_BASE = env('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_API_TIMEOUT = env.float('STRIPE_API_TIMEOUT', default=10.0)  # seconds, per call
+STRIPE_CONNECT_TIMEOUT = env.float('STRIPE_CONNECT_TIMEOUT', default=3.0)  # seconds
+STRIPE_MAX_RETRIES = env.int('STRIPE_MAX_RETRIES', default=2)  # idempotent calls only
+STRIPE_RETRY_BACKOFF = env.float('STRIPE_RETRY_BACKOFF', default=0.5)  # seconds, doubled per retry
+STRIPE_POOL_MAXSIZE = env.int('STRIPE_POOL_MAXSIZE', default=20)  # keep-alive connections per process
+PAYMENT_BREAKER_FAILURE_THRESHOLD = env.int('PAYMENT_BREAKER_FAILURE_THRESHOLD', default=5)
+PAYMENT_BREAKER_RECOVERY_TIMEOUT = env.float('PAYMENT_BREAKER_RECOVERY_TIMEOUT', default=30.0)  # seconds
+
+# Payment providers per Payment.payment_method (apps.payments.providers)
+PAYMENT_DEFAULT_METHOD = env('PAYMENT_DEFAULT_METHOD', default='stripe')
+# Route card payments to the in-process gateway simulator (load tests only)
+PAYMENT_SIMULATOR = env.bool('PAYMENT_SIMULATOR', default=False)
+PAYMENT_SIMULATOR_LATENCY = env.float('PAYMENT_SIMULATOR_LATENCY', default=0.1)  # seconds per call
+PAYMENT_SIMULATOR_FAILURE_RATE = env.float('PAYMENT_SIMULATOR_FAILURE_RATE', default=0.0)
+PAYMENT_SIMULATOR_TIMEOUT_RATE = env.float('PAYMENT_SIMULATOR_TIMEOUT_RATE', default=0.0)
+PAYMENT_SIMULATOR_DECLINE_RATE = env.float('PAYMENT_SIMULATOR_DECLINE_RATE', default=0.0)
+PAYMENT_PROVIDERS = {
+    'stripe': (
+        'apps.payments.providers.SimulatorProvider' if PAYMENT_SIMULATOR
+        else 'apps.payments.providers.StripeProvider'
+    ),
+    'cod': 'apps.payments.providers.CashOnDeliveryProvider',
+}
+
+# Gateway webhooks (stored on receipt, applied by apps.payments.tasks.process_webhook_events)
+WEBHOOK_BATCH_SIZE = env.int('WEBHOOK_BATCH_SIZE', default=100)
+WEBHOOK_MAX_ATTEMPTS = env.int('WEBHOOK_MAX_ATTEMPTS', default=5)
+WEBHOOK_RETRY_BACKOFF = env.int('WEBHOOK_RETRY_BACKOFF', default=5)  # seconds, doubled per attempt
+WEBHOOK_RETENTION_DAYS = env.int('WEBHOOK_RETENTION_DAYS', default=30)
+
+# Request profiling (utils.profiling): Server-Timing headers and per-request JSON log lines
+REQUEST_PROFILING = env.bool('REQUEST_PROFILING', default=False)
+SLOW_QUERY_MS = env.float('SLOW_QUERY_MS', default=100.0)  # logged with their EXPLAIN plan
+SLOW_QUERY_EXPLAIN = env.bool('SLOW_QUERY_EXPLAIN', default=True)
+NPLUSONE_THRESHOLD = env.int('NPLUSONE_THRESHOLD', default=5)  # identical SQL shapes per request
+PERF_TIME_BUDGET_SCALE = env.float('PERF_TIME_BUDGET_SCALE', default=1.0)  # multiplies test time budgets (utils.testing)
+
+# Prometheus metrics at /metrics (utils.metrics); set PROMETHEUS_MULTIPROC_DIR to
+# aggregate gunicorn/celery worker processes (gunicorn.conf.py does for gunicorn)
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')  # require "Authorization: Bearer <token>" when set
+METRICS_REQUIRE_TOKEN = env.bool('METRICS_REQUIRE_TOKEN', default=False)  # refuse to serve /metrics without a token
+METRICS_CELERY_QUEUES = env.bool('METRICS_CELERY_QUEUES', default=True)  # queue depths from the broker
+METRICS_QUEUE_DEPTH_TTL = env.float('METRICS_QUEUE_DEPTH_TTL', default=10.0)  # seconds between broker reads
+METRICS_CELERY_PORT = env.int('METRICS_CELERY_PORT', default=0)  # worker metrics server port (0 = off)
+
+# Serve catalog and payment endpoints with the async views (ASGI deployments)
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -246,5 +395,9 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # httpx logs every gateway request at INFO
+        'httpx': {
+            'level': 'WARNING',
+        },
     },
 }
\ No newline at end of file
@@ -13,6 +13,7 @@ from datetime import timedelta
 
 from .base import *  # noqa: F401, F403
 from .base import BASE_DIR
+from utils.db_pool import configure_pooling
 
 try:
     import dj_database_url
@@ -71,6 +72,7 @@ else:
     logging.info(logger_msg)
 
 # ===== DATABASE CONFIGURATION =====
+# No ATOMIC_REQUESTS: views open transactions explicitly (utils.transactions)
 # Priority order:
 # 1. DATABASE_URL (Render, Heroku, Railway PostgreSQL addon)
 # 2. Explicit DB_* environment variables
@@ -86,7 +88,6 @@ if os.getenv('DATABASE_URL'):
             'default': dj_database_url.config(
                 default=os.getenv('DATABASE_URL'),
                 conn_max_age=600,
-                atomic_requests=True
             )
         }
     else:
@@ -103,7 +104,6 @@ if os.getenv('DATABASE_URL'):
                     'PASSWORD': parsed.password,
                     'HOST': parsed.hostname,
                     'PORT': parsed.port or 5432,
-                    'ATOMIC_REQUESTS': True,
                     'CONN_MAX_AGE': 600,
                     'OPTIONS': {
                         'connect_timeout': 10,
@@ -121,7 +121,6 @@ if not DATABASES and os.getenv('DB_HOST') and os.getenv('DB_HOST') != 'localhost
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
-            'ATOMIC_REQUESTS': True,
             'CONN_MAX_AGE': 600,
             'OPTIONS': {
                 'connect_timeout': 10,
@@ -138,6 +137,20 @@ if not DATABASES:
         }
     }
 
+# Read replicas: comma-separated DATABASE_REPLICA_URLS (see utils.db_routing)
+# Replicas never wrap requests in transactions and mirror default in tests
+DATABASE_REPLICAS = []
+if dj_database_url and DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+    for index, replica_url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+        alias = f'replica_{index}'
+        DATABASES[alias] = dj_database_url.parse(replica_url.strip(), conn_max_age=600)
+        DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+        DATABASE_REPLICAS.append(alias)
+
+# Connection pooling / PgBouncer mode from DB_POOL* and DB_PGBOUNCER (see utils.db_pool)
+for _database in DATABASES.values():
+    configure_pooling(_database)
+
 # ===== REDIS/CACHE CONFIGURATION =====
 # Use Redis for caching and sessions in production if available
 # Fall back to local memory cache if Redis is not available
@@ -252,7 +265,10 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Use WhiteNoise for efficient static file serving
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # ===== CELERY CONFIGURATION =====
 # Use environment variables if available, but provide safe defaults
@@ -343,6 +359,12 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@ecommerce.com')
 
+# ===== METRICS CONFIGURATION =====
+# /metrics is on the public URLconf; it is not served until METRICS_TOKEN is set
+METRICS_REQUIRE_TOKEN = True
+if not METRICS_TOKEN:  # noqa: F405
+    logging.warning("METRICS_TOKEN is not set; /metrics will return 404")
+
 # ===== STRIPE CONFIGURATION =====
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
@@ -415,7 +437,7 @@ SIMPLE_JWT = {
 # ===== REST FRAMEWORK CONFIGURATION =====
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -430,13 +452,13 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'utils.throttling.AnonSlidingWindowThrottle',
+        'utils.throttling.UserSlidingWindowThrottle',
+        'utils.throttling.ScopedSlidingWindowThrottle',
     ),
-    'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',
-        'user': '1000/hour',
-    },
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,  # noqa: F405
+    # Only the address added by our own proxy is trusted (one proxy: nginx or the platform router)
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
 }
 
 # ===== ADMINS & MANAGERS =====
@@ -6,7 +6,7 @@ from django.conf.urls.static import static
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from .health import healthz, ready, startup
+from .health import healthz, metrics, ready, startup
 
 # Simple root view
 @csrf_exempt
@@ -38,6 +38,7 @@ urlpatterns = [
     path('healthz/', healthz, name='healthz'),
     path('ready/', ready, name='ready'),
     path('startup/', startup, name='startup'),
+    path('metrics', metrics, name='metrics'),
     
     # Root path - simple message instead of redirect
     path('', root_view, name='root'),
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration loaded from the working directory.
+
+Workers share one Prometheus multiprocess directory so /metrics on any
+worker reports all of them (utils.metrics). The directory is emptied when
+the master starts, and a dead worker's live gauges are dropped. Exiting
+workers flush their queued JWT token records (apps.users.blacklist).
+"""
+import os
+import shutil
+import sys
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    blacklist = sys.modules.get('apps.users.blacklist')
+    if blacklist is not None:
+        blacklist.writer.flush()
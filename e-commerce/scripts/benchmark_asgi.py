@@ -0,0 +1,252 @@
+"""
+Benchmark the WSGI (sync views) and ASGI (async views) deployments.
+
+Starts the app under gunicorn with sync threads and then under gunicorn
+with uvicorn workers (ASYNC_VIEWS=True), drives the same endpoints with a
+fixed number of concurrent clients, and reports requests per second,
+latency percentiles and server memory (RSS of the master and workers) as
+JSON. With --payments, a local fake Stripe answering after
+--gateway-delay seconds shows how slow gateway calls affect capacity;
+--simulator uses the in-process payment simulator instead (no sockets),
+optionally with a --gateway-failure-rate.
+
+Usage:
+    python scripts/benchmark_asgi.py --concurrency 50 --duration 20 --output asgi_benchmark.json
+    python scripts/benchmark_asgi.py --payments --gateway-delay 0.5
+    python scripts/benchmark_asgi.py --payments --simulator --gateway-failure-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATALOG_PATHS = ['/api/v1/products/', '/api/v1/products/categories/']
+
+DEPLOYMENTS = {
+    'wsgi': {
+        'command': ['gunicorn', 'config.wsgi:application', '--threads', '{threads}'],
+        'env': {'ASYNC_VIEWS': 'False'},
+    },
+    'asgi': {
+        'command': ['gunicorn', 'config.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+        'env': {'ASYNC_VIEWS': 'True'},
+    },
+}
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Answers every payment intent call after a fixed delay"""
+
+    delay = 0.0
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        time.sleep(self.delay)
+        body = json.dumps({
+            'id': 'pi_benchmark', 'object': 'payment_intent', 'client_secret': 'pi_benchmark_secret',
+            'status': 'succeeded', 'latest_charge': 'ch_benchmark',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and its children (Linux /proc)"""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+def payment_fixture() -> tuple:
+    """Create a benchmark user and order; returns (access token, order id)"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+    import django
+    django.setup()
+
+    from apps.users.tokens import AccessToken
+    from apps.orders.models import Order
+    from apps.users.models import Address, User
+
+    user, created = User.objects.get_or_create(email='benchmark@example.com')
+    if created:
+        user.set_unusable_password()
+        user.save()
+    address, _ = Address.objects.get_or_create(
+        user=user, address_type='shipping',
+        defaults={
+            'full_name': 'Benchmark', 'phone_number': '000000000', 'street_address': '1 Main St',
+            'city': 'Accra', 'state': 'GA', 'country': 'Ghana', 'zip_code': '00233',
+        },
+    )
+    order = Order.objects.create(
+        user=user, subtotal=10, total_amount=10, shipping_address=address, billing_address=address,
+    )
+    return str(AccessToken.for_user(user)), str(order.id)
+
+
+async def load(base_url: str, requests: list, concurrency: int, duration: float) -> dict:
+    """Drive (method, path, headers, data) requests round-robin from concurrent clients"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def worker(offset):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                method, path, headers, data = requests[i % len(requests)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers, data=data)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms_p50': round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        'latency_ms_p95': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else None,
+    }
+
+
+def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f'{base_url}/healthz/', timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'Server at {base_url} did not start')
+
+
+def run(kind: str, args, requests: list, env: dict) -> dict:
+    """Start one deployment, load it and measure memory before and after"""
+    deployment = DEPLOYMENTS[kind]
+    port = free_port()
+    command = [part.format(threads=args.threads) for part in deployment['command']]
+    command += ['--workers', str(args.workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env={**env, **deployment['env']})
+    base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        wait_until_up(base_url)
+        asyncio.run(load(base_url, requests, args.concurrency, min(2, args.duration)))  # warm-up
+        idle_rss = process_rss(server.pid)
+        result = asyncio.run(load(base_url, requests, args.concurrency, args.duration))
+        result['rss_bytes_idle'] = idle_rss
+        result['rss_bytes_loaded'] = process_rss(server.pid)
+        return result
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--deployments', nargs='+', choices=list(DEPLOYMENTS), default=list(DEPLOYMENTS))
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per WSGI worker')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load per deployment')
+    parser.add_argument('--payments', action='store_true', help='Also drive the payment intent endpoint')
+    parser.add_argument('--gateway-delay', type=float, default=0.5, help='Fake Stripe response delay (seconds)')
+    parser.add_argument('--simulator', action='store_true', help='Use the in-process payment simulator')
+    parser.add_argument('--gateway-failure-rate', type=float, default=0.0, help='Simulator gateway error rate')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    requests = [('GET', path, None, None) for path in CATALOG_PATHS]
+
+    if args.payments and args.simulator:
+        env['PAYMENT_SIMULATOR'] = 'True'
+        env['PAYMENT_SIMULATOR_LATENCY'] = str(args.gateway_delay)
+        env['PAYMENT_SIMULATOR_FAILURE_RATE'] = str(args.gateway_failure_rate)
+    elif args.payments:
+        FakeStripeHandler.delay = args.gateway_delay
+        gateway = ThreadingHTTPServer(('127.0.0.1', free_port()), FakeStripeHandler)
+        threading.Thread(target=gateway.serve_forever, daemon=True).start()
+        env['STRIPE_API_BASE'] = f'http://127.0.0.1:{gateway.server_address[1]}'
+        env['STRIPE_SECRET_KEY'] = 'sk_test_benchmark'
+    if args.payments:
+        token, order_id = payment_fixture()
+        requests.append((
+            'POST', '/api/v1/payments/create-intent/',
+            {'Authorization': f'Bearer {token}'}, {'order_id': order_id},
+        ))
+
+    results = {
+        'workers': args.workers,
+        'threads': args.threads,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'gateway_delay': args.gateway_delay if args.payments else None,
+        'gateway': ('simulator' if args.simulator else 'fake_stripe') if args.payments else None,
+        'results': {kind: run(kind, args, requests, env) for kind in args.deployments},
+    }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
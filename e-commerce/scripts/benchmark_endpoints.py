@@ -0,0 +1,308 @@
+"""
+Benchmark the key API endpoints and Celery tasks against a seeded database.
+
+Drives a running server (--base-url) with concurrent clients, one endpoint
+at a time, and reports throughput, error count and p50/p95/p99 latency per
+endpoint as JSON:
+- list: product list pages
+- search: product search, terms drawn with Zipf skew
+- detail: product detail, products drawn with Zipf skew
+- add_to_cart: add a product to the cart of one of --users customers
+- checkout: add to cart, then check out (only the checkout call is timed)
+- order_history: the customer's order list
+
+Rate limits apply to the benchmark clients too: raise them on the server
+(THROTTLE_RATE_ANON, THROTTLE_RATE_USER, THROTTLE_RATE_CATALOG, ...) or the
+results measure 429 responses. Writes contend on SQLite's single writer
+lock; benchmark against PostgreSQL for meaningful write numbers.
+
+Celery tasks (--tasks) run in this process, eagerly, --task-runs times each.
+Requests are drawn from a seeded random generator, so runs against the same
+dataset (scripts/generate_dataset.py) send the same requests. Results carry
+the git commit and table sizes; --baseline adds the change in throughput
+and p95 against an earlier results file.
+
+Usage:
+    python scripts/generate_dataset.py --scale 10
+    THROTTLE_RATE_ANON=1000000/min THROTTLE_RATE_USER=1000000/min THROTTLE_RATE_CATALOG=1000000/min \
+        THROTTLE_RATE_SEARCH=1000000/min THROTTLE_RATE_CART_ADD=1000000/min \
+        gunicorn config.wsgi:application --workers 4 --threads 4 &
+    python scripts/benchmark_endpoints.py --concurrency 20 --duration 15 --output bench/$(date +%F).json
+    python scripts/benchmark_endpoints.py --endpoints search detail --baseline bench/previous.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import django
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+logging.getLogger('httpx').setLevel(logging.WARNING)  # the app's logging config would log every request
+
+# noqa: E402 - module level import not at top of file (required for Django)
+from apps.cart.models import Cart  # noqa: E402
+from apps.orders.models import Order  # noqa: E402
+from apps.products.models import Product, Review  # noqa: E402
+from apps.users.models import Address, User  # noqa: E402
+from apps.users.tokens import AccessToken  # noqa: E402
+from utils.datagen import ADJECTIVES, NOUNS, SYNTHETIC_EMAIL_DOMAIN, ZipfSampler  # noqa: E402
+
+TASKS = {
+    'check_low_stock_products': 'apps.products.tasks.check_low_stock_products',
+    'invalidate_product_cache': 'apps.products.tasks.invalidate_product_cache',
+    'send_pending_notifications': 'apps.notifications.tasks.send_pending_notifications',
+    'relay_outbox_messages': 'apps.notifications.tasks.relay_outbox_messages',
+    'process_webhook_events': 'apps.payments.tasks.process_webhook_events',
+    'warm_token_blacklist': 'apps.users.tasks.warm_token_blacklist',
+}
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99 in milliseconds"""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None}
+    samples = sorted(samples)
+    rank = lambda q: samples[max(int(len(samples) * q) - 1, 0)]  # noqa: E731
+    return {
+        'p50': round(statistics.median(samples) * 1000, 2),
+        'p95': round(rank(0.95) * 1000, 2),
+        'p99': round(rank(0.99) * 1000, 2),
+    }
+
+
+class Workload:
+    """Builds the requests for each endpoint from the seeded database"""
+
+    def __init__(self, users: int, seed: int, zipf_s: float, page_size: int):
+        self.rng = random.Random(seed)
+        self.page_size = page_size
+        products = list(Product.objects.filter(is_active=True).order_by('sku').values_list('id', 'slug'))
+        if not products:
+            raise SystemExit('No products: run scripts/generate_dataset.py first')
+        self.product_ids = [str(pk) for pk, _ in products]
+        self.product_slugs = [slug for _, slug in products]
+        self.products = ZipfSampler(len(products), zipf_s, self.rng)
+        self.terms = ADJECTIVES + NOUNS
+        self.search_terms = ZipfSampler(len(self.terms), zipf_s, self.rng)
+        self.pages = max(1, min(20, len(products) // page_size))
+
+        customers = (
+            User.objects.filter(email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}', addresses__isnull=False)
+            .distinct().order_by('email')[:users]
+        )
+        self.customers = []
+        for user in customers:
+            address = Address.objects.filter(user=user).values_list('id', flat=True).first()
+            self.customers.append({
+                'headers': {'Authorization': f'Bearer {AccessToken.for_user(user)}'},
+                'address': str(address),
+            })
+        if not self.customers:
+            raise SystemExit('No synthetic customers with addresses: run scripts/generate_dataset.py first')
+
+    def customer(self) -> dict:
+        return self.rng.choice(self.customers)
+
+    def product(self) -> int:
+        return self.products.sample()
+
+    # Each endpoint returns a list of (method, path, headers, json, timed) steps
+
+    def list(self):
+        return [('GET', f'/api/v1/products/?page={self.rng.randint(1, self.pages)}&page_size={self.page_size}',
+                 {}, None, True)]
+
+    def search(self):
+        term = self.terms[self.search_terms.sample()]
+        return [('GET', f'/api/v1/products/?search={term}&page_size={self.page_size}', {}, None, True)]
+
+    def detail(self):
+        return [('GET', f'/api/v1/products/{self.product_slugs[self.product()]}/', {}, None, True)]
+
+    def add_to_cart(self):
+        body = {'product_id': self.product_ids[self.product()], 'quantity': 1}
+        return [('POST', '/api/v1/cart/items/', self.customer()['headers'], body, True)]
+
+    def checkout(self):
+        customer = self.customer()
+        body = {'product_id': self.product_ids[self.product()], 'quantity': 1}
+        addresses = {'shipping_address_id': customer['address'], 'billing_address_id': customer['address']}
+        return [
+            ('POST', '/api/v1/cart/items/', customer['headers'], body, False),
+            ('POST', '/api/v1/orders/', customer['headers'], addresses, True),
+        ]
+
+    def order_history(self):
+        return [('GET', f'/api/v1/orders/?page_size={self.page_size}', self.customer()['headers'], None, True)]
+
+
+ENDPOINTS = ['list', 'search', 'detail', 'add_to_cart', 'checkout', 'order_history']
+
+
+async def load(base_url: str, make_steps, concurrency: int, duration: float) -> dict:
+    """Run make_steps() sequences from concurrent clients for duration seconds"""
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                for method, path, headers, body, timed in make_steps():
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, headers=headers, json=body)
+                        outcome = str(response.status_code)
+                    except httpx.HTTPError as e:
+                        outcome = type(e).__name__
+                    if timed:
+                        latencies.append(time.perf_counter() - started)
+                        statuses[outcome] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for outcome, count in statuses.items() if not outcome.startswith(('2', '3'))),
+        'statuses': dict(statuses),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': percentiles(latencies),
+    }
+
+
+def benchmark_tasks(names: list, runs: int) -> dict:
+    """Run each Celery task eagerly in this process and time it"""
+    from django.utils.module_loading import import_string
+    from config.celery import app
+
+    app.conf.task_always_eager = True  # tasks queued by the task under test run inline too
+    results = {}
+    for name in names:
+        task = import_string(TASKS[name])
+        durations, failures = [], 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = task.apply()
+            durations.append(time.perf_counter() - started)
+            failures += result.failed()
+        results[name] = {
+            'runs': runs,
+            'failures': failures,
+            'runs_per_second': round(runs / sum(durations), 2),
+            'duration_ms': percentiles(durations),
+        }
+    return results
+
+
+def dataset_sizes() -> dict:
+    return {
+        'products': Product.objects.count(),
+        'reviews': Review.objects.count(),
+        'users': User.objects.count(),
+        'carts': Cart.objects.count(),
+        'orders': Order.objects.count(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Relative change in throughput and p95 latency against a baseline run"""
+    def change(new, old):
+        return round((new - old) / old, 3) if new is not None and old else None
+
+    comparison = {}
+    for name, result in results['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(name)
+        if old:
+            comparison[name] = {
+                'requests_per_second': change(result['requests_per_second'], old['requests_per_second']),
+                'latency_p95': change(result['latency_ms']['p95'], old['latency_ms']['p95']),
+            }
+    for name, result in results['tasks'].items():
+        old = baseline.get('tasks', {}).get(name)
+        if old:
+            comparison[f'task:{name}'] = {
+                'duration_p95': change(result['duration_ms']['p95'], old['duration_ms']['p95']),
+            }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load')
+    parser.add_argument('--endpoints', nargs='*', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds before each endpoint')
+    parser.add_argument('--users', type=int, default=50, help='Synthetic customers to log in as')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the request mix')
+    parser.add_argument('--zipf-s', type=float, default=1.1, help='Zipf exponent for product and term popularity')
+    parser.add_argument('--tasks', nargs='*', choices=list(TASKS), default=list(TASKS))
+    parser.add_argument('--task-runs', type=int, default=20, help='Runs per Celery task')
+    parser.add_argument('--baseline', help='Earlier results file to compare with')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': git_commit(),
+        'dataset': dataset_sizes(),
+        'config': {
+            key: getattr(args, key)
+            for key in ('base_url', 'concurrency', 'duration', 'users', 'page_size', 'seed', 'zipf_s', 'task_runs')
+        },
+        'endpoints': {},
+        'tasks': {},
+    }
+
+    if args.endpoints:
+        workload = Workload(args.users, args.seed, args.zipf_s, args.page_size)
+        for name in args.endpoints:
+            make_steps = getattr(workload, name)
+            if args.warmup:
+                asyncio.run(load(args.base_url, make_steps, args.concurrency, args.warmup))
+            results['endpoints'][name] = asyncio.run(load(args.base_url, make_steps, args.concurrency, args.duration))
+            print(f"{name}: {json.dumps(results['endpoints'][name])}", file=sys.stderr)
+
+    if args.tasks:
+        results['tasks'] = benchmark_tasks(args.tasks, args.task_runs)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['comparison'] = compare(results, json.load(f))
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark password verification throughput per hasher configuration.
+
+Verifies one stored hash repeatedly through the bounded hash pool used by
+apps.users.backends.PooledModelBackend, from more client threads than pool
+workers, and reports logins per second, logins per second per core and
+per-login latency as JSON for:
+- pbkdf2: Django's default PBKDF2-SHA256 iteration count
+- argon2-default: Django's stock Argon2 parameters
+- argon2-tuned: Argon2id with the PASSWORD_ARGON2_* settings (or the flags)
+
+Each configuration runs with one pool worker and with one per CPU. No
+database access is involved: only the hashing cost of a login is measured.
+
+Usage:
+    python scripts/benchmark_password_hashing.py --logins 200 --output hashing_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+# noqa: E402 - module level import not at top of file (required for Django)
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher  # noqa: E402
+from apps.users.hashers import HashPool, TunedArgon2PasswordHasher  # noqa: E402
+
+HASHERS = {
+    'pbkdf2': PBKDF2PasswordHasher,
+    'argon2-default': Argon2PasswordHasher,
+    'argon2-tuned': TunedArgon2PasswordHasher,
+}
+
+PASSWORD = 'correct horse battery staple'
+
+
+def run(name: str, workers: int, logins: int) -> dict:
+    hasher = HASHERS[name]()
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+    pool = HashPool(workers=workers, queue_size=logins)
+    latencies = []
+
+    def login():
+        started = time.perf_counter()
+        assert pool.run(hasher.verify, PASSWORD, encoded)
+        latencies.append(time.perf_counter() - started)
+
+    # Warm up the pool threads and the hashing library
+    pool.run(hasher.verify, PASSWORD, encoded)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers * 4) as clients:
+        for future in [clients.submit(login) for _ in range(logins)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    pool.executor.shutdown()
+
+    rate = logins / elapsed
+    cores = min(workers, os.cpu_count() or 1)
+    latencies.sort()
+    return {
+        'hasher': name,
+        'params': {key: value for key, value in hasher.safe_summary(encoded).items() if key not in ('salt', 'hash')},
+        'workers': workers,
+        'logins': logins,
+        'seconds': round(elapsed, 3),
+        'logins_per_second': round(rate, 2),
+        'logins_per_second_per_core': round(rate / cores, 2),
+        'latency_ms': {
+            'p50': round(statistics.median(latencies) * 1000, 2),
+            'p95': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hashers', nargs='+', choices=list(HASHERS), default=list(HASHERS))
+    parser.add_argument('--logins', type=int, default=200, help='Verifications per configuration')
+    parser.add_argument('--workers', type=int, nargs='+', help='Pool sizes (default: 1 and one per CPU)')
+    parser.add_argument('--argon2-time-cost', type=int, help='Override PASSWORD_ARGON2_TIME_COST')
+    parser.add_argument('--argon2-memory-cost', type=int, help='Override PASSWORD_ARGON2_MEMORY_COST (KiB)')
+    parser.add_argument('--argon2-parallelism', type=int, help='Override PASSWORD_ARGON2_PARALLELISM')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    for setting, value in (
+        ('PASSWORD_ARGON2_TIME_COST', args.argon2_time_cost),
+        ('PASSWORD_ARGON2_MEMORY_COST', args.argon2_memory_cost),
+        ('PASSWORD_ARGON2_PARALLELISM', args.argon2_parallelism),
+    ):
+        if value is not None:
+            setattr(settings, setting, value)
+
+    worker_counts = args.workers or sorted({1, os.cpu_count() or 1})
+    results = {
+        'cpu_count': os.cpu_count(),
+        'results': [run(name, workers, args.logins) for name in args.hashers for workers in worker_counts],
+    }
+
+    report = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
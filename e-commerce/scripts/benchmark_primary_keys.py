@@ -0,0 +1,122 @@
+"""
+Benchmark random (uuid4) against time-ordered (uuid7) primary keys.
+
+Inserts the same number of rows into two scratch tables shaped like the
+insert-heavy tables (UUID key, timestamp, short payload), in batches, on the
+configured database, and reports insert throughput and primary key index
+size as JSON. The scratch tables are dropped afterwards.
+
+Usage:
+    python scripts/benchmark_primary_keys.py --rows 200000 --output pk_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import django
+from django.utils import timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+# noqa: E402 - module level import not at top of file (required for Django)
+from django.db import connection, transaction  # noqa: E402
+from utils.ids import uuid7  # noqa: E402
+
+KEY_GENERATORS = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+def key_column_type() -> str:
+    """Column type Django uses for UUIDField on this database"""
+    return 'uuid' if connection.vendor == 'postgresql' else 'char(32)'
+
+
+def adapt_key(value: uuid.UUID):
+    """Store keys the way Django does on this database"""
+    return str(value) if connection.vendor == 'postgresql' else value.hex
+
+
+def index_size(table: str):
+    """Size in bytes of the table's primary key index, if the database exposes it"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_relation_size(%s)", [f"{table}_pkey"])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s",
+                    [f"sqlite_autoindex_{table}_1"],
+                )
+                return cursor.fetchone()[0]
+            except Exception:
+                return None  # SQLite built without the dbstat table
+    return None
+
+
+def run(kind: str, rows: int, batch_size: int) -> dict:
+    """Insert rows keyed by one generator and measure the result"""
+    table = f"pk_benchmark_{kind}"
+    generate = KEY_GENERATORS[kind]
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"CREATE TABLE {table} ("
+            f"id {key_column_type()} PRIMARY KEY, created_at timestamp NOT NULL, payload varchar(100) NOT NULL)"
+        )
+
+    started = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        batch = [
+            (adapt_key(generate()), now, f"row {offset + i}")
+            for i in range(min(batch_size, rows - offset))
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} (id, created_at, payload) VALUES (%s, %s, %s)", batch
+            )
+    seconds = time.perf_counter() - started
+
+    result = {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1),
+        'index_bytes': index_size(table),
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {table}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200000, help='Rows inserted per key type')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per insert transaction')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = {
+        'database': connection.vendor,
+        'results': {kind: run(kind, args.rows, args.batch_size) for kind in KEY_GENERATORS},
+    }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
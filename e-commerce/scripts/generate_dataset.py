@@ -0,0 +1,76 @@
+"""
+Generate a large synthetic dataset for load tests and benchmarks.
+
+Writes users (with addresses), products with variants, reviews, carts and
+orders through utils.datagen.SyntheticDataGenerator: chunked bulk_create,
+Zipf-skewed popularity, reproducible from --seed. --scale multiplies the
+default sizes (1 = 1,000 users and 2,000 products); per-table flags
+override single sizes. Existing data is kept; --clear first removes the
+rows of earlier synthetic runs.
+
+Synthetic users log in with the password utils.datagen.SYNTHETIC_PASSWORD.
+
+Usage:
+    python scripts/generate_dataset.py --scale 10
+    python scripts/generate_dataset.py --products 1000000 --users 200000 --orders 2000000 --chunk-size 10000
+    python scripts/generate_dataset.py --clear --scale 1 --seed 42 --output dataset.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+# noqa: E402 - module level import not at top of file (required for Django)
+from utils.datagen import DEFAULT_SIZES, SyntheticDataGenerator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the default table sizes')
+    for table in DEFAULT_SIZES:
+        parser.add_argument(f'--{table.replace("_", "-")}', type=int, help=f'Override {table}')
+    parser.add_argument('--chunk-size', type=int, default=5_000, help='Rows per bulk_create and transaction')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--zipf-s', type=float, default=1.1, help='Zipf exponent for popularity skew')
+    parser.add_argument('--clear', action='store_true', help='Delete earlier synthetic data first')
+    parser.add_argument('--output', help='Write the JSON summary to this file')
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f"Cleared: {json.dumps(SyntheticDataGenerator.clear())}", file=sys.stderr)
+
+    last_report = {}
+
+    def progress(table, count):
+        # At most one line per table per second
+        if time.monotonic() - last_report.get(table, 0) >= 1:
+            last_report[table] = time.monotonic()
+            print(f"  {table}: {count:,}", file=sys.stderr)
+
+    generator = SyntheticDataGenerator.at_scale(
+        args.scale,
+        **{table: getattr(args, table) for table in DEFAULT_SIZES},
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        zipf_s=args.zipf_s,
+        progress=progress,
+    )
+    summary = generator.generate()
+
+    report = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 """
 Seed script for e-commerce database with realistic sample data.
 Uses proper data structures and algorithms for efficient data generation.
+For large synthetic datasets (load tests, benchmarks) use
+scripts/generate_dataset.py instead.
 """
 
 import os
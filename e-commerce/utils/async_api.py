@@ -0,0 +1,183 @@
+"""
+Async API Views
+
+A small async counterpart of DRF's GenericAPIView for ASGI deployments
+(DRF 3.15 dispatches every view synchronously):
+- Authentication, permission and throttle checks reuse the DRF/SimpleJWT
+  classes; only the user lookup touches the database, through the async ORM,
+  and throttles (Redis round trips) run on a worker thread
+- Database-free filter backends (SearchFilter, OrderingFilter) and the DRF
+  pagination classes are reused, with counting and page fetching done
+  through the async ORM
+- Errors are rendered in the same JSON shape as DRF's exception handler
+"""
+
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, JsonResponse
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, permissions
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.users.authentication import AsyncJWTAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async JSON views.
+
+    Subclasses implement ``async def get/post/...`` handlers, which receive
+    a DRF Request (``request.query_params``, ``request.data``, ``request.user``)
+    and return JSON-serializable data or an HttpResponse.
+    """
+
+    authentication_classes = [AsyncJWTAuthentication]
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    filter_backends = []
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API, like DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=(),
+        )
+        try:
+            self.request.user = await self.authenticate(self.request)
+            self.check_permissions(self.request)
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles, thread_sensitive=False)(self.request)
+
+            method = request.method.lower()
+            if method not in self.http_method_names or not hasattr(self, method):
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await getattr(self, method)(self.request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            return self.handle_exception(exc)
+
+        if isinstance(response, (dict, list)):
+            response = JsonResponse(response, safe=False)
+        return response
+
+    async def authenticate(self, request):
+        for authentication_class in self.authentication_classes:
+            result = await authentication_class().aauthenticate(request)
+            if result is not None:
+                return result[0]
+        return AnonymousUser()
+
+    def check_permissions(self, request):
+        for permission_class in self.permission_classes:
+            if not permission_class().has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+    def check_throttles(self, request):
+        """
+        Raises:
+            Throttled: With the longest wait of the throttles that refused
+        """
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    def handle_exception(self, exc):
+        """Render an API exception like DRF's default exception handler"""
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound(*exc.args)
+
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authentication_class = self.authentication_classes[0]
+            response['WWW-Authenticate'] = authentication_class().authenticate_header(self.request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def filter_queryset(self, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    async def paginate_queryset(self, queryset):
+        """
+        Fetch one page of a queryset (or list) in the pagination class's
+        response shape.
+
+        Algorithm: Same page size, page number and link rules as DRF's
+        PageNumberPagination, with the COUNT and the page slice run through
+        the async ORM (two queries).
+
+        Returns:
+            Dictionary with count, next, previous and results, or None when
+            pagination is disabled (like GenericAPIView.paginate_queryset)
+
+        Raises:
+            NotFound: If the page number is invalid or out of range
+        """
+        if self.pagination_class is None:
+            return None
+        paginator = self.pagination_class()
+        page_size = paginator.get_page_size(self.request)
+        if not page_size:
+            return None
+        count = len(queryset) if isinstance(queryset, list) else await queryset.acount()
+        num_pages = max(1, math.ceil(count / page_size))
+
+        page_number = self.request.query_params.get(paginator.page_query_param) or 1
+        if page_number in paginator.last_page_strings:
+            page_number = num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise exceptions.NotFound(_('Invalid page.'))
+        if not 1 <= page_number <= num_pages:
+            raise exceptions.NotFound(_('Invalid page.'))
+
+        offset = (page_number - 1) * page_size
+        if isinstance(queryset, list):
+            results = queryset[offset:offset + page_size]
+        else:
+            results = [obj async for obj in queryset[offset:offset + page_size]]
+
+        url = self.request.build_absolute_uri()
+        next_link = previous_link = None
+        if page_number < num_pages:
+            next_link = replace_query_param(url, paginator.page_query_param, page_number + 1)
+        if page_number == 2:
+            previous_link = remove_query_param(url, paginator.page_query_param)
+        elif page_number > 2:
+            previous_link = replace_query_param(url, paginator.page_query_param, page_number - 1)
+
+        return {
+            'count': count,
+            'next': next_link,
+            'previous': previous_link,
+            'results': results,
+        }
@@ -6,12 +6,16 @@ Provides efficient caching strategies for common operations:
 - Category hierarchy caching
 - Cache invalidation patterns
 - TTL management
+- In-process LRU cache for per-request hot paths
 """
 
+from collections import OrderedDict
 from django.core.cache import cache
 from functools import wraps
 import hashlib
 import json
+import threading
+import time
 
 
 class CacheManager:
@@ -234,3 +238,53 @@ class QueryCacheStrategy:
             cache.set(cache_key, result, CacheManager.TTL_SHORT)
         
         return result
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with per-entry expiry.
+
+    Algorithm: An OrderedDict kept in recency order; get() moves a hit to
+    the end and drops it if expired, set() evicts from the front once
+    maxsize entries are stored. Both are O(1). For values that are cheap to
+    keep per process and must not cost a network round trip (e.g. validated
+    auth tokens); there is no cross-process invalidation, so keep TTLs short.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl: float = None):
+        """Store a value for ttl seconds (default: the cache's TTL)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,505 @@
+"""
+Catalog Import and Export
+
+Streams products, variants and images in and out of the catalog as CSV or
+JSONL without holding it in memory:
+- One flat record per row; its ``type`` (product, variant or image) says
+  which columns apply. Variants and images point at their product through
+  product_sku, so CSV and JSONL share the same columns (COLUMNS)
+- Import parses with a generator, validates each batch with
+  utils.validators and upserts it with bulk_create(update_conflicts=True)
+  on sku (products and variants); images are matched on (product, path)
+- Every batch commits in its own transaction; the number of the last
+  committed record is the checkpoint a failed import resumes from
+- Export walks the catalog in sku order with an iterator queryset (variants
+  and images prefetched per chunk) and yields encoded lines, ready for a
+  StreamingHttpResponse or a file
+
+Records are complete rows: an update rewrites every field of the product
+from the record, except the slug, which is only set on insert so product
+URLs stay stable.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Iterator, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.products.models import Category, Product, ProductImage, ProductVariant
+from utils.validators import InventoryValidator, PriceValidator, validate_product_sku
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+RECORD_TYPES = ('product', 'variant', 'image')
+
+PRODUCT_COLUMNS = [
+    'name', 'slug', 'description', 'category', 'price', 'compare_price', 'cost_price', 'barcode',
+    'quantity', 'track_inventory', 'low_stock_threshold', 'weight', 'dimensions', 'meta_title',
+    'meta_description', 'is_active', 'is_featured',
+]
+VARIANT_COLUMNS = ['name', 'price', 'quantity', 'attributes', 'is_active']
+IMAGE_COLUMNS = ['image', 'alt_text', 'is_primary', 'order']
+COLUMNS = ['type', 'sku', 'product_sku', *PRODUCT_COLUMNS, 'attributes', *IMAGE_COLUMNS]
+
+# Written on conflict; slug and created_at keep their first values
+PRODUCT_UPDATE_FIELDS = [
+    'name', 'description', 'category', 'price', 'compare_price', 'cost_price', 'barcode', 'quantity',
+    'track_inventory', 'low_stock_threshold', 'weight', 'dimensions', 'meta_title', 'meta_description',
+    'is_active', 'is_featured', 'stock_updated_at', 'updated_at',
+]
+VARIANT_UPDATE_FIELDS = ['product', 'name', 'price', 'quantity', 'attributes', 'is_active']
+
+MAX_REPORTED_ERRORS = 100
+_TRUE = {'true', '1', 'yes', 'y', 't'}
+_FALSE = {'false', '0', 'no', 'n', 'f'}
+
+
+def detect_format(filename: str, default: str = None) -> str:
+    """Import/export format from a file name's extension (.csv, .jsonl, .ndjson)"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension, default)
+
+
+def parse_records(stream, file_format: str) -> Iterator[Tuple[int, dict, str]]:
+    """
+    Read records one at a time from a binary or text stream.
+
+    Yields:
+        (record number from 1, record dict or None, parse error or None)
+    """
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        # utf-8-sig drops the byte order mark spreadsheet exports start with
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row, None
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, 'Expected a JSON object'
+
+
+class RecordCleaner:
+    """Converts the raw values of one record (CSV strings or JSON values), collecting errors"""
+
+    def __init__(self, record: dict):
+        self.record = record
+        self.errors = []
+
+    def raw(self, field):
+        value = self.record.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        return None if value in (None, '') else value
+
+    def text(self, field, model=None, required=False) -> str:
+        value = self.raw(field)
+        if value is None:
+            if required:
+                self.errors.append(f'{field} is required')
+            return ''
+        value = str(value)
+        max_length = model._meta.get_field(field).max_length if model else None
+        if max_length and len(value) > max_length:
+            self.errors.append(f'{field} is longer than {max_length} characters')
+        return value
+
+    def sku(self, field) -> str:
+        value = self.text(field, required=True)
+        if value:
+            try:
+                validate_product_sku(value)
+            except ValidationError as e:
+                self.errors.extend(f'{field}: {message}' for message in e.messages)
+            if len(value) > 100:
+                self.errors.append(f'{field} is longer than 100 characters')
+        return value
+
+    def decimal(self, field, model, required=False):
+        value = self.raw(field)
+        if value is None:
+            if required:
+                self.errors.append(f'{field} is required')
+            return None
+        try:
+            value = Decimal(str(value))
+        except InvalidOperation:
+            self.errors.append(f'{field} is not a number')
+            return None
+        model_field = model._meta.get_field(field)
+        limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+        if not value.is_finite() or abs(value) >= limit or value.as_tuple().exponent < -model_field.decimal_places:
+            self.errors.append(f'{field} must be below {limit} with at most {model_field.decimal_places} decimals')
+            return None
+        return value
+
+    def price(self, field, model, required=False):
+        value = self.decimal(field, model, required)
+        if value is not None:
+            is_valid, message = PriceValidator.validate_price(value)
+            if not is_valid:
+                self.errors.append(f'{field}: {message}')
+        return value
+
+    def quantity(self, field, default: int) -> int:
+        value = self.raw(field)
+        if value is None:
+            return default
+        is_valid, message = InventoryValidator.validate_quantity(value)
+        if not is_valid or (isinstance(value, float) and not value.is_integer()):
+            self.errors.append(f'{field}: {message or "Quantity must be an integer"}')
+            return default
+        return int(value)
+
+    def boolean(self, field, default: bool) -> bool:
+        value = self.raw(field)
+        if value is None:
+            return default
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in _TRUE:
+            return True
+        if str(value).lower() in _FALSE:
+            return False
+        self.errors.append(f'{field} must be true or false')
+        return default
+
+    def json_object(self, field) -> dict:
+        value = self.raw(field)
+        if value is None:
+            return {}
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                value = None
+        if not isinstance(value, dict):
+            self.errors.append(f'{field} must be a JSON object')
+            return {}
+        return value
+
+
+def clean_product(cleaner: RecordCleaner) -> dict:
+    return {
+        'sku': cleaner.sku('sku'),
+        'name': cleaner.text('name', Product, required=True),
+        'slug': slugify(cleaner.text('slug', Product)),
+        'description': cleaner.text('description'),
+        'category': cleaner.text('category'),
+        'price': cleaner.price('price', Product, required=True),
+        'compare_price': cleaner.price('compare_price', Product),
+        'cost_price': cleaner.price('cost_price', Product),
+        'barcode': cleaner.text('barcode', Product),
+        'quantity': cleaner.quantity('quantity', 0),
+        'track_inventory': cleaner.boolean('track_inventory', True),
+        'low_stock_threshold': cleaner.quantity('low_stock_threshold', 10),
+        'weight': cleaner.decimal('weight', Product),
+        'dimensions': cleaner.text('dimensions', Product),
+        'meta_title': cleaner.text('meta_title', Product),
+        'meta_description': cleaner.text('meta_description'),
+        'is_active': cleaner.boolean('is_active', True),
+        'is_featured': cleaner.boolean('is_featured', False),
+    }
+
+
+def clean_variant(cleaner: RecordCleaner) -> dict:
+    return {
+        'sku': cleaner.sku('sku'),
+        'product_sku': cleaner.sku('product_sku'),
+        'name': cleaner.text('name', ProductVariant, required=True),
+        'price': cleaner.price('price', ProductVariant),
+        'quantity': cleaner.quantity('quantity', 0),
+        'attributes': cleaner.json_object('attributes'),
+        'is_active': cleaner.boolean('is_active', True),
+    }
+
+
+def clean_image(cleaner: RecordCleaner) -> dict:
+    return {
+        'product_sku': cleaner.sku('product_sku'),
+        'image': cleaner.text('image', ProductImage, required=True),
+        'alt_text': cleaner.text('alt_text', ProductImage),
+        'is_primary': cleaner.boolean('is_primary', False),
+        'order': cleaner.quantity('order', 0),
+    }
+
+
+CLEANERS = {'product': clean_product, 'variant': clean_variant, 'image': clean_image}
+
+
+class CatalogImporter:
+    """
+    Import a CSV or JSONL catalog file in batches.
+
+    Args:
+        batch_size: Records per batch and transaction (defaults to CATALOG_IO_BATCH_SIZE)
+        start_after: Skip records up to this number (the checkpoint of an earlier run)
+        progress: Optional callable(summary) called after every committed batch
+    """
+
+    def __init__(self, batch_size: int = None, start_after: int = 0, progress=None):
+        self.batch_size = batch_size or settings.CATALOG_IO_BATCH_SIZE
+        self.start_after = start_after
+        self.progress = progress or (lambda summary: None)
+        self.counts = {'records': 0, 'products': 0, 'variants': 0, 'images': 0}
+        self.errors = []
+        self.error_count = 0
+        self.last_record = start_after
+        self.started = None
+
+    def run(self, stream, file_format: str) -> dict:
+        """
+        Import every record after start_after.
+
+        Returns:
+            The summary (see summary())
+        """
+        self.started = time.monotonic()
+        batch = []
+        for number, record, error in parse_records(stream, file_format):
+            if number <= self.start_after:
+                continue
+            if error:
+                self.add_error(number, None, [error])
+            else:
+                batch.append((number, record))
+            self.counts['records'] += 1
+            if len(batch) >= self.batch_size:
+                self.commit(batch, number)
+                batch = []
+
+        last_record = number if self.counts['records'] else self.start_after
+        if batch or last_record > self.last_record:
+            self.commit(batch, last_record)
+        if self.counts['products']:
+            cache.delete_many(['categories_list_root', 'categories_list_root_async'])
+        return self.summary()
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            **self.counts,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'last_record': self.last_record,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(self.counts['records'] / elapsed, 1) if elapsed else 0,
+        }
+
+    def add_error(self, number: int, sku, messages: list):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'record': number, 'sku': sku, 'errors': messages})
+
+    def commit(self, batch: list, last_record: int):
+        if batch:
+            self.import_batch(batch)
+        self.last_record = last_record
+        self.progress(self.summary())
+
+    def import_batch(self, batch: list):
+        """Validate a batch and upsert its valid records in one transaction"""
+        records = {kind: [] for kind in RECORD_TYPES}
+        for number, record in batch:
+            kind = str(record.get('type') or 'product').strip().lower()
+            if kind not in CLEANERS:
+                self.add_error(number, record.get('sku'), [f'Unknown type {kind!r}'])
+                continue
+            cleaner = RecordCleaner(record)
+            data = CLEANERS[kind](cleaner)
+            if cleaner.errors:
+                self.add_error(number, data.get('sku') or data.get('product_sku'), cleaner.errors)
+            else:
+                records[kind].append((number, data))
+
+        with transaction.atomic():
+            detail_slugs = self.upsert_products(records['product'])
+            product_ids = dict(Product.objects.filter(
+                sku__in={data['product_sku'] for _, data in records['variant'] + records['image']}
+            ).values_list('sku', 'id'))
+            self.upsert_variants(records['variant'], product_ids)
+            self.upsert_images(records['image'], product_ids)
+        cache.delete_many([f'product_detail_{slug}' for slug in detail_slugs])
+
+    def upsert_products(self, records: list) -> list:
+        """
+        Upsert product records (the last record of a sku in the batch wins).
+
+        Returns:
+            Slugs of the written products, for cache invalidation
+        """
+        records = list({data['sku']: (number, data) for number, data in records}.values())
+        if not records:
+            return []
+        for _, data in records:
+            data['slug'] = data['slug'] or slugify(f"{data['name']}-{data['sku']}")[:300]
+
+        categories = dict(Category.objects.filter(
+            slug__in={data['category'] for _, data in records if data['category']}
+        ).values_list('slug', 'id'))
+        existing = list(Product.objects.filter(
+            Q(sku__in=[data['sku'] for _, data in records]) | Q(slug__in=[data['slug'] for _, data in records])
+        ).values_list('sku', 'slug'))
+        slug_by_sku = dict(existing)
+        slug_owners = {slug: sku for sku, slug in existing}
+
+        products = []
+        slugs = []
+        now = timezone.now()
+        for number, data in records:
+            if data['category'] and data['category'] not in categories:
+                self.add_error(number, data['sku'], [f"Unknown category {data['category']!r}"])
+                continue
+            slug = slug_by_sku.get(data['sku'], data['slug'])
+            if slug_owners.setdefault(slug, data['sku']) != data['sku']:
+                self.add_error(number, data['sku'], [f'Slug {slug!r} belongs to {slug_owners[slug]}'])
+                continue
+            data['slug'] = slug
+            category = data.pop('category')
+            products.append(Product(**data, category_id=categories.get(category), stock_updated_at=now))
+            slugs.append(slug)
+
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=['sku'], update_fields=PRODUCT_UPDATE_FIELDS,
+        )
+        self.counts['products'] += len(products)
+        return slugs
+
+    def upsert_variants(self, records: list, product_ids: dict):
+        variants = {}
+        for number, data in records:
+            product_sku = data.pop('product_sku')
+            if product_sku not in product_ids:
+                self.add_error(number, data['sku'], [f'Unknown product {product_sku}'])
+                continue
+            variants[data['sku']] = ProductVariant(**data, product_id=product_ids[product_sku])
+
+        ProductVariant.objects.bulk_create(
+            list(variants.values()), update_conflicts=True, unique_fields=['sku'], update_fields=VARIANT_UPDATE_FIELDS,
+        )
+        self.counts['variants'] += len(variants)
+
+    def upsert_images(self, records: list, product_ids: dict):
+        """Update images already attached to the product under the same path, create the others"""
+        images = {}
+        for number, data in records:
+            product_sku = data.pop('product_sku')
+            if product_sku not in product_ids:
+                self.add_error(number, product_sku, [f'Unknown product {product_sku}'])
+                continue
+            images[(product_ids[product_sku], data['image'])] = data
+        if not images:
+            return
+
+        existing = {
+            (image.product_id, image.image.name): image
+            for image in ProductImage.objects.filter(
+                product_id__in={product_id for product_id, _ in images},
+                image__in={path for _, path in images},
+            )
+        }
+        # One primary image per product: clear the old primary before setting the new one
+        ProductImage.objects.filter(
+            product_id__in={product_id for (product_id, _), data in images.items() if data['is_primary']},
+            is_primary=True,
+        ).update(is_primary=False)
+
+        updated = []
+        created = []
+        for key, data in images.items():
+            image = existing.get(key)
+            if image is None:
+                created.append(ProductImage(product_id=key[0], **data))
+            else:
+                image.alt_text, image.is_primary, image.order = data['alt_text'], data['is_primary'], data['order']
+                updated.append(image)
+        ProductImage.objects.bulk_update(updated, ['alt_text', 'is_primary', 'order'])
+        ProductImage.objects.bulk_create(created)
+        self.counts['images'] += len(images)
+
+
+def export_records(batch_size: int = None) -> Iterator[dict]:
+    """
+    Yield the catalog as import records: each product (in sku order) followed
+    by its variants and images.
+    """
+    products = Product.objects.select_related('category').prefetch_related('variants', 'images').order_by('sku')
+    for product in products.iterator(chunk_size=batch_size or settings.CATALOG_IO_BATCH_SIZE):
+        yield {
+            'type': 'product',
+            'sku': product.sku,
+            **{column: getattr(product, column) for column in PRODUCT_COLUMNS if column != 'category'},
+            'category': product.category.slug if product.category else None,
+        }
+        for variant in sorted(product.variants.all(), key=lambda variant: variant.sku):
+            yield {
+                'type': 'variant',
+                'sku': variant.sku,
+                'product_sku': product.sku,
+                **{column: getattr(variant, column) for column in VARIANT_COLUMNS},
+            }
+        for image in product.images.all():
+            yield {
+                'type': 'image',
+                'product_sku': product.sku,
+                'image': image.image.name,
+                'alt_text': image.alt_text,
+                'is_primary': image.is_primary,
+                'order': image.order,
+            }
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer yields strings"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def export_lines(file_format: str, batch_size: int = None) -> Iterator[str]:
+    """Yield the catalog encoded as CSV (header first) or JSONL lines"""
+    records = export_records(batch_size)
+    if file_format == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS, restval='')
+        yield writer.writeheader()
+        for record in records:
+            yield writer.writerow({column: _csv_value(value) for column, value in record.items()})
+    else:
+        for record in records:
+            yield json.dumps(record, default=str) + '\n'
@@ -0,0 +1,398 @@
+"""
+Synthetic Datasets
+
+Large, reproducible datasets for load tests and benchmarks
+(scripts/generate_dataset.py, scripts/benchmark_endpoints.py):
+- Rows are built one chunk at a time and written with bulk_create, each
+  chunk in its own transaction, so memory stays bounded by the chunk size
+  (plus the primary keys later tables refer to)
+- Popularity follows a Zipf distribution: a few products collect most of
+  the reviews, cart lines and order lines, and a few customers place most
+  of the orders, as in real traffic
+- Everything is drawn from one seeded random generator, so the same seed
+  and sizes reproduce the same dataset and benchmark runs stay comparable
+
+Generated users share the SYNTHETIC_EMAIL_DOMAIN and generated catalog rows
+the SYNTHETIC_SKU_PREFIX, so a dataset can be removed without touching real
+data (SyntheticDataGenerator.clear). bulk_create skips save() and signals:
+the fields save() would fill (slugs, order numbers, line subtotals) are set
+here.
+"""
+
+import bisect
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.text import slugify
+
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.example.com'
+SYNTHETIC_SKU_PREFIX = 'SYN'
+SYNTHETIC_PASSWORD = 'synthetic-pass-123'
+
+# Relative sizes of each table for one unit of --scale
+DEFAULT_SIZES = {
+    'users': 1_000,
+    'products': 2_000,
+    'variants_per_product': 2,
+    'reviews': 5_000,
+    'carts': 500,
+    'orders': 3_000,
+}
+
+CATEGORY_TREE = {
+    'Electronics': ['Phones', 'Laptops', 'Audio', 'Cameras'],
+    'Fashion': ['Men', 'Women', 'Shoes', 'Bags'],
+    'Home & Garden': ['Furniture', 'Kitchen', 'Decor', 'Garden'],
+    'Sports': ['Fitness', 'Outdoor', 'Cycling'],
+}
+
+ADJECTIVES = [
+    'classic', 'premium', 'compact', 'wireless', 'organic', 'vintage', 'smart', 'ultra',
+    'portable', 'deluxe', 'eco', 'pro', 'lightweight', 'modern', 'rugged', 'slim',
+]
+NOUNS = [
+    'headphones', 'backpack', 'lamp', 'jacket', 'blender', 'speaker', 'sneakers', 'watch',
+    'kettle', 'chair', 'camera', 'tent', 'bottle', 'keyboard', 'dress', 'helmet',
+]
+VARIANT_OPTIONS = ['Black', 'White', 'Red', 'Blue', 'Small', 'Medium', 'Large', 'XL']
+ORDER_STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'delivered', 'delivered', 'cancelled']
+CITIES = [('New York', 'NY'), ('Chicago', 'IL'), ('Austin', 'TX'), ('Seattle', 'WA'), ('Boston', 'MA')]
+
+
+class ZipfSampler:
+    """
+    Draws indexes 0..n-1 with probability proportional to 1 / (rank ** s).
+
+    Algorithm: Cumulative weights are computed once (O(n)); each draw is a
+    binary search for a uniform value in them (O(log n)). Ranks are shuffled
+    onto indexes so the popular items aren't simply the first ones created.
+    """
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        if n < 1:
+            raise ValueError('ZipfSampler needs at least one item')
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / rank ** s for rank in range(1, n + 1)))
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def sample(self) -> int:
+        rank = bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+        return self.order[min(rank, len(self.order) - 1)]
+
+    def sample_distinct(self, k: int) -> list:
+        """Up to k different indexes (fewer when popular ones keep repeating)"""
+        picked = {self.sample() for _ in range(k * 2)}
+        return list(picked)[:k]
+
+
+def chunked(iterable, size: int):
+    """Yield lists of at most size items"""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class SyntheticDataGenerator:
+    """
+    Generate a synthetic dataset with bulk_create in chunks.
+
+    Args:
+        users: Customers, each with a shipping address
+        products: Active products spread over CATEGORY_TREE
+        variants_per_product: Average variants per product (0 to twice this)
+        reviews: Reviews, at most one per (product, user)
+        carts: Customers with a non-empty cart
+        orders: Orders with 1-5 lines each and a status history row
+        chunk_size: Rows per bulk_create call and transaction
+        seed: Random seed (same seed and sizes give the same dataset)
+        zipf_s: Zipf exponent; higher is more skewed
+        progress: Optional callable(table, rows written so far)
+    """
+
+    def __init__(self, users: int, products: int, variants_per_product: int = 2, reviews: int = 0,
+                 carts: int = 0, orders: int = 0, chunk_size: int = 5_000, seed: int = 0,
+                 zipf_s: float = 1.1, progress=None):
+        self.sizes = {
+            'users': users,
+            'products': products,
+            'variants_per_product': variants_per_product,
+            'reviews': reviews,
+            'carts': min(carts, users),
+            'orders': orders,
+        }
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.zipf_s = zipf_s
+        self.progress = progress or (lambda table, count: None)
+        self.rng = random.Random(seed)
+        self.category_ids = []
+        self.user_ids = []
+        self.address_ids = []
+        self.product_ids = []
+        self.product_prices = []
+        self.product_names = []
+
+    @classmethod
+    def at_scale(cls, scale: float, **kwargs):
+        """Generator sized at scale times DEFAULT_SIZES (keyword arguments override)"""
+        sizes = {key: int(value * scale) for key, value in DEFAULT_SIZES.items() if key != 'variants_per_product'}
+        sizes['variants_per_product'] = DEFAULT_SIZES['variants_per_product']
+        sizes.update({key: value for key, value in kwargs.items() if value is not None})
+        return cls(**sizes)
+
+    def generate(self) -> dict:
+        """
+        Write the whole dataset.
+
+        Returns:
+            Dictionary with rows written per table and seconds per step
+        """
+        counts, timings = {}, {}
+        steps = [
+            ('categories', self.create_categories),
+            ('users', self.create_users),
+            ('products', self.create_products),
+            ('variants', self.create_variants),
+            ('reviews', self.create_reviews),
+            ('cart_items', self.create_carts),
+            ('orders', self.create_orders),
+        ]
+        for name, step in steps:
+            started = time.perf_counter()
+            counts[name] = step()
+            timings[name] = round(time.perf_counter() - started, 3)
+        return {'seed': self.seed, 'sizes': self.sizes, 'rows': counts, 'seconds': timings}
+
+    def sku(self, index: int) -> str:
+        return f'{SYNTHETIC_SKU_PREFIX}-{self.seed}-{index:08d}'
+
+    def _bulk_create(self, model, rows, table: str) -> int:
+        """bulk_create rows (any iterable) chunk by chunk; returns rows written"""
+        written = 0
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.chunk_size)
+            written += len(chunk)
+            self.progress(table, written)
+        return written
+
+    def create_categories(self) -> int:
+        from apps.products.models import Category
+
+        created = 0
+        for parent_name, children in CATEGORY_TREE.items():
+            parent, new = Category.objects.get_or_create(
+                slug=slugify(parent_name), defaults={'name': parent_name},
+            )
+            created += new
+            for child_name in children:
+                child, new = Category.objects.get_or_create(
+                    slug=slugify(f'{parent_name}-{child_name}'),
+                    defaults={'name': f'{parent_name} / {child_name}', 'parent': parent},
+                )
+                created += new
+                self.category_ids.append(child.id)
+        return created
+
+    def create_users(self) -> int:
+        from apps.users.models import Address, User
+
+        # One hash for everyone: hashing a million passwords would dominate the run
+        password = make_password(SYNTHETIC_PASSWORD)
+        tag = self.seed
+
+        def users():
+            for i in range(self.sizes['users']):
+                user = User(
+                    email=f'user{i}.{tag}@{SYNTHETIC_EMAIL_DOMAIN}',
+                    password=password,
+                    first_name='Synthetic',
+                    last_name=f'User {i}',
+                    is_verified=True,
+                )
+                self.user_ids.append(user.id)
+                yield user
+
+        written = self._bulk_create(User, users(), 'users')
+
+        def addresses():
+            for i, user_id in enumerate(self.user_ids):
+                city, state = CITIES[i % len(CITIES)]
+                address = Address(
+                    user_id=user_id, address_type='shipping', full_name=f'Synthetic User {i}',
+                    phone_number='+10000000000', street_address=f'{i} Main St', city=city,
+                    state=state, country='USA', zip_code=f'{10000 + i % 90000}', is_default=True,
+                )
+                self.address_ids.append(address.id)
+                yield address
+
+        self._bulk_create(Address, addresses(), 'addresses')
+        return written
+
+    def create_products(self) -> int:
+        from apps.products.models import Product
+
+        def products():
+            for i in range(self.sizes['products']):
+                name = f'{self.rng.choice(ADJECTIVES).title()} {self.rng.choice(NOUNS)} {i}'
+                price = Decimal(self.rng.randint(299, 99_999)) / 100
+                product = Product(
+                    name=name,
+                    slug=f'{slugify(name)}-{self.seed}',
+                    description=f'{name}: synthetic product for load testing.',
+                    category_id=self.rng.choice(self.category_ids),
+                    price=price,
+                    sku=self.sku(i),
+                    quantity=self.rng.randint(0, 500),
+                    is_featured=self.rng.random() < 0.02,
+                )
+                self.product_ids.append(product.id)
+                self.product_prices.append(price)
+                self.product_names.append(name)
+                yield product
+
+        return self._bulk_create(Product, products(), 'products')
+
+    def create_variants(self) -> int:
+        from apps.products.models import ProductVariant
+
+        average = self.sizes['variants_per_product']
+
+        def variants():
+            for i, product_id in enumerate(self.product_ids):
+                for n in range(self.rng.randint(0, average * 2)):
+                    yield ProductVariant(
+                        product_id=product_id,
+                        name=VARIANT_OPTIONS[n % len(VARIANT_OPTIONS)],
+                        sku=f'{self.sku(i)}-{n}',
+                        price=self.product_prices[i],
+                        quantity=self.rng.randint(0, 100),
+                    )
+
+        return self._bulk_create(ProductVariant, variants(), 'variants')
+
+    def create_reviews(self) -> int:
+        from apps.products.models import Review
+
+        if not (self.sizes['reviews'] and self.product_ids and self.user_ids):
+            return 0
+        products = ZipfSampler(len(self.product_ids), self.zipf_s, self.rng)
+        limit = min(self.sizes['reviews'], len(self.product_ids) * len(self.user_ids))
+
+        def reviews():
+            seen = set()
+            while len(seen) < limit:
+                pair = (products.sample(), self.rng.randrange(len(self.user_ids)))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield Review(
+                    product_id=self.product_ids[pair[0]],
+                    user_id=self.user_ids[pair[1]],
+                    rating=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 2, 4, 6])[0],
+                    title=self.rng.choice(['Great', 'Works as described', 'Not bad', 'Disappointing']),
+                    comment='Synthetic review for load testing.',
+                    is_verified_purchase=self.rng.random() < 0.6,
+                )
+
+        return self._bulk_create(Review, reviews(), 'reviews')
+
+    def create_carts(self) -> int:
+        from apps.cart.models import Cart, CartItem
+
+        if not (self.sizes['carts'] and self.product_ids):
+            return 0
+        products = ZipfSampler(len(self.product_ids), self.zipf_s, self.rng)
+        carts = [Cart(user_id=user_id) for user_id in self.rng.sample(self.user_ids, self.sizes['carts'])]
+        self._bulk_create(Cart, carts, 'carts')
+
+        def items():
+            for cart in carts:
+                for index in products.sample_distinct(self.rng.randint(1, 5)):
+                    yield CartItem(
+                        cart_id=cart.id, product_id=self.product_ids[index],
+                        quantity=self.rng.randint(1, 3), price=self.product_prices[index],
+                    )
+
+        return self._bulk_create(CartItem, items(), 'cart_items')
+
+    def create_orders(self) -> int:
+        from apps.orders.models import Order, OrderItem, OrderStatusHistory
+        from apps.orders.services import order_numbers
+
+        if not (self.sizes['orders'] and self.product_ids and self.user_ids):
+            return 0
+        products = ZipfSampler(len(self.product_ids), self.zipf_s, self.rng)
+        customers = ZipfSampler(len(self.user_ids), self.zipf_s, self.rng)
+        written = 0
+
+        for chunk in chunked(range(self.sizes['orders']), self.chunk_size):
+            orders, items, history = [], [], []
+            for _ in chunk:
+                customer = customers.sample()
+                lines = []
+                for index in products.sample_distinct(self.rng.randint(1, 5)):
+                    quantity = self.rng.randint(1, 3)
+                    lines.append((index, quantity, self.product_prices[index] * quantity))
+                subtotal = sum(line[2] for line in lines)
+                tax = (subtotal * Decimal('0.1')).quantize(Decimal('0.01'))
+                order = Order(
+                    order_number=order_numbers.next_order_number(),
+                    user_id=self.user_ids[customer],
+                    status=self.rng.choice(ORDER_STATUSES),
+                    subtotal=subtotal,
+                    tax=tax,
+                    shipping_cost=Decimal('5.00'),
+                    total_amount=subtotal + tax + Decimal('5.00'),
+                    shipping_address_id=self.address_ids[customer],
+                    billing_address_id=self.address_ids[customer],
+                )
+                orders.append(order)
+                history.append(OrderStatusHistory(order=order, status=order.status, note='Synthetic order'))
+                for index, quantity, line_total in lines:
+                    items.append(OrderItem(
+                        order=order, product_id=self.product_ids[index],
+                        product_name=self.product_names[index],
+                        product_sku=self.sku(index),
+                        price=self.product_prices[index], quantity=quantity, subtotal=line_total,
+                    ))
+            with transaction.atomic():
+                Order.objects.bulk_create(orders, batch_size=self.chunk_size)
+                OrderItem.objects.bulk_create(items, batch_size=self.chunk_size)
+                OrderStatusHistory.objects.bulk_create(history, batch_size=self.chunk_size)
+            written += len(orders)
+            self.progress('orders', written)
+        return written
+
+    @staticmethod
+    def clear() -> dict:
+        """
+        Delete every synthetic row (orders first: they protect users and addresses).
+
+        Returns:
+            Dictionary with rows deleted per model
+        """
+        from apps.orders.models import Order
+        from apps.products.models import Product
+        from apps.users.models import User
+
+        deleted = {}
+        synthetic_users = User.objects.filter(email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}')
+        with transaction.atomic():
+            for queryset in (
+                Order.objects.filter(user__in=synthetic_users),
+                synthetic_users,
+                Product.objects.filter(sku__startswith=f'{SYNTHETIC_SKU_PREFIX}-'),
+            ):
+                _, per_model = queryset.delete()
+                for label, count in per_model.items():
+                    deleted[label] = deleted.get(label, 0) + count
+        return deleted
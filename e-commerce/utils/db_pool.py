@@ -0,0 +1,148 @@
+"""
+Database Connection Pooling Utilities
+
+Connection settings for PostgreSQL that keep the total number of server
+connections bounded across gunicorn workers and Celery processes:
+- psycopg 3 native connection pool (Django 5.1+ OPTIONS['pool']), sized from
+  the environment
+- Transaction-pooling-safe mode for PgBouncer: no server-side cursors and no
+  prepared statements unless explicitly configured
+- Pool statistics (wait times, utilization) for the health endpoints
+
+Environment:
+    DB_POOL                 Use the native pool (default False)
+    DB_POOL_MIN_SIZE        Connections kept open per process (default 2)
+    DB_POOL_MAX_SIZE        Connections allowed per process (default 10)
+    DB_POOL_TIMEOUT         Seconds to wait for a free connection (default 10)
+    DB_POOL_MAX_IDLE        Seconds before an idle connection is closed (default 300)
+    DB_POOL_MAX_LIFETIME    Seconds before a connection is recycled (default 1800)
+    DB_PGBOUNCER            Connect through PgBouncer transaction pooling (default False)
+    DB_PREPARE_THRESHOLD    psycopg prepared statement threshold in PgBouncer mode
+                            (default unset: never prepare)
+"""
+
+import logging
+import os
+
+import django
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _psycopg_version():
+    """Major version of the installed psycopg driver (3, 2 or None)"""
+    try:
+        import psycopg  # noqa: F401
+        return 3
+    except ImportError:
+        pass
+    try:
+        import psycopg2  # noqa: F401
+        return 2
+    except ImportError:
+        return None
+
+
+def native_pool_available() -> bool:
+    """The native pool needs Django 5.1+, psycopg 3 and psycopg_pool"""
+    if django.VERSION < (5, 1) or _psycopg_version() != 3:
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configure_pooling(database: dict) -> dict:
+    """
+    Apply pooling settings from the environment to a DATABASES entry.
+
+    Algorithm: With DB_POOL and a capable stack, each process keeps a
+    psycopg 3 pool of at most DB_POOL_MAX_SIZE connections and Django's
+    per-thread persistent connections are turned off (the two are mutually
+    exclusive). Otherwise persistent connections with health checks are
+    kept. DB_PGBOUNCER disables server-side cursors and, on psycopg 3,
+    prepared statements, which PgBouncer's transaction pooling cannot route.
+
+    Args:
+        database: DATABASES entry (modified in place)
+
+    Returns:
+        The same entry
+    """
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        return database
+
+    options = database.setdefault('OPTIONS', {})
+    database['CONN_HEALTH_CHECKS'] = True
+
+    if _env_bool('DB_POOL'):
+        if native_pool_available():
+            options['pool'] = {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+                'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+            }
+            database['CONN_MAX_AGE'] = 0
+        else:
+            logger.warning(
+                "DB_POOL requires Django 5.1+ with psycopg[pool] 3; using persistent connections instead"
+            )
+
+    if _env_bool('DB_PGBOUNCER'):
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if _psycopg_version() == 3:
+            threshold = os.getenv('DB_PREPARE_THRESHOLD')
+            options['prepare_threshold'] = int(threshold) if threshold else None
+
+    return database
+
+
+def pool_stats(alias: str = 'default') -> dict:
+    """
+    Connection pool statistics for a database.
+
+    Returns:
+        Dictionary with the pool configuration, current size and
+        availability, utilization (0-1) and cumulative wait statistics; only
+        the connection mode when no native pool is in use
+    """
+    from django.db import connections
+
+    connection = connections[alias]
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return {
+            'pooled': False,
+            'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+            'server_side_cursors': not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False),
+        }
+
+    stats = pool.get_stats()
+    size = stats.get('pool_size', 0)
+    available = stats.get('pool_available', 0)
+    requests = stats.get('requests_num', 0)
+    waiting_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'pooled': True,
+        'min_size': pool.min_size,
+        'max_size': pool.max_size,
+        'size': size,
+        'available': available,
+        'in_use': size - available,
+        'utilization': round((size - available) / pool.max_size, 3) if pool.max_size else 0,
+        'requests_waiting': stats.get('requests_waiting', 0),
+        'requests': requests,
+        'requests_queued': stats.get('requests_queued', 0),
+        'requests_errors': stats.get('requests_errors', 0),
+        'wait_ms_total': waiting_ms,
+        'wait_ms_avg': round(waiting_ms / requests, 2) if requests else 0,
+        'server_side_cursors': not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False),
+    }
@@ -0,0 +1,243 @@
+"""
+Read Replica Routing
+
+Sends request reads to read replicas while keeping every write, and the
+reads that must see it, on the primary:
+- Only safe-method requests (GET, HEAD, OPTIONS) read from replicas; writes,
+  background tasks and management commands stay on the primary
+- Read-your-writes: once a request writes, its remaining reads use the
+  primary, and the client's reads stick to the primary for a short window
+  (cookie for browsers, cache marker keyed by the Authorization header for
+  API clients)
+- Health-aware selection: replicas that fail a check or lag too far behind
+  are skipped until the next check
+- Per-view opt-out with the use_primary_db attribute or decorator
+"""
+
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'primary_db_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Whether reads may go to a replica in the current request/context
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+# Set once the current request/context has written to the primary
+_wrote = contextvars.ContextVar('wrote_to_primary', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads inside the block to use a replica (e.g. in reporting tasks)"""
+    token = _replica_reads.set(True)
+    wrote = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(wrote)
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_db():
+    """Force every read inside the block onto the primary"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_primary_db(view):
+    """Mark a view (function or class) as always reading from the primary"""
+    view.use_primary_db = True
+    return view
+
+
+# Seconds of replay lag. The last replayed transaction's age alone keeps
+# growing while the primary is idle, so a replica that has replayed all the
+# WAL it received counts as caught up.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class ReplicaHealth:
+    """
+    Per-process replica health cache.
+
+    Algorithm: Each replica is checked at most once per
+    REPLICA_HEALTH_CHECK_INTERVAL seconds (SELECT 1, plus replay lag on
+    PostgreSQL); between checks the last verdict is reused, so selection
+    costs no queries on the hot path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}  # alias -> (healthy, checked_at)
+
+    def is_healthy(self, alias: str) -> bool:
+        healthy, checked_at = self._status.get(alias, (True, None))
+        if checked_at is not None and time.monotonic() - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+        with self._lock:
+            healthy = self.check(alias)
+            self._status[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def reset(self):
+        self._status.clear()
+
+    @staticmethod
+    def check(alias: str) -> bool:
+        """Run a health check against a replica"""
+        try:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(REPLICA_LAG_SQL)
+                    lag = float(cursor.fetchone()[0])
+                    if lag > settings.REPLICA_MAX_LAG:
+                        logger.warning(f"Replica {alias} is {lag:.1f}s behind; skipping")
+                        return False
+                else:
+                    cursor.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Replica {alias} failed health check: {e}")
+            return False
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """Database router sending eligible reads to healthy replicas"""
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get() or _wrote.get():
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if health.is_healthy(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Reads for the rest of this request must see the write
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReadReplicaMiddleware:
+    """
+    Decides per request whether reads may use a replica and maintains the
+    read-your-writes window after writes. Runs natively under both WSGI and
+    ASGI so it never forces async views back onto a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        marker, tokens = self._begin(request)
+        try:
+            response = self.get_response(request)
+            self._finish(response, marker)
+            return response
+        finally:
+            self._end(tokens)
+
+    async def __acall__(self, request):
+        marker, tokens = self._begin(request)
+        try:
+            response = await self.get_response(request)
+            self._finish(response, marker)
+            return response
+        finally:
+            self._end(tokens)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if getattr(view_func, 'use_primary_db', False) or getattr(view_class, 'use_primary_db', False):
+            _replica_reads.set(False)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ReadReplicaMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    def _begin(self, request):
+        marker = self._marker_key(request)
+        sticky = self._is_sticky(request, marker)
+        tokens = (
+            _replica_reads.set(request.method in SAFE_METHODS and not sticky),
+            _wrote.set(False),
+        )
+        return marker, tokens
+
+    def _finish(self, response, marker):
+        if _wrote.get() and response.status_code < 400:
+            self._stick(response, marker)
+
+    @staticmethod
+    def _end(tokens):
+        replica_token, wrote_token = tokens
+        _wrote.reset(wrote_token)
+        _replica_reads.reset(replica_token)
+
+    @staticmethod
+    def _marker_key(request):
+        authorization = request.headers.get('Authorization')
+        if not authorization:
+            return None
+        return f"db:primary_until:{hashlib.sha256(authorization.encode()).hexdigest()[:32]}"
+
+    @staticmethod
+    def _is_sticky(request, marker) -> bool:
+        now = time.time()
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > now:
+                return True
+        except ValueError:
+            pass
+        return bool(marker and cache.get(marker, 0) > now)
+
+    @staticmethod
+    def _stick(response, marker):
+        window = settings.REPLICA_STICKY_SECONDS
+        until = time.time() + window
+        response.set_cookie(STICKY_COOKIE, f"{until:.0f}", max_age=window, httponly=True, samesite='Lax')
+        if marker:
+            cache.set(marker, until, timeout=window)
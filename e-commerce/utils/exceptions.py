@@ -42,3 +42,9 @@ class OutOfStockError(CustomAPIException):
     """Product out of stock"""
     status_code = status.HTTP_409_CONFLICT
     default_detail = 'Product is out of stock.'
+
+
+class ServiceUnavailableError(CustomAPIException):
+    """Service temporarily overloaded"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service temporarily unavailable. Please try again later.'
@@ -0,0 +1,83 @@
+"""
+Identifier Utilities
+
+Time-ordered UUIDv7 (RFC 9562) primary keys for insert-heavy tables:
+- New keys land at the right edge of the primary key index instead of
+  splitting random pages, keeping recent rows together in cache
+- Keys sort by creation time, so keyset pagination and archival can range
+  over the primary key directly
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+_COUNTER_MAX = 0xFFF  # 12-bit rand_a field
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUIDv7.
+
+    Algorithm: 48-bit Unix millisecond timestamp, then a 12-bit counter that
+    starts at a random value each millisecond and increments for keys
+    generated within the same millisecond (borrowing the next millisecond on
+    overflow), then 62 random bits. Keys from one process are strictly
+    increasing; keys from different processes are ordered to the millisecond.
+
+    Returns:
+        UUID with version 7
+    """
+    global _last_ms, _counter
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF  # leave headroom to increment
+        else:
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b
+    return uuid.UUID(int=value)
+
+
+def uuid7_datetime(value: uuid.UUID) -> datetime:
+    """
+    Get the creation time embedded in a UUIDv7.
+
+    Args:
+        value: UUIDv7 key
+
+    Returns:
+        Timezone-aware UTC datetime (millisecond precision)
+    """
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+
+
+def uuid7_floor(moment: datetime) -> uuid.UUID:
+    """
+    Get the smallest UUIDv7 that could be generated at a moment.
+
+    Use as a primary key bound, e.g. pk__lt=uuid7_floor(cutoff). Only rows
+    keyed with UUIDv7 are ordered by time; older uuid4 keys are random.
+
+    Args:
+        moment: Timezone-aware datetime
+
+    Returns:
+        UUID with version 7 and all random bits cleared
+    """
+    ms = int(moment.timestamp() * 1000)
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (0b10 << 62))
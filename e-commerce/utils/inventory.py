@@ -10,6 +10,7 @@ This module provides efficient algorithms for:
 
 from django.db.models import F, Q
 from django.db import transaction
+from django.utils import timezone
 from apps.products.models import Product, ProductVariant
 
 
@@ -46,7 +47,7 @@ class InventoryManager:
                 id=product_id,
                 quantity__gte=quantity,
                 track_inventory=True
-            ).update(quantity=F('quantity') - quantity)
+            ).update(quantity=F('quantity') - quantity, stock_updated_at=timezone.now())
             return updated > 0
     
     @staticmethod
@@ -76,7 +77,7 @@ class InventoryManager:
             updated = Product.objects.filter(
                 id=product_id,
                 track_inventory=True
-            ).update(quantity=F('quantity') + quantity)
+            ).update(quantity=F('quantity') + quantity, stock_updated_at=timezone.now())
             return updated > 0
     
     @staticmethod
@@ -135,7 +136,7 @@ class InventoryManager:
                 else:
                     updated = Product.objects.filter(
                         id=product_id
-                    ).update(quantity=F('quantity') + quantity)
+                    ).update(quantity=F('quantity') + quantity, stock_updated_at=timezone.now())
                 
                 if updated > 0:
                     success_count += 1
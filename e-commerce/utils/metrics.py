@@ -0,0 +1,234 @@
+"""
+Prometheus Metrics
+
+Application metrics served at /metrics (config.health.metrics):
+- HTTP request latency histograms and counts per route pattern and method
+- Database queries: count and latency per alias, queries per request per
+  route (through a connection execute wrapper)
+- Cache hits and misses per CacheManager key prefix
+- Celery task durations per task and outcome, and queue depths read from
+  the broker at scrape time
+- Checkout outcomes, stock-outs and notification dispatches
+
+Multiprocess collection: with PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py
+sets it for gunicorn workers) every process writes its samples to that
+directory and a scrape of any worker aggregates all of them. Without it
+the process's own registry is served.
+"""
+
+import contextvars
+import os
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from utils.cache import CacheManager
+from utils.profiling import add_cache_listener, add_execute_wrapper
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+http_requests = Counter('http_requests', 'HTTP responses', ['method', 'route', 'status'])
+db_query_duration = Histogram('db_query_duration_seconds', 'Database query latency', ['alias'], buckets=QUERY_BUCKETS)
+db_queries_per_request = Histogram(
+    'http_request_db_queries', 'Database queries per HTTP request', ['route'], buckets=QUERY_COUNT_BUCKETS,
+)
+cache_reads = Counter('cache_reads', 'Cache reads per key prefix', ['prefix', 'result'])
+celery_task_duration = Histogram(
+    'celery_task_duration_seconds', 'Celery task run time', ['task', 'state'], buckets=LATENCY_BUCKETS + (30, 60, 300),
+)
+checkouts = Counter('checkouts', 'Checkout attempts', ['result'])
+stock_outs = Counter('stock_outs', 'Products whose stock ran out at checkout')
+notifications_dispatched = Counter('notifications_dispatched', 'Notifications sent', ['channel', 'result'])
+
+# Cache key -> CacheManager prefix (the leading word of the key)
+_CACHE_PREFIXES = {
+    prefix: prefix for name, prefix in vars(CacheManager).items() if name.startswith('PREFIX_')
+}
+_CACHE_PREFIXES.update({'categories': CacheManager.PREFIX_CATEGORY, 'products': CacheManager.PREFIX_PRODUCT})
+_KEY_WORD = re.compile(r'[a-z]+')
+
+# Query counter of the current request; shared with the threads running its ORM calls
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+_installed = False
+_install_lock = threading.Lock()
+
+
+def cache_prefix(key: str) -> str:
+    match = _KEY_WORD.match(str(key))
+    return _CACHE_PREFIXES.get(match.group() if match else '', 'other')
+
+
+def _count_cache_reads(hits: list, misses: list):
+    for key in hits:
+        cache_reads.labels(cache_prefix(key), 'hit').inc()
+    for key in misses:
+        cache_reads.labels(cache_prefix(key), 'miss').inc()
+
+
+def observe_query(execute, sql, params, many, context):
+    """Execute wrapper timing every query"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        db_query_duration.labels(context['connection'].alias).observe(time.perf_counter() - started)
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def install():
+    """Start counting queries and cache reads (once per process)"""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            add_execute_wrapper(observe_query)
+            add_cache_listener(_count_cache_reads)
+            _installed = True
+
+
+def route_label(request) -> str:
+    """URL pattern of the matched view (bounded label values), not the path"""
+    match = getattr(request, 'resolver_match', None)
+    return f'/{match.route}' if match else '<unmatched>'
+
+
+class PrometheusMiddleware:
+    """
+    Records latency, status and query counts per route. Runs natively
+    under both WSGI and ASGI; removed from the chain when METRICS_ENABLED
+    is off.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = _request_queries.set([0])
+        try:
+            response = self.get_response(request)
+            self.record(request, response, started)
+        finally:
+            _request_queries.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        token = _request_queries.set([0])
+        try:
+            response = await self.get_response(request)
+            self.record(request, response, started)
+        finally:
+            _request_queries.reset(token)
+        return response
+
+    @staticmethod
+    def record(request, response, started: float):
+        route = route_label(request)
+        http_request_duration.labels(request.method, route).observe(time.perf_counter() - started)
+        http_requests.labels(request.method, route, str(response.status_code)).inc()
+        db_queries_per_request.labels(route).observe(_request_queries.get()[0])
+
+
+class CeleryQueueCollector:
+    """
+    Celery queue depths, read from the broker when scraped.
+
+    Depths are cached for METRICS_QUEUE_DEPTH_TTL seconds so frequent
+    scrapes from several Prometheus replicas cost one broker round trip.
+    """
+
+    def __init__(self):
+        self._depths = {}
+        self._read_at = 0
+        self._lock = threading.Lock()
+
+    def queue_depths(self) -> dict:
+        with self._lock:
+            if time.monotonic() - self._read_at >= settings.METRICS_QUEUE_DEPTH_TTL:
+                self._depths = self.read_depths()
+                self._read_at = time.monotonic()
+            return self._depths
+
+    @staticmethod
+    def read_depths() -> dict:
+        from config.celery import app
+
+        depths = {}
+        try:
+            with app.connection_for_read() as connection:
+                connection.ensure_connection(max_retries=1)
+                channel = connection.default_channel
+                for queue in app.conf.task_queues:
+                    depths[queue.name] = channel.queue_declare(queue=queue.name, passive=True).message_count
+        except Exception:
+            # Broker unreachable: report no depths rather than failing the scrape
+            pass
+        return depths
+
+    def collect(self):
+        gauge = GaugeMetricFamily('celery_queue_depth', 'Messages waiting per Celery queue', labels=['queue'])
+        for queue, depth in self.queue_depths().items():
+            gauge.add_metric([queue], depth)
+        yield gauge
+
+
+queue_collector = CeleryQueueCollector()
+_queue_collector_registered = False
+
+
+def registry():
+    """
+    Registry to serve: every process's samples in multiprocess mode,
+    otherwise this process's, plus the queue depth collector.
+    """
+    global _queue_collector_registered
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        scrape_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(scrape_registry)
+        if settings.METRICS_CELERY_QUEUES:
+            scrape_registry.register(queue_collector)
+        return scrape_registry
+
+    with _install_lock:
+        if settings.METRICS_CELERY_QUEUES and not _queue_collector_registered:
+            REGISTRY.register(queue_collector)
+            _queue_collector_registered = True
+    return REGISTRY
+
+
+# Start times of the tasks running in this process, by task id
+_task_started = {}
+
+
+def record_task_started(task_id: str):
+    _task_started[task_id] = time.perf_counter()
+
+
+def record_task_finished(task_id: str, task_name: str, state: str):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        celery_task_duration.labels(task_name, state or 'UNKNOWN').observe(time.perf_counter() - started)
@@ -0,0 +1,42 @@
+"""
+Async-Capable Middleware
+
+Middleware variants that run natively in both WSGI and ASGI deployments:
+- Under ASGI, a single sync-only middleware makes Django adapt the rest of
+  the chain, so every async view ends up running in a worker thread again
+- WhiteNoiseMiddleware: whitenoise 6.6 is sync-only; static lookups are
+  in-memory dictionary hits, so the same logic is safe on the event loop
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise static file serving without forcing a sync middleware chain"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
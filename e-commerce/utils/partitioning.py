@@ -0,0 +1,362 @@
+"""
+Table Partitioning Utilities
+
+Monthly range partitioning by created_at for the append-mostly tables
+(PostgreSQL declarative partitioning):
+- One-time conversion of an existing table into a partitioned table
+- Pre-creation of future monthly partitions
+- Archival of old partitions into compressed CSV files
+
+Table names are unchanged, so Django model access stays transparent. On
+other databases every operation is a no-op.
+
+Partitioned tables have a few constraints that the models account for:
+- The primary key becomes (id, created_at). Ids are UUIDs, so they stay
+  unique, but the database only enforces it per partition.
+- PostgreSQL cannot enforce a unique index that lacks the partition key.
+  Such constraints are not rewritten: a plain unique one (orders'
+  order_number) moves to a non-partitioned <table>_<columns>_registry
+  table kept in sync by a trigger, so it stays unique across partitions,
+  including archived ones. Partial or expression unique indexes (the
+  pending-notification dedupe key) cannot be kept, so convert() refuses
+  such tables and notifications stay unpartitioned.
+- A partitioned table cannot be the target of a foreign key, so the
+  relations pointing at orders are declared with db_constraint=False.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# table -> partition key
+PARTITIONED_TABLES = {
+    'orders': 'created_at',
+    'order_items': 'created_at',
+    'order_status_history': 'created_at',
+}
+
+
+def month_start(value) -> date:
+    """First day of the month containing a date or datetime"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """First day of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_ranges(start: date, count: int) -> list:
+    """
+    Monthly partition ranges.
+
+    Args:
+        start: Any day in the first month
+        count: Number of months
+
+    Returns:
+        List of (suffix, from, to) tuples, e.g. ('p202610', 2026-10-01, 2026-11-01)
+    """
+    first = month_start(start)
+    return [
+        (f"p{add_months(first, i):%Y%m}", add_months(first, i), add_months(first, i + 1))
+        for i in range(count)
+    ]
+
+
+class PartitionManager:
+    """Manages monthly partitions of the tables in PARTITIONED_TABLES"""
+
+    UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+    def __init__(self, using: str = None):
+        self.connection = connections[using or DEFAULT_DB_ALIAS]
+
+    @property
+    def supported(self) -> bool:
+        """Partitioning is only available on PostgreSQL"""
+        return self.connection.vendor == 'postgresql'
+
+    def quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def is_partitioned(self, table: str) -> bool:
+        """Check whether a table is already a partitioned table"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+        return row is not None and row[0] == 'p'
+
+    def partitions(self, table: str) -> list:
+        """
+        List the partitions of a table.
+
+        Returns:
+            List of (name, upper bound) tuples; the upper bound is None for the
+            default partition
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s)
+                ORDER BY child.relname
+                """,
+                [table],
+            )
+            rows = cursor.fetchall()
+
+        partitions = []
+        for name, bound in rows:
+            match = self.UPPER_BOUND.search(bound)
+            upper = datetime.fromisoformat(match.group(1)) if match else None
+            partitions.append((name, upper))
+        return partitions
+
+    def convert(self, table: str) -> bool:
+        """
+        Convert an existing table into a monthly partitioned table.
+
+        Algorithm: The table is renamed to <table>_legacy and a partitioned
+        table with the same columns, defaults, checks, indexes and foreign keys
+        takes its name. The legacy table's indexes are renamed first so the
+        new ones keep the names Django knows. The legacy table is then attached
+        as the partition holding everything before the month after its newest
+        row (or after the current month), so no rows are copied and rows
+        written this month pass the partition constraint. Matching indexes are
+        reused on attach; unique indexes without the partition key are
+        enforced through a registry table (see the module docstring).
+
+        Returns:
+            True if the table was converted, False if it already was partitioned
+
+        Raises:
+            ValueError: If the table has a partial or expression unique index
+        """
+        if not self.supported or self.is_partitioned(table):
+            return False
+
+        key = PARTITIONED_TABLES[table]
+        legacy = f"{table}_legacy"
+
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT index_class.relname, pg_get_indexdef(pg_index.indexrelid), pg_index.indisunique,
+                       pg_index.indpred IS NOT NULL OR pg_index.indexprs IS NOT NULL,
+                       ARRAY(
+                           SELECT attribute.attname
+                           FROM unnest(pg_index.indkey) WITH ORDINALITY AS column_key(attnum, position)
+                           JOIN pg_attribute attribute
+                             ON attribute.attrelid = pg_index.indrelid AND attribute.attnum = column_key.attnum
+                           ORDER BY column_key.position
+                       )
+                FROM pg_index
+                JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+                WHERE pg_index.indrelid = to_regclass(%s) AND NOT pg_index.indisprimary
+                """,
+                [table],
+            )
+            indexes = cursor.fetchall()
+            for name, _, unique, partial, columns in indexes:
+                if unique and key not in columns and partial:
+                    raise ValueError(
+                        f"{table} cannot be partitioned: unique index {name} is partial or on an expression"
+                    )
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                [table],
+            )
+            foreign_keys = cursor.fetchall()
+
+            cursor.execute(f"ALTER TABLE {self.quote(table)} RENAME TO {self.quote(legacy)}")
+            for name, *_ in indexes:
+                cursor.execute(f"ALTER INDEX {self.quote(name)} RENAME TO {self.quote(name + '_legacy')}")
+
+            # The rename holds an exclusive lock, so no row newer than this arrives
+            cursor.execute(f"SELECT max({self.quote(key)}) FROM {self.quote(legacy)}")
+            latest = cursor.fetchone()[0]
+            now = datetime.now(dt_timezone.utc)
+            bound = add_months(month_start(max(latest.astimezone(dt_timezone.utc), now) if latest else now), 1)
+
+            cursor.execute(
+                f"CREATE TABLE {self.quote(table)} (LIKE {self.quote(legacy)} "
+                f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+                f"PARTITION BY RANGE ({self.quote(key)})"
+            )
+            cursor.execute(
+                f"ALTER TABLE {self.quote(table)} ADD CONSTRAINT {self.quote(table + '_part_pkey')} "
+                f"PRIMARY KEY (id, {self.quote(key)})"
+            )
+            for name, definition, unique, _, columns in indexes:
+                # Definitions were read before the renames, so they carry the
+                # original index names: CREATE [UNIQUE] INDEX name ON schema.table USING ...
+                definition = re.sub(r" ON (ONLY )?\S+ USING ", f" ON {self.quote(table)} USING ", definition, count=1)
+                if unique and key not in columns:
+                    self._create_unique_registry(cursor, table, legacy, columns)
+                    definition = definition.replace('CREATE UNIQUE INDEX', 'CREATE INDEX', 1)
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f"ALTER TABLE {self.quote(table)} ADD CONSTRAINT {self.quote(name)} {definition}")
+
+            # The partition gets the (id, key) primary key on attach; it cannot keep its own
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [legacy]
+            )
+            for (name,) in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE {self.quote(legacy)} DROP CONSTRAINT {self.quote(name)}")
+            cursor.execute(
+                f"ALTER TABLE {self.quote(table)} ATTACH PARTITION {self.quote(legacy)} "
+                f"FOR VALUES FROM (MINVALUE) TO (%s)",
+                [f"{bound:%Y-%m-%d} 00:00:00+00"],
+            )
+
+        logger.info(f"Converted {table} to a partitioned table")
+        return True
+
+    def _create_unique_registry(self, cursor, table: str, legacy: str, columns: list):
+        """
+        Enforce a unique index without the partition key across all partitions.
+
+        Algorithm: A non-partitioned <table>_<columns>_registry table with the
+        columns as its primary key is filled from the legacy rows, and an AFTER
+        row trigger on the partitioned table adds, moves or removes the values
+        on INSERT, UPDATE and DELETE, so a duplicate fails with the same unique
+        violation as before. Rows with a NULL column are skipped, as a unique
+        index would allow them; dropping an archived partition fires no
+        trigger, so its values stay reserved.
+        """
+        registry = self.quote(f"{table}_{'_'.join(columns)}_registry")
+        function = self.quote(f"{table}_{'_'.join(columns)}_registry_sync")
+        quoted = [self.quote(column) for column in columns]
+        column_list = ', '.join(quoted)
+        new_values = ', '.join(f"NEW.{column}" for column in quoted)
+        old_values = ', '.join(f"OLD.{column}" for column in quoted)
+        old_match = ' AND '.join(f"{column} = OLD.{column}" for column in quoted)
+        new_present = ' AND '.join(f"NEW.{column} IS NOT NULL" for column in quoted)
+
+        cursor.execute(
+            f"CREATE TABLE {registry} AS SELECT {column_list} FROM {self.quote(legacy)} WITH NO DATA"
+        )
+        cursor.execute(f"ALTER TABLE {registry} ADD PRIMARY KEY ({column_list})")
+        cursor.execute(
+            f"INSERT INTO {registry} ({column_list}) SELECT {column_list} FROM {self.quote(legacy)} "
+            f"WHERE {' AND '.join(f'{column} IS NOT NULL' for column in quoted)}"
+        )
+        cursor.execute(
+            f"""
+            CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND ROW({new_values}) IS NOT DISTINCT FROM ROW({old_values}) THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {registry} WHERE {old_match};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND {new_present} THEN
+                    INSERT INTO {registry} ({column_list}) VALUES ({new_values});
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {function} AFTER INSERT OR UPDATE OR DELETE ON {self.quote(table)} "
+            f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+        )
+
+    def ensure_partitions(self, table: str, months_ahead: int = 3) -> list:
+        """
+        Create missing monthly partitions up to months_ahead months after the
+        current one, starting after the last range already covered (e.g. by
+        the converted legacy partition), plus a default partition so inserts
+        never fail if a month was missed.
+
+        Returns:
+            Names of the partitions created
+        """
+        if not self.supported or not self.is_partitioned(table):
+            return []
+
+        partitions = self.partitions(table)
+        existing = {name for name, _ in partitions}
+        covered = max((upper for _, upper in partitions if upper is not None), default=None)
+        current = month_start(datetime.now(dt_timezone.utc))
+        created = []
+
+        with self.connection.cursor() as cursor:
+            for suffix, start, end in month_ranges(current, months_ahead + 1):
+                name = f"{table}_{suffix}"
+                if name in existing or (covered is not None and start < covered.date()):
+                    continue
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.quote(name)} PARTITION OF {self.quote(table)} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [f"{start:%Y-%m-%d} 00:00:00+00", f"{end:%Y-%m-%d} 00:00:00+00"],
+                )
+                created.append(name)
+
+            default = f"{table}_default"
+            if default not in existing:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.quote(default)} PARTITION OF {self.quote(table)} DEFAULT"
+                )
+                created.append(default)
+
+        if created:
+            logger.info(f"Created partitions for {table}: {', '.join(created)}")
+        return created
+
+    def archive_partitions(self, table: str, before: date, archive_dir: str) -> list:
+        """
+        Detach partitions whose range ends on or before a date, dump each one to
+        <archive_dir>/<partition>.csv.gz and drop it.
+
+        Each partition is handled in its own transaction: if the dump fails the
+        partition stays attached.
+
+        Returns:
+            Paths of the archive files written
+        """
+        if not self.supported or not self.is_partitioned(table):
+            return []
+
+        cutoff = datetime(before.year, before.month, before.day, tzinfo=dt_timezone.utc)
+        os.makedirs(archive_dir, exist_ok=True)
+        archived = []
+
+        for name, upper in self.partitions(table):
+            if upper is None or upper > cutoff:
+                continue
+            path = os.path.join(archive_dir, f"{name}.csv.gz")
+            with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {self.quote(table)} DETACH PARTITION {self.quote(name)}")
+                with gzip.open(path, 'wb') as archive:
+                    self._copy_out(cursor, f"COPY {self.quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+                cursor.execute(f"DROP TABLE {self.quote(name)}")
+            archived.append(path)
+            logger.info(f"Archived partition {name} to {path}")
+
+        return archived
+
+    @staticmethod
+    def _copy_out(cursor, sql: str, output):
+        """Stream COPY ... TO STDOUT into a file (psycopg2 and psycopg 3)"""
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            raw.copy_expert(sql, output)
+        else:
+            with raw.copy(sql) as copy:
+                for data in copy:
+                    output.write(data)
@@ -0,0 +1,338 @@
+"""
+Request Profiling
+
+Per-request database, cache and serializer cost, enabled with
+REQUEST_PROFILING:
+- Every query goes through a wrapper in each connection's execute_wrappers
+  (the hook behind connection.execute_wrapper), which counts it, times it
+  and groups it by SQL shape (add_execute_wrapper, also used by metrics)
+- Cache reads are counted as hits or misses and DRF serializer rendering
+  is timed
+- Responses carry a Server-Timing header and each request is logged as one
+  JSON line; queries slower than SLOW_QUERY_MS are logged with their
+  EXPLAIN plan, and a shape repeated NPLUSONE_THRESHOLD times in one request
+  is reported as a likely N+1
+- State lives in a context variable, so it follows async views into the
+  threads that run their ORM calls
+
+With the setting off the middleware removes itself (MiddlewareNotUsed) and
+nothing is installed, so there is no overhead.
+"""
+
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_profile = contextvars.ContextVar('request_profile', default=None)
+_installed = False
+_install_lock = threading.Lock()
+_hooks_lock = threading.Lock()
+_MISS = object()
+
+# Literals and IN lists collapse so queries differing only in values share a shape
+_SHAPE_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def sql_shape(sql: str) -> str:
+    """SQL with literals and IN lists normalized"""
+    for pattern, replacement in _SHAPE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class RequestProfile:
+    """Costs collected for one request (or one profiling() block)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.slow_queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self._rendering = False
+
+    def record_query(self, connection, sql: str, params, duration: float):
+        self.queries += 1
+        self.db_time += duration
+        self.shapes[sql_shape(sql)] += 1
+        if duration * 1000 >= settings.SLOW_QUERY_MS:
+            self.slow_queries.append({
+                'alias': connection.alias,
+                'sql': sql,
+                'duration_ms': round(duration * 1000, 2),
+                'plan': explain(connection, sql, params) if settings.SLOW_QUERY_EXPLAIN else None,
+            })
+
+    @property
+    def repeated_queries(self) -> dict:
+        """SQL shapes run at least NPLUSONE_THRESHOLD times"""
+        return {shape: count for shape, count in self.shapes.items() if count >= settings.NPLUSONE_THRESHOLD}
+
+    @property
+    def total_time(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        metrics = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'serialize;dur={self.serializer_time * 1000:.2f}',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ]
+        if self.repeated_queries:
+            metrics.append(f'nplusone;desc="{len(self.repeated_queries)} repeated query shapes"')
+        return ', '.join(metrics)
+
+    def as_dict(self) -> dict:
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'slow_queries': len(self.slow_queries),
+            'repeated_queries': self.repeated_queries,
+        }
+
+
+def explain(connection, sql: str, params):
+    """
+    EXPLAIN output for a SELECT, or None.
+
+    Runs on a bare backend cursor, so the plan query is neither profiled
+    nor wrapped again.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+def profile_query(execute, sql, params, many, context):
+    """Execute wrapper recording the query in the active profile"""
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    profile.record_query(context['connection'], sql, None if many else params, time.perf_counter() - started)
+    return result
+
+
+def add_execute_wrapper(wrapper):
+    """
+    Add an execute wrapper to every database connection: the ones already
+    open in this thread now, the others as they connect.
+    """
+    def add(connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(add, weak=False, dispatch_uid=f'execute_wrapper:{wrapper.__module__}.{wrapper.__qualname__}')
+    for connection in connections.all(initialized_only=True):
+        add(connection)
+
+
+# Called with (hit keys, missed keys) after every top-level cache read
+_cache_listeners = []
+_cache_reads = threading.local()
+
+
+def _hooked_cache_get(get):
+    def wrapper(self, key, default=None, version=None):
+        if not _cache_listeners or getattr(_cache_reads, 'active', False):
+            return get(self, key, default, version)
+        _cache_reads.active = True
+        try:
+            value = get(self, key, _MISS, version)
+        finally:
+            _cache_reads.active = False
+        hit = value is not _MISS
+        for listener in _cache_listeners:
+            listener([key] if hit else [], [] if hit else [key])
+        return value if hit else default
+
+    wrapper.hooked = True
+    return wrapper
+
+
+def _hooked_cache_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        if not _cache_listeners or getattr(_cache_reads, 'active', False):
+            return get_many(self, keys, version)
+        keys = list(keys)
+        _cache_reads.active = True
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            _cache_reads.active = False
+        for listener in _cache_listeners:
+            listener(list(values), [key for key in keys if key not in values])
+        return values
+
+    wrapper.hooked = True
+    return wrapper
+
+
+def add_cache_listener(listener):
+    """
+    Report every read on the configured caches to listener(hits, misses).
+
+    get_many() implemented on top of get() is reported once, and async
+    reads default to the sync methods on a thread, so they are reported too.
+    """
+    with _hooks_lock:
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            if not getattr(backend.get, 'hooked', False):
+                backend.get = _hooked_cache_get(backend.get)
+                backend.get_many = _hooked_cache_get_many(backend.get_many)
+        if listener not in _cache_listeners:
+            _cache_listeners.append(listener)
+
+
+def _count_cache_reads(hits: list, misses: list):
+    profile = _profile.get()
+    if profile is not None:
+        profile.cache_hits += len(hits)
+        profile.cache_misses += len(misses)
+
+
+def _profile_serializer_data(data):
+    def fget(self):
+        profile = _profile.get()
+        if profile is None or profile._rendering:
+            return data.fget(self)
+        started = time.perf_counter()
+        profile._rendering = True
+        try:
+            return data.fget(self)
+        finally:
+            profile._rendering = False
+            profile.serializer_time += time.perf_counter() - started
+
+    return property(fget)
+
+
+def install():
+    """
+    Hook profiling into database connections, cache backends and DRF
+    serializers (once per process). The hooks do nothing outside a
+    profiled request.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from rest_framework.serializers import BaseSerializer
+
+        add_execute_wrapper(profile_query)
+        add_cache_listener(_count_cache_reads)
+        # Serializer.data and ListSerializer.data both render through BaseSerializer.data
+        BaseSerializer.data = _profile_serializer_data(BaseSerializer.data)
+        _installed = True
+
+
+@contextmanager
+def profiling():
+    """
+    Profile the queries, cache reads and serializers inside the block.
+
+    Yields:
+        The RequestProfile being filled
+    """
+    install()
+    profile = RequestProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+class QueryProfilingMiddleware:
+    """
+    Adds Server-Timing to every response and logs one JSON line per
+    request, plus slow queries and repeated query shapes. Runs natively
+    under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with profiling() as profile:
+            response = self.get_response(request)
+        self.report(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        with profiling() as profile:
+            response = await self.get_response(request)
+        self.report(request, response, profile)
+        return response
+
+    @staticmethod
+    def report(request, response, profile: RequestProfile):
+        response['Server-Timing'] = profile.server_timing()
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else request.path
+        record = {
+            'event': 'request_profile',
+            'method': request.method,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            **profile.as_dict(),
+        }
+        logger.info(json.dumps(record))
+
+        for query in profile.slow_queries:
+            logger.warning(json.dumps({'event': 'slow_query', 'endpoint': endpoint, **query}))
+        if profile.repeated_queries:
+            logger.warning(json.dumps({
+                'event': 'nplusone',
+                'endpoint': endpoint,
+                'queries': profile.repeated_queries,
+            }))
@@ -0,0 +1,74 @@
+"""
+Chunked Purge Utilities
+
+Deletes large sets of expired rows without long transactions:
+- Primary-key range batches of bounded size
+- A pause between batches so other writers can take their locks
+- Throughput reporting (rows per second)
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def purge_queryset(queryset, chunk_size: int = None, pause: float = None) -> dict:
+    """
+    Delete every row matched by a queryset in bounded primary-key ranges.
+
+    Algorithm: Walks the matching rows in primary-key order, reading only
+    the pks of the next chunk and deleting the range [first, last] (still
+    filtered by the original conditions) in its own short transaction.
+    When the model has no cascades or delete signals, Django issues a single
+    raw DELETE per chunk without loading the rows; otherwise the collector
+    only ever loads one chunk at a time.
+
+    Args:
+        queryset: Rows to delete
+        chunk_size: Maximum rows per DELETE (defaults to PURGE_CHUNK_SIZE)
+        pause: Seconds to sleep between chunks (defaults to PURGE_CHUNK_PAUSE)
+
+    Returns:
+        Dictionary with deleted rows, chunks, elapsed seconds and rows per second
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    pause = settings.PURGE_CHUNK_PAUSE if pause is None else pause
+    queryset = queryset.order_by('pk')
+
+    deleted = chunks = 0
+    last_pk = None
+    started = time.monotonic()
+
+    while True:
+        remaining = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(remaining.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+
+        with transaction.atomic(using=queryset.db):
+            count, _ = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]).delete()
+        deleted += count
+        chunks += 1
+        last_pk = pks[-1]
+
+        if len(pks) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    seconds = time.monotonic() - started
+    result = {
+        'deleted': deleted,
+        'chunks': chunks,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(deleted / seconds, 1) if seconds else float(deleted),
+    }
+    logger.info(
+        f"Purged {deleted} {queryset.model._meta.db_table} rows in {chunks} chunks "
+        f"({result['rows_per_second']} rows/s)"
+    )
+    return result
@@ -0,0 +1,94 @@
+"""
+Performance Assertions for Tests
+
+Query and serializer budgets for API tests, measured with utils.profiling:
+- assertMaxQueries: upper bound on the SQL queries run in a block; on
+  failure the queries are listed by SQL shape, so an N+1 stands out
+- assertQueriesDoNotScale: the same request against fixtures of several
+  sizes (1 vs 50 cart items, 0 vs 500 reviews, ...) must run the same
+  number of queries
+- assertMaxSerializerTime: upper bound on DRF serializer rendering time in
+  a block, multiplied by PERF_TIME_BUDGET_SCALE so slow CI machines can
+  relax every time budget at once
+
+create_budget_products builds the product fixtures the budget tests share.
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from utils.profiling import profiling
+
+
+def create_budget_products(category, tag, size: int) -> list:
+    """Bulk-create size in-stock products in category, named and SKU'd after tag"""
+    from apps.products.models import Product
+
+    return Product.objects.bulk_create([
+        Product(
+            name=f'Budget {tag}-{i}', slug=f'budget-{tag}-{i}', description='Budget',
+            price=10, quantity=100, sku=f'BUDGET-{tag}-{i}', category=category,
+        )
+        for i in range(size)
+    ])
+
+
+def describe_queries(profile) -> str:
+    """Queries of a profile as 'count x shape' lines, most repeated first"""
+    return '\n'.join(f'  {count} x {shape}' for shape, count in profile.shapes.most_common())
+
+
+class PerformanceAssertionsMixin:
+    """Query and serializer budget assertions for TestCase classes"""
+
+    @contextmanager
+    def assertMaxQueries(self, limit: int):
+        """
+        Fail if the block runs more than limit queries.
+
+        Yields:
+            The RequestProfile being filled
+        """
+        with profiling() as profile:
+            yield profile
+        if profile.queries > limit:
+            self.fail(f'{profile.queries} queries, expected at most {limit}:\n{describe_queries(profile)}')
+
+    @contextmanager
+    def assertMaxSerializerTime(self, milliseconds: float):
+        """Fail if serializers spend more than milliseconds (scaled) rendering in the block"""
+        budget = milliseconds * settings.PERF_TIME_BUDGET_SCALE
+        with profiling() as profile:
+            yield profile
+        spent = profile.serializer_time * 1000
+        if spent > budget:
+            self.fail(f'Serializers took {spent:.1f} ms, budget {budget:.1f} ms')
+
+    def assertQueriesDoNotScale(self, sizes, setup, request):
+        """
+        Fail if request() runs more queries for some fixture sizes than others.
+
+        Args:
+            sizes: Fixture sizes to compare, e.g. (1, 50)
+            setup: setup(size) builds the fixture and returns what request needs
+            request: request(fixture) performs the request under test
+
+        Returns:
+            The query count (the same for every size)
+        """
+        counts = {}
+        profiles = {}
+        for size in sizes:
+            fixture = setup(size)
+            with profiling() as profile:
+                request(fixture)
+            counts[size] = profile.queries
+            profiles[size] = profile
+        if len(set(counts.values())) > 1:
+            largest = max(sizes)
+            self.fail(
+                f'Query count grows with N: {counts}. Queries for N={largest}:\n'
+                f'{describe_queries(profiles[largest])}'
+            )
+        return counts[sizes[0]]
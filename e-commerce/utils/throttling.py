@@ -0,0 +1,267 @@
+"""
+Distributed Rate Limiting
+
+Sliding-window throttles shared by every web worker:
+- Counters live in Redis and are checked and incremented by one atomic Lua
+  script (a single round trip, no race between read and write)
+- The window is a sliding window counter: the previous fixed window's count
+  is weighted by how much of it still overlaps the sliding window, so
+  bursts at window edges are smoothed with O(1) memory per key
+- Requests are keyed by user id when authenticated, by client IP otherwise;
+  the IP is REMOTE_ADDR or, with REST_FRAMEWORK['NUM_PROXIES'] set, the
+  X-Forwarded-For entry added by our own proxy, so a client-supplied
+  header cannot rotate the key
+- Throttled responses carry Retry-After with the exact wait until the next
+  request fits
+- If Redis is not configured or unreachable, limits are enforced per
+  process by an in-memory limiter until Redis answers again
+
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] per scope.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: counter hash (one field per fixed window); ARGV: window (ms), limit
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local current = math.floor(now_ms / window)
+local elapsed = now_ms - current * window
+
+local count = tonumber(redis.call('HGET', KEYS[1], current) or '0')
+local previous = tonumber(redis.call('HGET', KEYS[1], current - 1) or '0')
+local estimate = previous * (window - elapsed) / window + count
+
+if estimate + 1 > limit then
+    local wait
+    if count + 1 > limit then
+        wait = window - elapsed + math.ceil(window * (1 - (limit - 1) / count))
+    else
+        wait = math.ceil(window - (limit - count - 1) * window / previous) - elapsed
+    end
+    return {0, 0, math.max(wait, 1)}
+end
+
+redis.call('HINCRBY', KEYS[1], current, 1)
+redis.call('HDEL', KEYS[1], current - 2)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.floor(limit - estimate - 1), 0}
+"""
+
+
+def sliding_window(count: int, previous: int, elapsed: float, window: float, limit: int) -> tuple:
+    """
+    Decide one request against a sliding window counter.
+
+    Algorithm: Same arithmetic as SLIDING_WINDOW_SCRIPT. The estimate is
+    the current window's count plus the previous window's count weighted
+    by its overlap with the sliding window. When the request doesn't fit,
+    the wait is how long until the weighted count drops far enough - later
+    in this window, or (if this window alone is full) in the next one.
+
+    Args:
+        count: Requests counted in the current fixed window
+        previous: Requests counted in the previous fixed window
+        elapsed: Time since the current fixed window started
+        window: Window length (same unit as elapsed)
+        limit: Requests allowed per window
+
+    Returns:
+        Tuple of (allowed, remaining requests, wait in the unit of window)
+    """
+    estimate = previous * (window - elapsed) / window + count
+    if estimate + 1 > limit:
+        if count + 1 > limit:
+            wait = window - elapsed + window * (1 - (limit - 1) / count)
+        else:
+            wait = window - (limit - count - 1) * window / previous - elapsed
+        return False, 0, wait
+    return True, math.floor(limit - estimate - 1), 0
+
+
+class LocalSlidingWindowLimiter:
+    """
+    In-process sliding window counters (fallback when Redis is unavailable).
+
+    Keeps at most THROTTLE_FALLBACK_SIZE keys, evicting the least recently
+    used; limits apply per process rather than across workers.
+    """
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or settings.THROTTLE_FALLBACK_SIZE
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float) -> tuple:
+        now = time.time()
+        current = math.floor(now / window)
+        elapsed = now - current * window
+        with self._lock:
+            started, count, previous = self._counters.get(key, (current, 0, 0))
+            if started != current:
+                previous = count if started == current - 1 else 0
+                count = 0
+            allowed, remaining, wait = sliding_window(count, previous, elapsed, window, limit)
+            if allowed:
+                count += 1
+            self._counters[key] = (current, count, previous)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+        return allowed, remaining, wait
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SlidingWindowLimiter:
+    """
+    Redis-backed limiter with an in-process fallback.
+
+    Uses the Redis server behind THROTTLE_CACHE_ALIAS when that cache is a
+    django-redis cache. After a Redis error the fallback is used for
+    THROTTLE_REDIS_RETRY_INTERVAL seconds before Redis is tried again, so
+    an outage doesn't add a socket timeout to every request.
+    """
+
+    def __init__(self):
+        self.local = LocalSlidingWindowLimiter()
+        self._script = None
+        self._redis_down_until = 0
+
+    def _redis_script(self):
+        if self._script is None:
+            cache_config = settings.CACHES[settings.THROTTLE_CACHE_ALIAS]
+            if not cache_config['BACKEND'].startswith('django_redis.'):
+                return None
+            from django_redis import get_redis_connection
+
+            self._script = get_redis_connection(settings.THROTTLE_CACHE_ALIAS).register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    def hit(self, key: str, limit: int, window: float) -> tuple:
+        """
+        Count one request for key if it fits limit requests per window seconds.
+
+        Returns:
+            Tuple of (allowed, remaining requests, seconds to wait)
+        """
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                script = self._redis_script()
+                if script is not None:
+                    redis_key = caches[settings.THROTTLE_CACHE_ALIAS].make_key(key)
+                    allowed, remaining, wait_ms = script(keys=[redis_key], args=[int(window * 1000), limit])
+                    return bool(allowed), int(remaining), wait_ms / 1000
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + settings.THROTTLE_REDIS_RETRY_INTERVAL
+                logger.warning(f"Rate limiter falling back to in-process counters: {e}")
+        return self.local.hit(key, limit, window)
+
+    def reset(self):
+        self._script = None
+        self._redis_down_until = 0
+        self.local.clear()
+
+
+limiter = SlidingWindowLimiter()
+
+
+class SlidingWindowThrottle(throttling.SimpleRateThrottle):
+    """
+    Base throttle using the shared sliding window limiter.
+
+    Rates are read from api_settings on each instantiation (DRF's
+    SimpleRateThrottle freezes them at import).
+    """
+
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_rate(self):
+        if not getattr(self, 'scope', None):
+            raise ImproperlyConfigured(f"You must set a scope for '{self.__class__.__name__}' throttle")
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def get_ident_key(self, request) -> str:
+        """User id when authenticated, proxy-validated client IP otherwise"""
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident_key(request)}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.remaining, self.retry_after = limiter.hit(key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class AnonSlidingWindowThrottle(SlidingWindowThrottle):
+    """Overall limit for anonymous clients, per IP"""
+
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle):
+    """Overall limit for authenticated users, per user"""
+
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowThrottle):
+    """
+    Per-endpoint limits.
+
+    Views set ``throttle_scope``, or define ``get_throttle_scope(request)``
+    to pick a scope per request (e.g. search vs. browsing). Views without a
+    scope are not limited by this throttle.
+    """
+
+    def __init__(self):
+        # The scope is only known once the view is
+        pass
+
+    def allow_request(self, request, view):
+        get_scope = getattr(view, 'get_throttle_scope', None)
+        self.scope = get_scope(request) if get_scope else getattr(view, 'throttle_scope', None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -0,0 +1,68 @@
+"""
+Transaction Scoping Utilities
+
+Explicit transaction boundaries instead of ATOMIC_REQUESTS:
+- Read-only requests run in autocommit and never hold a transaction open
+- AtomicWritesMixin wraps only unsafe-method handlers in a transaction
+- outside_transaction() guards external I/O (payment gateways, HTTP APIs)
+  so slow third parties never hold a database transaction and its
+  connection open
+"""
+
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.transaction import TransactionManagementError
+from django.utils.decorators import method_decorator
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class AtomicWritesMixin:
+    """
+    Run POST/PUT/PATCH/DELETE handlers of a DRF view in one transaction.
+
+    Safe methods run without a transaction. The view is also excluded from
+    ATOMIC_REQUESTS on any database that still enables it. DRF turns
+    exceptions into error responses inside dispatch, so any 4xx/5xx response
+    rolls the transaction back.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in WRITE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code >= 400:
+                transaction.set_rollback(True)
+        return response
+
+
+class outside_transaction(ContextDecorator):
+    """
+    Assert that no transaction is open around external I/O.
+
+    Usable as a context manager or decorator:
+
+        with outside_transaction():
+            intent = stripe.PaymentIntent.create(...)
+
+    Raises:
+        TransactionManagementError: If called inside an atomic block
+    """
+
+    def __init__(self, using: str = None):
+        self.using = using or DEFAULT_DB_ALIAS
+
+    def __enter__(self):
+        if connections[self.using].in_atomic_block:
+            raise TransactionManagementError(
+                'External I/O must not run inside a database transaction; '
+                'move it before or after the atomic block.'
+            )
+        return self
+
+    def __exit__(self, *exc):
+        return False